@@ -1,29 +1,28 @@
 import streamlit as st
-import json
-import os
 import requests
 import hashlib
 import io
-import asyncio
+from datetime import datetime
 from qna_generator.data_processor import extract_text_from_url, extract_text_from_uploaded_file
 from qna_generator.ai_qa_generator import AIQAGenerator
-from qna_generator.data_exporter import (
-    export_to_jsonl,
-    export_to_json,
-    export_to_csv,
-    export_for_rag,
-    export_for_finetuning,
-)
-from qna_generator.utils import (
-    calculate_temperature_step,
-    increment_temperature,
-    split_text_into_chunks,
-)
+from qna_generator.cache import ResponseCache
+from qna_generator.fetcher import Fetcher, open_page_cache
+from qna_generator.data_exporter import export_all_formats
+from qna_generator.dedup import DEFAULT_THRESHOLD, deduplicate
+from qna_generator.pipeline import GenerationError, QAEngine
+from qna_generator.review import QAStore
+
+REVIEW_PAGE_SIZES = [10, 20, 50, 100]
+
+
+@st.cache_resource(show_spinner=False)
+def get_fetcher() -> Fetcher:
+    return Fetcher(cache=open_page_cache())
 
 
 @st.cache_data(show_spinner=False)
 def cached_extract_text_from_url(url: str, url_hash: str) -> str:
-    return extract_text_from_url(url)
+    return extract_text_from_url(url, fetcher=get_fetcher())
 
 
 @st.cache_data(show_spinner=False)
@@ -33,6 +32,24 @@ def cached_extract_text_from_uploaded_file(
     return extract_text_from_uploaded_file(io.BytesIO(file_bytes), file_type)
 
 
+@st.cache_resource(show_spinner=False)
+def get_response_cache() -> ResponseCache:
+    return ResponseCache()
+
+
+def get_exports(store: QAStore) -> dict:
+    """All export formats of ``store`` as in-memory text, rebuilt only when the records change."""
+    cached = st.session_state.get("exports")
+    if cached is None or cached["version"] != store.version:
+        cached = {
+            "version": store.version,
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "data": export_all_formats(store.records),
+        }
+        st.session_state.exports = cached
+    return cached
+
+
 def _has_error_prefix(value: str) -> bool:
     """Return True if the text looks like an error message."""
     return isinstance(value, str) and value.startswith(("Error", "エラー"))
@@ -45,8 +62,8 @@ st.set_page_config(
 )
 
 # セッション状態の初期化
-if 'qa_data' not in st.session_state:
-    st.session_state.qa_data = []
+if 'qa_store' not in st.session_state:
+    st.session_state.qa_store = QAStore()
 if 'api_key' not in st.session_state:
     st.session_state.api_key = ""
 if 'model' not in st.session_state:
@@ -114,6 +131,32 @@ with st.sidebar:
         step=1,
         help="一度に生成する質問数",
     )
+    batch_categories = st.checkbox(
+        "カテゴリをまとめて生成",
+        value=False,
+        help="温度ごとに全カテゴリの質問を1回のリクエストで生成し、送信するトークン数とリクエスト数を削減します（「1回の生成での質問数」は無視されます）",
+    )
+
+    dedup_enabled = st.checkbox(
+        "類似Q&Aを除外",
+        value=True,
+        help="温度やチャンクの重なりによって生成されたほぼ同じ内容のQ&Aを除外します",
+    )
+    dedup_threshold = st.slider(
+        "類似度のしきい値",
+        min_value=0.5,
+        max_value=1.0,
+        value=DEFAULT_THRESHOLD,
+        step=0.05,
+        disabled=not dedup_enabled,
+        help="この値以上に似ているQ&Aを重複とみなします",
+    )
+
+    cache_stats = get_response_cache().stats()
+    st.caption(
+        f"応答キャッシュ: {cache_stats['entries']}件 / "
+        f"ヒット {cache_stats['hits']} / ミス {cache_stats['misses']}"
+    )
 
 # メインコンテンツ
 col1, col2 = st.columns([1, 1])
@@ -184,96 +227,75 @@ with col2:
     st.header("Q&A生成")
     
     if text_content and st.session_state.api_key:
-        generator = AIQAGenerator(st.session_state.api_key, model=st.session_state.model)
-        chunks = split_text_into_chunks(text_content, max_tokens=3000)
+        generator = AIQAGenerator(
+            st.session_state.api_key,
+            model=st.session_state.model,
+            cache=get_response_cache(),
+        )
+        engine = QAEngine(
+            generator,
+            num_categories=num_categories,
+            questions=num_questions_input,
+            total_questions=num_questions_input if question_mode == "全カテゴリ合計質問数" else None,
+            block_size=block_size,
+            batch_categories=batch_categories,
+        )
+        chunks = engine.split(text_content)
 
         if st.button("カテゴリとQ&Aを生成"):
             all_success = True
+            # 生成途中のQ&Aを届いた順に表示する
+            live_preview = st.empty()
+            streamed = []
+
+            def show_streamed(record):
+                streamed.append(record)
+                live_preview.caption(f"生成済み {len(streamed)}件: {record['question']}")
+
+            engine.on_record = show_streamed
             for chunk_index, chunk in enumerate(chunks, start=1):
-                with st.spinner(f"チャンク{chunk_index}のカテゴリを生成中..."):
-                    categories = generator.generate_categories(chunk, 0.0, num_categories)
-
-                if categories and not any("エラー" in str(cat) for cat in categories):
-                    st.success(
-                        f"チャンク{chunk_index}でカテゴリが生成されました: {', '.join(categories)}"
-                    )
-
-                    # 各カテゴリでQ&Aを生成
-                    if question_mode == "全カテゴリ合計質問数":
-                        total_questions = num_questions_input
-                        generated_category_count = len(categories)
-                        base = total_questions // generated_category_count
-                        remainder = total_questions % generated_category_count
-                        per_category_counts = [
-                            base + (1 if i < remainder else 0)
-                            for i in range(generated_category_count)
-                        ]
-                    else:
-                        per_category_counts = [num_questions_input] * len(categories)
-
-                    async def generate_category_qa(category, target_count):
-                        current_temp = 0.0
-                        generated = 0
-                        step = calculate_temperature_step(target_count)
-                        next_step = step
-                        qa_list = []
-                        while generated < target_count:
-                            num_to_generate = min(block_size, target_count - generated)
-                            result = await asyncio.to_thread(
-                                generator.generate_qa_for_category,
-                                chunk,
-                                category,
-                                current_temp,
-                                num_to_generate,
-                            )
-                            if result and not result.get("error"):
-                                for qa in result.get("qa_pairs", []):
-                                    qa_data = {
-                                        "category": category,
-                                        "question": qa.get("question", ""),
-                                        "answer": qa.get("answer", ""),
-                                        "source": qa.get("source", ""),
-                                        "source_info": source_info,
-                                        "temperature": current_temp,
-                                    }
-                                    qa_list.append(qa_data)
-                                generated += len(result.get("qa_pairs", []))
-                                while generated >= next_step:
-                                    current_temp = increment_temperature(current_temp)
-                                    next_step += step
-                            else:
-                                error_message = (
-                                    result.get("error")
-                                    if isinstance(result, dict)
-                                    else "Q&Aの生成中に不明なエラーが発生しました"
-                                )
-                                return {"error": error_message, "category": category}
-                        return {"qa_list": qa_list}
-
-                    tasks = [
-                        generate_category_qa(category, target_count)
-                        for category, target_count in zip(categories, per_category_counts)
-                    ]
-                    with st.spinner(f"チャンク{chunk_index}のQ&Aを生成中..."):
-                        results = asyncio.run(asyncio.gather(*tasks))
-
-                    for res in results:
-                        if res.get("error"):
-                            st.error(
-                                f"チャンク{chunk_index}カテゴリ「{res['category']}」でエラーが発生しました: {res['error']}"
-                            )
-                            st.info("問題が解消したら再度お試しください。")
-                            all_success = False
-                        else:
-                            st.session_state.qa_data.extend(res["qa_list"])
-                    if not all_success:
-                        break
-                else:
-                    st.error(f"チャンク{chunk_index}でカテゴリ生成エラー: {categories}")
+                try:
+                    with st.spinner(f"チャンク{chunk_index}のカテゴリを生成中..."):
+                        categories = engine.generate_categories(chunk)
+                except GenerationError as e:
+                    st.error(f"チャンク{chunk_index}でカテゴリ生成エラー: {e}")
                     st.info("設定を確認して再度お試しください。")
                     all_success = False
                     break
 
+                st.success(
+                    f"チャンク{chunk_index}でカテゴリが生成されました: {', '.join(categories)}"
+                )
+                with st.spinner(f"チャンク{chunk_index}のQ&Aを生成中..."):
+                    results = engine.run_chunk(chunk, categories, source_info)
+
+                for res in results:
+                    if res.error:
+                        st.error(
+                            f"チャンク{chunk_index}カテゴリ「{res.category}」でエラーが発生しました: {res.error}"
+                        )
+                        st.info("問題が解消したら再度お試しください。")
+                        all_success = False
+                    else:
+                        st.session_state.qa_store.extend(res.records)
+                if not all_success:
+                    break
+
+            live_preview.empty()
+            if dedup_enabled:
+                qa_before = st.session_state.qa_store.records
+                kept, report = deduplicate(qa_before, threshold=dedup_threshold)
+                if report.dropped:
+                    st.session_state.qa_store.replace(kept)
+                    st.info(f"類似したQ&Aを{len(report.dropped)}件除外しました")
+                    with st.expander("除外されたQ&A"):
+                        for duplicate in report.dropped:
+                            st.write(
+                                f"「{qa_before[duplicate.index]['question']}」→ "
+                                f"「{qa_before[duplicate.kept_index]['question']}」と類似 "
+                                f"(類似度 {duplicate.similarity:.2f})"
+                            )
+
             if all_success:
                 st.success("Q&Aの生成が完了しました")
     
@@ -283,104 +305,101 @@ with col2:
         st.warning("まずテキストを抽出してください")
 
 # 生成されたQ&Aの表示
-if st.session_state.qa_data:
+qa_store = st.session_state.qa_store
+if qa_store:
     st.header("生成されたQ&A")
-    
-    # カテゴリ別に表示
-    categories = list(set([qa["category"] for qa in st.session_state.qa_data]))
-
-    for category in categories:
-        st.subheader(f"カテゴリ: {category}")
-        category_indices = [idx for idx, qa in enumerate(st.session_state.qa_data) if qa["category"] == category]
-
-        for i, idx in enumerate(category_indices):
-            qa = st.session_state.qa_data[idx]
-            with st.expander(f"Q{i+1}: {qa['question'][:50]}..."):
-                new_question = st.text_input("質問", value=qa["question"], key=f"question_{idx}")
-                new_answer = st.text_area("回答", value=qa["answer"], key=f"answer_{idx}")
-                if st.button("保存", key=f"save_{idx}"):
-                    st.session_state.qa_data[idx]["question"] = new_question
-                    st.session_state.qa_data[idx]["answer"] = new_answer
-                    st.success("保存しました")
-
-                # 引用元を折りたたみ表示
-                with st.expander("引用元を表示"):
-                    st.write(f"**引用元:** {qa['source']}")
-                    st.write(f"**ソース:** {qa['source_info']}")
-                    st.write(f"**温度設定:** {qa['temperature']}")
-    
+
+    # 表示するのは選択中のカテゴリ・ページのQ&Aだけ
+    filter_col, search_col, size_col = st.columns([2, 2, 1])
+    with filter_col:
+        category = st.selectbox(
+            "カテゴリ",
+            [None] + qa_store.categories(),
+            format_func=lambda c: f"すべて ({len(qa_store)})" if c is None else f"{c} ({qa_store.count(c)})",
+        )
+    with search_col:
+        query = st.text_input("検索（質問・回答）")
+    with size_col:
+        page_size = st.selectbox("表示件数", REVIEW_PAGE_SIZES, index=1)
+
+    page = qa_store.page(category, st.session_state.get("review_page", 1), page_size, query)
+    st.session_state.review_page = page.number
+    st.number_input(f"ページ（全{page.pages}ページ・{page.total}件）", 1, page.pages, key="review_page")
+
+    # 編集はフォームにまとめ、保存ボタンを押したときだけ反映する
+    with st.form("qa_review"):
+        edits = {}
+        for idx in page.indices:
+            qa = qa_store[idx]
+            st.markdown(f"**Q{idx + 1}** （{qa['category']}）")
+            edits[idx] = {
+                "question": st.text_input("質問", value=qa["question"], key=f"question_{qa_store.version}_{idx}"),
+                "answer": st.text_area("回答", value=qa["answer"], key=f"answer_{qa_store.version}_{idx}"),
+            }
+            st.caption(f"引用元: {qa['source'][:200]} ／ ソース: {qa['source_info']} ／ 温度設定: {qa['temperature']}")
+        submitted = st.form_submit_button("このページの変更を保存")
+    if submitted:
+        changed = qa_store.update_many(edits)
+        st.success(f"{changed}件の変更を保存しました" if changed else "変更はありません")
+
     # データクリア
     if st.button("Q&Aデータをクリア"):
-        st.session_state.qa_data = []
+        qa_store.clear()
         st.rerun()
     
-    # データエクスポート機能
+    # データエクスポート機能（全形式をメモリ上で一度に生成）
     st.header("データエクスポート")
     
-    if st.session_state.qa_data:
-        st.write(f"現在のQ&Aデータ数: {len(st.session_state.qa_data)}")
+    if qa_store:
+        st.write(f"現在のQ&Aデータ数: {len(qa_store)}")
+        exports = get_exports(qa_store)
+        timestamp = exports["timestamp"]
+        data = exports["data"]
         
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            if st.button("JSON形式でダウンロード"):
-                filename = export_to_json(st.session_state.qa_data)
-                with open(filename, 'rb') as f:
-                    st.download_button(
-                        label="JSONファイルをダウンロード",
-                        data=f.read(),
-                        file_name=filename,
-                        mime="application/json"
-                    )
+            st.download_button(
+                label="JSONファイルをダウンロード",
+                data=data["json"],
+                file_name=f"qa_data_{timestamp}.json",
+                mime="application/json"
+            )
         
         with col2:
-            if st.button("CSV形式でダウンロード"):
-                filename = export_to_csv(st.session_state.qa_data)
-                with open(filename, 'rb') as f:
-                    st.download_button(
-                        label="CSVファイルをダウンロード",
-                        data=f.read(),
-                        file_name=filename,
-                        mime="text/csv"
-                    )
+            st.download_button(
+                label="CSVファイルをダウンロード",
+                data=data["csv"],
+                file_name=f"qa_data_{timestamp}.csv",
+                mime="text/csv"
+            )
         
         with col3:
-            if st.button("JSONL形式でダウンロード"):
-                filename = export_to_jsonl(st.session_state.qa_data)
-                with open(filename, 'rb') as f:
-                    st.download_button(
-                        label="JSONLファイルをダウンロード",
-                        data=f.read(),
-                        file_name=filename,
-                        mime="application/json"
-                    )
+            st.download_button(
+                label="JSONLファイルをダウンロード",
+                data=data["jsonl"],
+                file_name=f"qa_data_{timestamp}.jsonl",
+                mime="application/json"
+            )
         
         st.subheader("AI開発用エクスポート")
         
         col4, col5 = st.columns(2)
         
         with col4:
-            if st.button("RAG用データでダウンロード"):
-                filename = export_for_rag(st.session_state.qa_data)
-                with open(filename, 'rb') as f:
-                    st.download_button(
-                        label="RAG用データをダウンロード",
-                        data=f.read(),
-                        file_name=filename,
-                        mime="application/json"
-                    )
+            st.download_button(
+                label="RAG用データをダウンロード",
+                data=data["rag"],
+                file_name=f"rag_data_{timestamp}.jsonl",
+                mime="application/json"
+            )
         
         with col5:
-            if st.button("ファインチューニング用データでダウンロード"):
-                filename = export_for_finetuning(st.session_state.qa_data)
-                with open(filename, 'rb') as f:
-                    st.download_button(
-                        label="ファインチューニング用データをダウンロード",
-                        data=f.read(),
-                        file_name=filename,
-                        mime="application/json"
-                    )
+            st.download_button(
+                label="ファインチューニング用データをダウンロード",
+                data=data["finetuning"],
+                file_name=f"finetuning_data_{timestamp}.jsonl",
+                mime="application/json"
+            )
     else:
         st.info("エクスポートするQ&Aデータがありません。まずQ&Aを生成してください。")
-
-
@@ -0,0 +1,124 @@
+"""Exporter throughput over synthetic Q&A datasets of increasing size.
+
+``jsonl-gzip``, ``jsonl-zstd`` and ``parquet`` show the compressed and
+columnar formats (skipped when zstandard/pyarrow are missing);
+``parquet-read-2cols`` reads back just ``category`` and ``question``.
+``all`` writes every format to files in one pass (``write_all_formats``) and
+``all-memory`` builds them in memory as the app does (``export_all_formats``);
+compare them with the sum of the individual exporters::
+
+    python benchmarks/bench_export.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from common import Report, Timer
+from qna_generator.data_exporter import (
+    EXPORT_FORMATS,
+    export_all_formats,
+    export_to_parquet,
+    iter_parquet,
+    export_for_finetuning,
+    export_for_rag,
+    export_to_csv,
+    export_to_json,
+    export_to_jsonl,
+    write_all_formats,
+)
+
+
+def parquet_read_two_columns(records, path):
+    export_to_parquet(records, path)
+    with Timer() as timer:
+        for _ in iter_parquet(path, columns=["category", "question"]):
+            pass
+    return timer.elapsed
+
+
+def export_all_to_files(records, path):
+    files = {name: open(f"{path}.{name}", "w", newline="", encoding="utf-8") for name in EXPORT_FORMATS}
+    try:
+        write_all_formats(records, files)
+    finally:
+        for f in files.values():
+            f.close()
+    return sum(os.path.getsize(f.name) for f in files.values())
+
+
+def export_all_to_memory(records, path):
+    return sum(len(text.encode("utf-8")) for text in export_all_formats(records).values())
+
+
+EXPORTERS = {
+    "jsonl": export_to_jsonl,
+    "json": export_to_json,
+    "csv": export_to_csv,
+    "rag": export_for_rag,
+    "finetuning": export_for_finetuning,
+    "jsonl-gzip": lambda records, path: export_to_jsonl(records, path, compression="gzip"),
+    "jsonl-zstd": lambda records, path: export_to_jsonl(records, path, compression="zstd"),
+    "parquet": export_to_parquet,
+    "parquet-read-2cols": parquet_read_two_columns,
+    "all": export_all_to_files,
+    "all-memory": export_all_to_memory,
+}
+
+
+def synthetic_records(count):
+    return [
+        {
+            "category": f"カテゴリ{i % 7}",
+            "question": f"{i}番目の申請はどこで受け付けていますか？",
+            "answer": "申請書は市役所の窓口で受け付けており、本人確認書類の提示が必要です。" * 2,
+            "source": "申請書は市役所の窓口で受け付けます。",
+            "source_info": f"URL: https://example.com/faq/{i // 50}",
+            "temperature": round((i % 9) * 0.1, 1),
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Record counts.")
+    parser.add_argument("--format", choices=list(EXPORTERS), action="append", help="Formats to run (default all).")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    report = Report("export")
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in sorted(args.sizes):
+            records = synthetic_records(count)
+            for name in args.format or list(EXPORTERS):
+                path = os.path.join(workdir, f"{name}-{count}.out")
+                try:
+                    with Timer() as timer:
+                        result = EXPORTERS[name](records, path)
+                except ImportError as e:
+                    print(f"skipping {name}: {e}", file=sys.stderr)
+                    continue
+                if isinstance(result, float):
+                    # Read benchmarks time the read only.
+                    report.add(f"{name}/{count}", records_per_s=count / result, seconds=result)
+                    os.remove(path)
+                    continue
+                # Multi-format exporters return the total size instead of writing ``path``.
+                size = result if isinstance(result, int) else os.path.getsize(path)
+                report.add(
+                    f"{name}/{count}",
+                    output_mb=size / 1e6,
+                    records_per_s=count / timer.elapsed,
+                    mb_per_s=size / 1e6 / timer.elapsed,
+                    seconds=timer.elapsed,
+                )
+                if os.path.exists(path):
+                    os.remove(path)
+    report.print_table()
+    report.save(args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Text extraction throughput for PDF, DOCX and HTML over synthetic corpora.
+
+Documents of increasing size are generated in a temporary directory and each
+extractor is timed on them; MB/s is measured against the input file size.
+``docx-python-docx`` is the previous python-docx implementation, kept as the
+baseline for the streaming DOCX reader. ``--memory`` runs each extraction
+once more under tracemalloc and reports its peak allocation::
+
+    python benchmarks/bench_extraction.py --sizes 10 100 500
+    python benchmarks/bench_extraction.py --format docx --format docx-python-docx --memory
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from docx import Document
+
+from common import Report, Timer
+from qna_generator.data_processor import extract_text_from_docx, extract_text_from_pdf
+from qna_generator.html_text import html_to_text
+
+LINE = "第{n}条 申請書は市役所の窓口で受け付けます。Applications are accepted at the city office."
+
+
+def make_pdf(path, pages, lines_per_page=40):
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page()
+        for i in range(lines_per_page):
+            page.insert_text((40, 40 + i * 18), LINE.format(n=page_number * lines_per_page + i), fontname="japan", fontsize=9)
+    document.save(path)
+    document.close()
+
+
+def make_docx(path, pages, paragraphs_per_page=40):
+    document = Document()
+    for n in range(pages * paragraphs_per_page):
+        document.add_paragraph(LINE.format(n=n))
+    document.save(path)
+
+
+def make_docx_with_tables(path, pages, paragraphs_per_page=40):
+    document = Document()
+    for n in range(pages * paragraphs_per_page // 2):
+        document.add_paragraph(LINE.format(n=n))
+    table = document.add_table(rows=pages * paragraphs_per_page // 4, cols=2)
+    for i, row in enumerate(table.rows):
+        row.cells[0].text = f"項目{i}"
+        row.cells[1].text = LINE.format(n=i)
+    document.save(path)
+
+
+def extract_docx_python_docx(path):
+    """The python-docx paragraph concatenation used before ``docx_text`` (body paragraphs only)."""
+    text = ""
+    for para in Document(path).paragraphs:
+        text += para.text + "\n"
+    return text
+
+
+def make_html(path, pages, paragraphs_per_page=40):
+    parts = ["<html><head><style>p { margin: 0 }</style><script>var x = 1;</script></head><body>"]
+    for n in range(pages * paragraphs_per_page):
+        parts.append(f"<div class='row'><p>{LINE.format(n=n)}</p>\n  <span>&nbsp;</span></div>\n")
+    parts.append("</body></html>")
+    Path(path).write_text("".join(parts), encoding="utf-8")
+
+
+def extract_html(path):
+    return html_to_text(Path(path).read_text(encoding="utf-8"))
+
+
+FORMATS = {
+    "pdf": (make_pdf, extract_text_from_pdf),
+    "pdf-serial": (make_pdf, lambda path: extract_text_from_pdf(path, workers=1)),
+    "docx": (make_docx, extract_text_from_docx),
+    "docx-python-docx": (make_docx, extract_docx_python_docx),
+    "docx-tables": (make_docx_with_tables, extract_text_from_docx),
+    "html": (make_html, extract_html),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500], help="Document sizes in pages.")
+    parser.add_argument("--format", choices=list(FORMATS), action="append", help="Formats to run (default all).")
+    parser.add_argument("--memory", action="store_true", help="Also report peak traced allocation per extraction.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    report = Report("extraction")
+    with tempfile.TemporaryDirectory() as workdir:
+        for pages in sorted(args.sizes):
+            for name in args.format or list(FORMATS):
+                make, extract = FORMATS[name]
+                path = os.path.join(workdir, f"{make.__name__}-{pages}.{name.split('-')[0]}")
+                if not os.path.exists(path):
+                    make(path, pages)
+                size = os.path.getsize(path)
+                with Timer() as timer:
+                    text = extract(path)
+                metrics = {}
+                if args.memory:
+                    tracemalloc.start()
+                    extract(path)
+                    metrics["peak_alloc_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+                    tracemalloc.stop()
+                report.add(
+                    f"{name}/{pages}p",
+                    input_mb=size / 1e6,
+                    chars=len(text),
+                    mb_per_s=size / 1e6 / timer.elapsed,
+                    pages_per_s=pages / timer.elapsed,
+                    seconds=timer.elapsed,
+                    **metrics,
+                )
+    report.print_table()
+    report.save(args.json)
+
+
+if __name__ == "__main__":
+    main()
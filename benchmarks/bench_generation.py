@@ -0,0 +1,231 @@
+"""End-to-end generation throughput against a local fake OpenAI server.
+
+Scenarios (``--stream`` streams Q&A completions in all of them):
+
+* ``generator`` – concurrent ``AIQAGenerator.agenerate_qa_for_category`` calls.
+* ``app-loop`` – the Streamlit app's per-chunk loop through ``QAEngine``:
+  categories, then temperature-stepped blocks per category (or one request per
+  temperature band with ``--batch-categories``).
+* ``cli`` – ``cli.run_pipeline`` over synthetic DOCX files.
+
+The fake server runs in a separate process so that it does not compete with
+the code under test for the GIL. Each scenario reports requests/sec,
+client-side latency percentiles per request (retries included), tokens/sec as
+reported by the server and peak RSS; ``app-loop`` also reports the time until
+the first record could be shown::
+
+    python benchmarks/bench_generation.py --latency 0.2 --jitter 0.1 --rate-limit-rate 0.05
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import requests
+from docx import Document
+
+from common import Report, Timer, latency_stats
+from fake_openai_server import FakeOpenAIServer
+from qna_generator.ai_qa_generator import AIQAGenerator
+from qna_generator.cli import run_pipeline
+from qna_generator.pipeline import QAEngine
+
+SENTENCE = "申請書は市役所の窓口で受け付けており、本人確認書類の提示が必要です。"
+
+
+def synthetic_text(sentences: int) -> str:
+    return "".join(f"{i}番目の案内: {SENTENCE}" for i in range(sentences))
+
+
+def _serve(conn, options):
+    with FakeOpenAIServer(**options) as server:
+        conn.send(server.base_url)
+        conn.recv()  # block until the benchmark is done
+
+
+@contextmanager
+def fake_server_process(**options):
+    """Run :class:`FakeOpenAIServer` in a child process and yield its base URL."""
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child, options), daemon=True)
+    process.start()
+    try:
+        yield parent.recv()
+    finally:
+        parent.send(None)
+        process.join()
+
+
+def server_stats(base_url):
+    return requests.get(base_url.rsplit("/v1", 1)[0] + "/_stats", timeout=10).json()
+
+
+class TimedGenerator(AIQAGenerator):
+    """Records the wall time of every request, retries included."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+        self._latency_lock = threading.Lock()
+
+    def _record(self, start):
+        with self._latency_lock:
+            self.latencies.append(time.perf_counter() - start)
+
+    def _create(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super()._create(*args, **kwargs)
+        finally:
+            self._record(start)
+
+    async def _acreate(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super()._acreate(*args, **kwargs)
+        finally:
+            self._record(start)
+
+
+def bench_generator(generator, count, text, concurrency):
+    """``count`` requests from ``concurrency`` workers, so latency excludes queueing."""
+    indices = iter(range(count))
+
+    async def worker():
+        for i in indices:
+            await generator.agenerate_qa_for_category(text, "手続き", cache_variant=i)
+
+    async def run():
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            await generator.aclose()
+
+    asyncio.run(run())
+
+
+def bench_app_loop(generator, text, *, num_categories, questions, block_size, batch_categories):
+    """The Streamlit app's per-chunk loop (``QAEngine.run_chunk``) without the UI.
+
+    Returns the seconds until the first record could be shown: when its pair
+    was streamed in, or otherwise when the first chunk was finished.
+    """
+    start = time.perf_counter()
+    first = []
+
+    def on_record(record):
+        if not first:
+            first.append(time.perf_counter() - start)
+
+    engine = QAEngine(
+        generator,
+        num_categories=num_categories,
+        questions=questions,
+        block_size=block_size,
+        batch_categories=batch_categories,
+        on_record=on_record if generator.stream else None,
+    )
+    for chunk in engine.split(text):
+        engine.run_chunk(chunk, engine.generate_categories(chunk), "benchmark")
+        on_record(None)
+    return first[0]
+
+
+def write_docx(path, text, paragraphs):
+    document = Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(text)
+    document.save(path)
+
+
+def bench_cli(generator, files, workers):
+    sources = [("file", str(path)) for path in files]
+    records, _ = run_pipeline(sources, generator, fetch_workers=4, llm_workers=workers)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Server latency per request (s).")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Extra random latency, up to this (s).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with 429.")
+    parser.add_argument("--retry-after", type=float, default=0.05, help="Retry-After sent with 429s (s).")
+    parser.add_argument("--requests", type=int, default=500, help="Requests in the generator scenario.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Max concurrent requests / LLM workers.")
+    parser.add_argument("--files", type=int, default=20, help="Synthetic files in the cli scenario.")
+    parser.add_argument("--batch-categories", action="store_true", help="Use per-band requests in app-loop.")
+    parser.add_argument("--block-size", type=int, default=1, help="Questions per request in app-loop.")
+    parser.add_argument("--stream", action="store_true", help="Stream Q&A completions.")
+    parser.add_argument(
+        "--stream-interval", type=float, default=0.0, help="Delay between streamed events from the server (s)."
+    )
+    parser.add_argument("--scenario", choices=["generator", "app-loop", "cli"], action="append")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+    scenarios = args.scenario or ["generator", "app-loop", "cli"]
+
+    report = Report(
+        f"generation (latency {args.latency}s+{args.jitter}s, "
+        f"errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%})"
+    )
+    text = synthetic_text(40)
+    with fake_server_process(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        stream_interval=args.stream_interval,
+    ) as base_url, tempfile.TemporaryDirectory() as workdir:
+        files = []
+        for i in range(args.files):
+            path = Path(workdir) / f"doc{i}.docx"
+            write_docx(path, synthetic_text(10), 20)
+            files.append(path)
+
+        runs = {
+            "generator": lambda g: bench_generator(g, args.requests, text, args.concurrency),
+            "app-loop": lambda g: bench_app_loop(
+                g, synthetic_text(400), num_categories=3, questions=10, block_size=args.block_size,
+                batch_categories=args.batch_categories,
+            ),
+            "cli": lambda g: bench_cli(g, files, args.concurrency),
+        }
+        for name in scenarios:
+            generator = TimedGenerator(
+                "benchmark",
+                model="fake-model",
+                base_url=base_url,
+                max_concurrency=args.concurrency,
+                rate_limiter=None,
+                stream=args.stream,
+            )
+            before = server_stats(base_url)
+            with Timer() as timer:
+                first_result = runs[name](generator)
+            after = server_stats(base_url)
+            sent = after["chat_requests"] - before["chat_requests"]
+            tokens = sum(after[k] - before[k] for k in ("prompt_tokens", "completion_tokens"))
+            report.add(
+                name,
+                requests=sent,
+                retries=generator.retries,
+                rps=sent / timer.elapsed,
+                **latency_stats(generator.latencies),
+                tokens_per_s=tokens / timer.elapsed,
+                **({"first_result_ms": first_result * 1000} if isinstance(first_result, float) else {}),
+                seconds=timer.elapsed,
+            )
+
+    report.print_table()
+    report.save(args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Measure HTML-to-text throughput on the saved pages in ``benchmarks/corpus``.
+
+Compares the single-pass extractor (lxml and stdlib engines) with the previous
+BeautifulSoup implementation and checks that every engine produces the same
+text::
+
+    python benchmarks/bench_html_to_text.py --repeat 20
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.html_text import etree, html_to_text
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+
+def beautifulsoup_to_text(html):
+    """The original tree-based implementation, kept as the baseline."""
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup(["script", "style"]):
+        script.extract()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+
+def load_corpus(directory):
+    pages = [p.read_text(encoding="utf-8") for p in sorted(Path(directory).glob("*.html"))]
+    if not pages:
+        raise SystemExit(f"no .html files in {directory}")
+    return pages
+
+
+def measure(convert, pages, repeat):
+    """Return (MB/s, outputs) for converting every page ``repeat`` times."""
+    size = sum(len(page.encode("utf-8")) for page in pages) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        outputs = [convert(page) for page in pages]
+    elapsed = time.perf_counter() - start
+    return size / elapsed / 1e6, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=str(CORPUS_DIR), help="Directory of saved .html pages.")
+    parser.add_argument("--repeat", type=int, default=10, help="Passes over the corpus per engine.")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    engines = [("html.parser", lambda html: html_to_text(html, "html.parser"))]
+    if etree is not None:
+        engines.append(("lxml", lambda html: html_to_text(html, "lxml")))
+
+    total = sum(len(page.encode("utf-8")) for page in pages)
+    print(f"corpus: {len(pages)} pages, {total / 1e6:.2f} MB, repeat {args.repeat}")
+    print(f"{'engine':<14} {'MB/s':>8} {'speedup':>8}  output")
+    baseline_rate, baseline = measure(beautifulsoup_to_text, pages, args.repeat)
+    print(f"{'beautifulsoup':<14} {baseline_rate:>8.2f} {1.0:>7.1f}x  baseline")
+    for name, convert in engines:
+        rate, outputs = measure(convert, pages, args.repeat)
+        same = "identical" if outputs == baseline else "DIFFERS"
+        print(f"{name:<14} {rate:>8.2f} {rate / baseline_rate:>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Embedding export, index build and query latency/recall of the RAG embedding index.
+
+Uses the offline hashing embedder so no API key is needed:
+
+    python benchmarks/bench_retrieval.py --sizes 10000 100000 --nprobe 4 8 16
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from bench_export import synthetic_records
+from common import Report, Timer, latency_stats
+from qna_generator.embeddings import EmbeddingStore, HashingEmbedder, export_embeddings
+
+K = 10
+
+
+def varied_records(count, seed=0):
+    """Synthetic records with enough distinct wording for retrieval to be meaningful."""
+    rng = random.Random(seed)
+    words = ["申請", "窓口", "料金", "予約", "書類", "期限", "住所", "変更", "証明書", "手数料", "郵送", "休日"]
+    records = synthetic_records(count)
+    for record in records:
+        record["question"] = "".join(rng.sample(words, 4)) + record["question"]
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Record counts.")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16], help="IVF lists probed per query.")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per scenario.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    report = Report("retrieval")
+    embedder = HashingEmbedder()
+    with tempfile.TemporaryDirectory() as workdir:
+        for count in sorted(args.sizes):
+            records = varied_records(count)
+            directory = os.path.join(workdir, str(count))
+            with Timer() as timer:
+                export_embeddings(records, directory, embedder)
+            report.add(f"export/{count}", records_per_s=count / timer.elapsed, seconds=timer.elapsed)
+
+            rng = random.Random(1)
+            queries = embedder.embed([rng.choice(records)["question"] for _ in range(args.queries)])
+            with EmbeddingStore(directory) as store:
+                latencies = []
+                exact = []
+                for query in queries:
+                    start = time.perf_counter()
+                    exact.append(set(store.exact_search(query, K).tolist()))
+                    latencies.append(time.perf_counter() - start)
+                report.add(f"brute/{count}", **latency_stats(latencies), recall_at_10=1.0)
+
+                for nprobe in args.nprobe:
+                    latencies = []
+                    hits = 0
+                    for query, truth in zip(queries, exact):
+                        start = time.perf_counter()
+                        _, rows = store.index.search(store.vectors, np.asarray(query), K, nprobe)
+                        latencies.append(time.perf_counter() - start)
+                        hits += len(truth & set(rows.tolist()))
+                    report.add(
+                        f"ivf{store.index.nlist}/nprobe{nprobe}/{count}",
+                        **latency_stats(latencies),
+                        recall_at_10=hits / (K * len(queries)),
+                    )
+    report.print_table()
+    report.save(args.json)
+
+
+if __name__ == "__main__":
+    main()
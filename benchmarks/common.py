@@ -0,0 +1,92 @@
+"""Shared helpers for the benchmark scripts: timing, percentiles, RSS and reporting."""
+
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "tests"))  # fake_openai_server lives next to the tests
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0-100)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 of ``latencies`` in milliseconds."""
+    return {f"p{p}_ms": percentile(latencies, p) * 1000 for p in (50, 95, 99)}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB (``None`` if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+class Report:
+    """Collect one row of metrics per scenario and print them as a table.
+
+    Peak RSS is sampled after each scenario; it is a process-wide high-water
+    mark, so scenarios are best ordered from small to large.
+    """
+
+    def __init__(self, title: str):
+        self.title = title
+        self.rows: List[Dict[str, object]] = []
+
+    def add(self, scenario: str, **metrics) -> None:
+        row = {"scenario": scenario, **metrics, "peak_rss_mb": peak_rss_mb()}
+        self.rows.append(row)
+        print(self._format_row(row), file=sys.stderr)
+
+    @staticmethod
+    def _format_value(value) -> str:
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return "-" if value is None else str(value)
+
+    def _format_row(self, row) -> str:
+        return "  ".join(f"{k}={self._format_value(v)}" for k, v in row.items())
+
+    def print_table(self) -> None:
+        if not self.rows:
+            return
+        columns = list(dict.fromkeys(k for row in self.rows for k in row))
+        cells = [[self._format_value(row.get(c)) for c in columns] for row in self.rows]
+        widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+        print(f"\n{self.title}")
+        print("  ".join(c.ljust(w) if i == 0 else c.rjust(w) for i, (c, w) in enumerate(zip(columns, widths))))
+        for r in cells:
+            print("  ".join(v.ljust(w) if i == 0 else v.rjust(w) for i, (v, w) in enumerate(zip(r, widths))))
+
+    def save(self, path: Optional[str]) -> None:
+        """Write the rows as JSON to ``path`` (for comparing runs), if given."""
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"title": self.title, "rows": self.rows}, f, ensure_ascii=False, indent=2)
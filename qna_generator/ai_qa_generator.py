@@ -1,33 +1,152 @@
-from openai import OpenAI
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    OpenAI,
+    RateLimitError,
+)
+import asyncio
 import logging
 import json
+import time
+
+from qna_generator.budget import OutputBudget
+from qna_generator.cache import make_cache_key
+from qna_generator.rate_limit import backoff_delay, default_rate_limiter
+from qna_generator.streaming import QAPairStreamParser, salvage_qa_pairs
+from qna_generator.tracing import get_tracer, span
+from qna_generator.utils import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_MAX_RETRIES = 5
+CATEGORY_MAX_TOKENS = 50
+MAX_TRUNCATION_SPLITS = 4  # how often a truncated block is split again before giving up
+
+
+def _is_retryable(error):
+    """Return True for throttling, server-side and connection errors."""
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+class TruncatedResponse(Exception):
+    """A completion stopped at ``max_tokens`` (``finish_reason == "length"``)."""
+
+    def __init__(self, content, max_tokens, pairs=None):
+        super().__init__(f"応答が max_tokens={max_tokens} で途切れました")
+        self.content = content or ""
+        self.max_tokens = max_tokens
+        self.pairs = pairs  # pairs already parsed (and emitted) from a stream
+
+
+class _QAStream:
+    """Accumulates one streamed Q&A completion, passing each finished pair to ``on_pair``."""
+
+    def __init__(self, on_pair):
+        self.on_pair = on_pair
+        self.parser = QAPairStreamParser()
+        self.pairs = []
+        self.finish_reason = None
+        self.usage = None
+        self.interrupted = None
+        self._started = time.perf_counter()
+
+    def handle(self, event):
+        if getattr(event, "usage", None) is not None:
+            self.usage = event.usage
+        if not event.choices:
+            return
+        choice = event.choices[0]
+        if choice.delta is not None and choice.delta.content:
+            for pair in self.parser.feed(choice.delta.content):
+                if not self.pairs:
+                    get_tracer().record("openai.first_pair", time.perf_counter() - self._started)
+                self.pairs.append(pair)
+                if self.on_pair is not None:
+                    self.on_pair(pair)
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+
+    def interrupt(self, error):
+        """Keep the pairs of a stream that broke off; re-raise if there are none."""
+        if not self.pairs:
+            raise error
+        logger.warning("Q&A stream interrupted after %d pairs: %s", len(self.pairs), error)
+        self.interrupted = error
+
+
+def _split_variant(variant, depth, part):
+    """Cache variant for one part of a split block, distinct from its siblings."""
+    return [variant, depth, part]
+
+
+def _retry_after(error):
+    """Return the server's Retry-After hint in seconds, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
 
 class AIQAGenerator:
-    def __init__(self, api_key, model="gpt-4o-mini"):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key, model="gpt-4o-mini", max_concurrency=DEFAULT_MAX_CONCURRENCY, cache=None,
+                 rate_limiter=default_rate_limiter, max_retries=DEFAULT_MAX_RETRIES, base_url=None,
+                 output_budget=None, stream=False):
+        # Retries are handled here (with rate-limit awareness), not by the SDK.
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.base_url = base_url
         self.model = model
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.retries = 0
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        # Sizes max_tokens of Q&A requests from the observed answer length.
+        self.output_budget = output_budget if output_budget is not None else OutputBudget()
+        # Stream Q&A completions and parse pairs as they arrive.
+        self.stream = stream
+        # The async client and semaphore are bound to the event loop they were
+        # created on, so they are (re)built lazily per running loop.
+        self._async_client = None
+        self._async_loop = None
+        self._semaphore = None
 
-    def generate_categories(self, text, temperature=0.0, num_categories=3):
+    def _get_async_client(self):
+        """Return the async client and semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            # One client per loop keeps a single keep-alive pool; the semaphore
+            # bounds how many of its connections are used at once.
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, max_retries=0
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._async_loop = loop
+        return self._async_client, self._semaphore
+
+    async def aclose(self):
+        """Close the pooled async connections, if any."""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+            self._async_loop = None
+
+    def category_messages(self, text, num_categories):
+        """Chat messages asking for ``num_categories`` categories of ``text``."""
         prompt = f"""以下のテキストから、関連性の高いカテゴリを{num_categories}つ提案してください。カテゴリは簡潔な名詞で、カンマ区切りで出力してください。\n\nテキスト:\n{text}\n\nカテゴリ:"""
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "あなたはテキストからカテゴリを抽出するAIアシスタントです。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=50
-            )
-            categories = response.choices[0].message.content.strip()
-            return [c.strip() for c in categories.split(",")][:num_categories]
-        except Exception as e:
-            return [f"カテゴリ生成エラー: {e}"]
+        return [
+            {"role": "system", "content": "あなたはテキストからカテゴリを抽出するAIアシスタントです。"},
+            {"role": "user", "content": prompt}
+        ]
 
-    def generate_qa_for_category(self, text, category, temperature=0.0, num_questions=5):
+    def qa_messages(self, text, category, num_questions):
+        """Chat messages asking for ``num_questions`` Q&A pairs of one category as JSON."""
         prompt = (
             f"以下のテキストとカテゴリに基づいて、ユーザーが最も知りたいであろう質問とそれに対する回答を{num_questions}つ生成してください。"
             "回答は必ず提供されたテキストの内容のみから生成し、引用元を明確にしてください。"
@@ -39,17 +158,495 @@ class AIQAGenerator:
             "}\n"
             f"カテゴリ: {category}\nテキスト:\n{text}"
         )
+        return [
+            {"role": "system", "content": "あなたはテキストから質問と回答を生成するAIアシスタントです。回答は必ず提供されたテキストの内容のみから生成し、引用元を明確にしてください。"},
+            {"role": "user", "content": prompt}
+        ]
+
+    def multi_qa_messages(self, text, category_counts):
+        """Chat messages asking for ``{category: count}`` Q&A pairs in one JSON response."""
+        requested = "\n".join(f"- {category}: {count}つ" for category, count in category_counts.items())
+        prompt = (
+            "以下のテキストに基づいて、各カテゴリについてユーザーが最も知りたいであろう質問とそれに対する回答を、指定された数だけ生成してください。"
+            "回答は必ず提供されたテキストの内容のみから生成し、引用元を明確にしてください。"
+            "以下のJSON形式で、カテゴリの順序を保ち、余計な説明やマークダウンを含めずに出力してください:\n"
+            "{\n"
+            '  "categories": [\n'
+            '    {"category": "カテゴリ名", "qa_pairs": [\n'
+            '      {"question": "質問内容", "answer": "回答内容", "source": "引用元のテキスト"}\n'
+            "    ]}\n"
+            "  ]\n"
+            "}\n"
+            f"カテゴリと質問数:\n{requested}\nテキスト:\n{text}"
+        )
+        return [
+            {"role": "system", "content": "あなたはテキストから質問と回答を生成するAIアシスタントです。回答は必ず提供されたテキストの内容のみから生成し、引用元を明確にしてください。"},
+            {"role": "user", "content": prompt}
+        ]
+
+    @staticmethod
+    def parse_categories(content, num_categories):
+        """Split a comma-separated category response."""
+        return [c.strip() for c in content.strip().split(",")][:num_categories]
+
+    def _cache_key(self, messages, temperature, max_tokens, variant):
+        if self.cache is None:
+            return None
+        return make_cache_key(self.model, messages, temperature, max_tokens, variant)
+
+    def _retry_delay(self, error, attempt):
+        """Return how long to wait before retrying ``error``, or None to give up."""
+        if attempt >= self.max_retries or not _is_retryable(error):
+            return None
+        delay = _retry_after(error) or backoff_delay(attempt)
+        if isinstance(error, RateLimitError) and self.rate_limiter is not None:
+            self.rate_limiter.pause(self.model, delay)
+        self.retries += 1
+        logger.warning("OpenAI request failed (%s); retrying in %.1fs", error, delay)
+        return delay
+
+    def _estimate_cost(self, messages, max_tokens):
+        return sum(estimate_tokens(m["content"]) for m in messages) + max_tokens
+
+    @staticmethod
+    def _record_usage(request_span, response):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            request_span.set(
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+            )
+
+    def _create(self, messages, temperature, max_tokens, consume=None, **options):
+        """Send one completion request within the rate limits, retrying transient errors.
+
+        ``options`` are passed to the API (e.g. ``stream=True``); ``consume``,
+        if given, turns the raw response (a stream) into the return value and
+        is retried together with the request.
+        """
+        cost = self._estimate_cost(messages, max_tokens)
+        attempt = 0
+        with span("openai.request", model=self.model, max_tokens=max_tokens) as request_span:
+            while True:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(self.model, cost)
+                try:
+                    response = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        **options,
+                    )
+                    if consume is not None:
+                        response = consume(response)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+                    request_span.set(retries=attempt)
+                    continue
+                self._record_usage(request_span, response)
+                return response
+
+    async def _acreate(self, messages, temperature, max_tokens, consume=None, **options):
+        """Async counterpart of :meth:`_create`; ``consume`` is a coroutine function.
+
+        A consumed stream holds its concurrency slot until it is finished.
+        """
+        cost = self._estimate_cost(messages, max_tokens)
+        client, semaphore = self._get_async_client()
+        attempt = 0
+        with span("openai.request", model=self.model, max_tokens=max_tokens) as request_span:
+            while True:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.aacquire(self.model, cost)
+                try:
+                    async with semaphore:
+                        response = await client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            **options,
+                        )
+                        if consume is not None:
+                            response = await consume(response)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    request_span.set(retries=attempt)
+                    continue
+                self._record_usage(request_span, response)
+                return response
+
+    def _observe_output(self, complete_span, response, content, questions, max_tokens):
+        """Feed the output budget; raise :class:`TruncatedResponse` for cut-off output."""
+        if getattr(response.choices[0], "finish_reason", None) == "length":
+            self.output_budget.observe_truncation(questions, max_tokens)
+            complete_span.set(truncated=1)
+            raise TruncatedResponse(content, max_tokens)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.output_budget.observe(questions, usage.completion_tokens)
+
+    @staticmethod
+    def _parse(parse, content):
+        with span("openai.parse", chars=len(content)):
+            return parse(content)
+
+    def _complete(self, messages, temperature, max_tokens, parse, variant=None, questions=None):
+        """Run a chat completion through the cache and return ``parse(content)``.
+
+        Only responses that ``parse`` accepts are stored, so malformed output
+        is never replayed from the cache.
+
+        ``questions`` marks a Q&A request whose ``max_tokens`` comes from the
+        output budget: its usage updates the budget, a response cut off at
+        ``max_tokens`` raises :class:`TruncatedResponse`, and the cache key
+        ignores ``max_tokens`` so a changing budget does not miss the cache.
+        """
+        with span("openai.complete", cache_hit=False) as complete_span:
+            key = self._cache_key(messages, temperature, None if questions else max_tokens, variant)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    complete_span.set(cache_hit=True)
+                    return self._parse(parse, cached)
+            response = self._create(messages, temperature, max_tokens)
+            content = response.choices[0].message.content
+            if questions:
+                self._observe_output(complete_span, response, content, questions, max_tokens)
+            result = self._parse(parse, content)
+            if key is not None:
+                self.cache.set(key, content)
+            return result
+
+    async def _acomplete(self, messages, temperature, max_tokens, parse, variant=None, questions=None):
+        """Async counterpart of :meth:`_complete`."""
+        with span("openai.complete", cache_hit=False) as complete_span:
+            key = self._cache_key(messages, temperature, None if questions else max_tokens, variant)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    complete_span.set(cache_hit=True)
+                    return self._parse(parse, cached)
+            response = await self._acreate(messages, temperature, max_tokens)
+            content = response.choices[0].message.content
+            if questions:
+                self._observe_output(complete_span, response, content, questions, max_tokens)
+            result = self._parse(parse, content)
+            if key is not None:
+                self.cache.set(key, content)
+            return result
+
+    def _replay_cached(self, complete_span, key, on_pair):
+        cached = self.cache.get(key) if key is not None else None
+        if cached is None:
+            return None
+        complete_span.set(cache_hit=True)
+        result = self._parse(self.parse_qa, cached)
+        if on_pair is not None:
+            for pair in result.get("qa_pairs", []):
+                on_pair(pair)
+        return result
+
+    def _finish_stream(self, complete_span, stream, key, max_tokens, questions):
+        """Turn a consumed stream into the Q&A result, like :meth:`_complete` does for a response."""
+        content = stream.parser.content
+        if stream.finish_reason == "length":
+            self.output_budget.observe_truncation(questions, max_tokens)
+            complete_span.set(truncated=1)
+            raise TruncatedResponse(content, max_tokens, stream.pairs)
+        if stream.interrupted is not None:
+            raise TruncatedResponse(content, max_tokens, stream.pairs)
+        if stream.usage is not None:
+            self.output_budget.observe(questions, stream.usage.completion_tokens)
+        try:
+            result = self._parse(self.parse_qa, content)
+        except ValueError:
+            # Keep the well-formed pairs of a malformed document; it is not cached.
+            complete_span.set(salvaged=len(stream.pairs))
+            logger.warning("malformed Q&A JSON; kept %d streamed pairs", len(stream.pairs))
+            return {"qa_pairs": stream.pairs}
+        if key is not None:
+            self.cache.set(key, content)
+        return result
+
+    def _stream_complete(self, messages, temperature, max_tokens, variant, questions, on_pair):
+        """Streaming counterpart of :meth:`_complete` for Q&A requests.
+
+        Pairs are parsed while the completion arrives and passed to
+        ``on_pair`` as soon as each one is complete.
+        """
+        with span("openai.complete", cache_hit=False, streamed=True) as complete_span:
+            key = self._cache_key(messages, temperature, None, variant)
+            cached = self._replay_cached(complete_span, key, on_pair)
+            if cached is not None:
+                return cached
+
+            def consume(events):
+                stream = _QAStream(on_pair)
+                try:
+                    for event in events:
+                        stream.handle(event)
+                except Exception as e:
+                    stream.interrupt(e)
+                return stream
+
+            stream = self._create(
+                messages, temperature, max_tokens, consume,
+                stream=True, stream_options={"include_usage": True},
+            )
+            return self._finish_stream(complete_span, stream, key, max_tokens, questions)
+
+    async def _astream_complete(self, messages, temperature, max_tokens, variant, questions, on_pair):
+        """Async counterpart of :meth:`_stream_complete`."""
+        with span("openai.complete", cache_hit=False, streamed=True) as complete_span:
+            key = self._cache_key(messages, temperature, None, variant)
+            cached = self._replay_cached(complete_span, key, on_pair)
+            if cached is not None:
+                return cached
+
+            async def consume(events):
+                stream = _QAStream(on_pair)
+                try:
+                    async for event in events:
+                        stream.handle(event)
+                except Exception as e:
+                    stream.interrupt(e)
+                return stream
+
+            stream = await self._acreate(
+                messages, temperature, max_tokens, consume,
+                stream=True, stream_options={"include_usage": True},
+            )
+            return self._finish_stream(complete_span, stream, key, max_tokens, questions)
+
+    @staticmethod
+    def parse_qa(content):
+        """Parse a Q&A response; raise ``ValueError`` for malformed JSON."""
+        return json.loads(content.strip())
+
+    @staticmethod
+    def _parse_multi_qa(content, categories):
+        """Map a multi-category response back to ``{category: {"qa_pairs": [...]}}``.
+
+        Entries whose name does not match a requested category are assigned by
+        position, since models occasionally paraphrase category names.
+        """
+        entries = json.loads(content.strip())["categories"]
+        result = {category: {"qa_pairs": []} for category in categories}
+        for position, entry in enumerate(entries):
+            name = entry.get("category")
+            if name not in result:
+                if position >= len(categories):
+                    continue
+                name = categories[position]
+            result[name]["qa_pairs"].extend(entry.get("qa_pairs", []))
+        return result
+
+    def _truncation_plan(self, error, num_questions, depth):
+        """Split a truncated block: return ``(salvaged_pairs, counts_still_needed)``.
+
+        Complete pairs before the cut are kept and the rest of the block is
+        requested again in two halves, with the (now larger) output budget.
+        """
+        if depth >= MAX_TRUNCATION_SPLITS:
+            raise error
+        pairs = error.pairs if error.pairs is not None else salvage_qa_pairs(error.content)
+        pairs = pairs[:num_questions]
+        remaining = num_questions - len(pairs)
+        logger.info("truncated Q&A block: kept %d pairs, requesting %d more", len(pairs), remaining)
+        if remaining <= 1:
+            return pairs, [remaining] if remaining else []
+        half = (remaining + 1) // 2
+        return pairs, [half, remaining - half]
+
+    @staticmethod
+    def _split_categories(error, category_counts, depth):
+        """Split the categories of a truncated multi-category request in two."""
+        if depth >= MAX_TRUNCATION_SPLITS:
+            raise error
+        items = list(category_counts.items())
+        half = (len(items) + 1) // 2
+        return [dict(items[:half]), dict(items[half:])]
+
+    def _complete_qa(self, text, category, temperature, num_questions, variant, depth=0, on_pair=None):
+        messages = self.qa_messages(text, category, num_questions)
+        max_tokens = self.output_budget.max_tokens(num_questions)
+        try:
+            if self.stream or on_pair is not None:
+                return self._stream_complete(messages, temperature, max_tokens, variant, num_questions, on_pair)
+            return self._complete(messages, temperature, max_tokens, self.parse_qa, variant, questions=num_questions)
+        except TruncatedResponse as e:
+            pairs, counts = self._truncation_plan(e, num_questions, depth)
+            for part, count in enumerate(counts):
+                result = self._complete_qa(
+                    text, category, temperature, count, _split_variant(variant, depth, part), depth + 1, on_pair
+                )
+                pairs.extend(result.get("qa_pairs", []))
+            return {"qa_pairs": pairs}
+
+    async def _acomplete_qa(self, text, category, temperature, num_questions, variant, depth=0, on_pair=None):
+        messages = self.qa_messages(text, category, num_questions)
+        max_tokens = self.output_budget.max_tokens(num_questions)
+        try:
+            if self.stream or on_pair is not None:
+                return await self._astream_complete(messages, temperature, max_tokens, variant, num_questions, on_pair)
+            return await self._acomplete(
+                messages, temperature, max_tokens, self.parse_qa, variant, questions=num_questions
+            )
+        except TruncatedResponse as e:
+            pairs, counts = self._truncation_plan(e, num_questions, depth)
+            results = await asyncio.gather(
+                *(
+                    self._acomplete_qa(
+                        text, category, temperature, count, _split_variant(variant, depth, part), depth + 1, on_pair
+                    )
+                    for part, count in enumerate(counts)
+                )
+            )
+            for result in results:
+                pairs.extend(result.get("qa_pairs", []))
+            return {"qa_pairs": pairs}
+
+    def _complete_multi_qa(self, text, category_counts, temperature, variant, depth=0):
+        if len(category_counts) == 1:
+            # A single category is cheaper to continue with the per-category prompt.
+            [(category, count)] = category_counts.items()
+            return {category: self._complete_qa(text, category, temperature, count, variant, depth)}
+        total = sum(category_counts.values())
+        max_tokens = self.output_budget.max_tokens(total, sections=len(category_counts))
+        try:
+            return self._complete(
+                self.multi_qa_messages(text, category_counts),
+                temperature,
+                max_tokens,
+                lambda content: self._parse_multi_qa(content, list(category_counts)),
+                variant,
+                questions=total,
+            )
+        except TruncatedResponse as e:
+            parts = self._split_categories(e, category_counts, depth)
+            result = {}
+            for part, counts in enumerate(parts):
+                result.update(
+                    self._complete_multi_qa(text, counts, temperature, _split_variant(variant, depth, part), depth + 1)
+                )
+            return result
+
+    async def _acomplete_multi_qa(self, text, category_counts, temperature, variant, depth=0):
+        if len(category_counts) == 1:
+            [(category, count)] = category_counts.items()
+            return {category: await self._acomplete_qa(text, category, temperature, count, variant, depth)}
+        total = sum(category_counts.values())
+        max_tokens = self.output_budget.max_tokens(total, sections=len(category_counts))
+        try:
+            return await self._acomplete(
+                self.multi_qa_messages(text, category_counts),
+                temperature,
+                max_tokens,
+                lambda content: self._parse_multi_qa(content, list(category_counts)),
+                variant,
+                questions=total,
+            )
+        except TruncatedResponse as e:
+            parts = self._split_categories(e, category_counts, depth)
+            results = await asyncio.gather(
+                *(
+                    self._acomplete_multi_qa(text, counts, temperature, _split_variant(variant, depth, part), depth + 1)
+                    for part, counts in enumerate(parts)
+                )
+            )
+            return {category: entry for result in results for category, entry in result.items()}
+
+    def generate_categories(self, text, temperature=0.0, num_categories=3):
+        """Return up to ``num_categories`` categories for ``text``.
+
+        The return type differs by outcome: a list of category names on
+        success, and ``{"error": message}`` on failure, as in
+        :meth:`generate_qa_for_category`. Failures used to be returned as a
+        one-element list holding the error message, which could be mistaken
+        for a category; callers must now check for a dict.
+        """
+        try:
+            return self._complete(
+                self.category_messages(text, num_categories),
+                temperature,
+                CATEGORY_MAX_TOKENS,
+                lambda content: self.parse_categories(content, num_categories),
+            )
+        except Exception as e:
+            return {"error": f"カテゴリ生成エラー: {e}"}
+
+    def generate_qa_for_category(self, text, category, temperature=0.0, num_questions=5, cache_variant=None,
+                                 on_pair=None):
+        """Generate ``num_questions`` Q&A pairs for ``category``.
+
+        ``cache_variant`` separates cache entries for repeated requests with
+        identical parameters, such as consecutive blocks at one temperature.
+
+        ``max_tokens`` is sized from :attr:`output_budget`; a response cut off
+        at that limit is not an error: its complete pairs are kept and the
+        rest of the block is requested again in smaller parts.
+
+        With ``on_pair`` (or ``stream=True`` on the generator) the completion
+        is streamed: each pair is passed to ``on_pair`` as soon as it has
+        arrived, and the well-formed pairs of a malformed or interrupted
+        response are kept instead of failing the whole block.
+        """
+        try:
+            return self._complete_qa(text, category, temperature, num_questions, cache_variant, on_pair=on_pair)
+        except Exception as e:
+            return {"error": f"Q&A生成エラー: {e}"}
+
+    async def agenerate_categories(self, text, temperature=0.0, num_categories=3):
+        """Async counterpart of :meth:`generate_categories`; also returns ``{"error": message}`` on failure."""
+        try:
+            return await self._acomplete(
+                self.category_messages(text, num_categories),
+                temperature,
+                CATEGORY_MAX_TOKENS,
+                lambda content: self.parse_categories(content, num_categories),
+            )
+        except Exception as e:
+            return {"error": f"カテゴリ生成エラー: {e}"}
+
+    async def agenerate_qa_for_category(self, text, category, temperature=0.0, num_questions=5, cache_variant=None,
+                                        on_pair=None):
+        """Async counterpart of :meth:`generate_qa_for_category`.
+
+        At most ``max_concurrency`` requests are in flight at once per event
+        loop; they share one pooled HTTP connection set.
+        """
+        try:
+            return await self._acomplete_qa(text, category, temperature, num_questions, cache_variant, on_pair=on_pair)
+        except Exception as e:
+            return {"error": f"Q&A生成エラー: {e}"}
+
+    def generate_qa_for_categories(self, text, category_counts, temperature=0.0, cache_variant=None):
+        """Generate Q&A pairs for several categories of one text in a single request.
+
+        ``category_counts`` maps each category to the number of questions
+        wanted. The text is sent once instead of once per category, so prompt
+        tokens and round-trips drop accordingly. A truncated response is
+        retried with the categories split in two. Returns
+        ``{"categories": {category: {"qa_pairs": [...]}}}`` or ``{"error": ...}``.
+        """
+        try:
+            return {"categories": self._complete_multi_qa(text, category_counts, temperature, cache_variant)}
+        except Exception as e:
+            return {"error": f"Q&A生成エラー: {e}"}
+
+    async def agenerate_qa_for_categories(self, text, category_counts, temperature=0.0, cache_variant=None):
+        """Async counterpart of :meth:`generate_qa_for_categories`."""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "あなたはテキストから質問と回答を生成するAIアシスタントです。回答は必ず提供されたテキストの内容のみから生成し、引用元を明確にしてください。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=1000
-            )
-            qa_pairs_raw = response.choices[0].message.content.strip()
-            return json.loads(qa_pairs_raw)
+            return {"categories": await self._acomplete_multi_qa(text, category_counts, temperature, cache_variant)}
         except Exception as e:
             return {"error": f"Q&A生成エラー: {e}"}
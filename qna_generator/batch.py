@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from qna_generator.ai_qa_generator import CATEGORY_MAX_TOKENS, MAX_TRUNCATION_SPLITS, AIQAGenerator
+from qna_generator.pipeline import QAEngine, make_record
+from qna_generator.streaming import salvage_qa_pairs
+
+logger = logging.getLogger(__name__)
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# One successful request of a batch; ``truncated`` when it stopped at ``max_tokens``.
+Completion = namedtuple("Completion", "content truncated completion_tokens")
+
+# A Q&A request: (document, chunk, category) it belongs to, its position among
+# that unit's blocks and their split parts, temperature and question count.
+_QARequest = namedtuple("_QARequest", "unit path temperature questions")
+
+
+class BatchRunner:
+    """Run chat completion requests through the OpenAI Batch API.
+
+    Requests are built with the same prompt builders as ``generator`` and sent
+    with ``generator.client``, so pointing that client at another ``base_url``
+    (e.g. a local stand-in server) is enough to redirect the whole flow.
+
+    Each batch input file is written under a unique name in ``workdir`` (the
+    system temporary directory by default) and removed once uploaded, so
+    concurrent runs never overwrite each other's input.
+    """
+
+    def __init__(
+        self,
+        generator: AIQAGenerator,
+        workdir: Optional[str] = None,
+        poll_interval: float = 30.0,
+        completion_window: str = "24h",
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.generator = generator
+        self.client = generator.client
+        self.workdir = workdir
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self._sleep = sleep
+
+    def request_line(self, custom_id: str, messages: List[dict], max_tokens: int, temperature: float = 0.0) -> dict:
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": CHAT_ENDPOINT,
+            "body": {
+                "model": self.generator.model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+        }
+
+    def submit(self, requests: List[dict], name: str) -> str:
+        """Upload ``requests`` as a batch input file and start the batch; return its id."""
+        fd, path = tempfile.mkstemp(prefix=f"{name}_", suffix="_input.jsonl", dir=self.workdir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for request in requests:
+                    f.write(json.dumps(request, ensure_ascii=False))
+                    f.write("\n")
+            with open(path, "rb") as f:
+                input_file = self.client.files.create(file=f, purpose="batch")
+        finally:
+            os.remove(path)
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        logger.info("submitted batch %s with %d requests", batch.id, len(requests))
+        return batch.id
+
+    def wait(self, batch_id: str):
+        """Poll until the batch reaches a terminal status and return it."""
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                return batch
+            logger.info("batch %s is %s", batch_id, batch.status)
+            self._sleep(self.poll_interval)
+
+    def results(self, batch) -> Dict[str, Completion]:
+        """Return ``custom_id -> Completion`` for the successful requests of ``batch``."""
+        if batch.status != "completed":
+            raise RuntimeError(f"バッチ処理エラー: バッチ{batch.id}の状態が{batch.status}です")
+        contents: Dict[str, Completion] = {}
+        if not batch.output_file_id:
+            return contents
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                logger.warning("batch request %s failed: %s", item.get("custom_id"), item.get("error") or response)
+                continue
+            choice = response["body"]["choices"][0]
+            usage = response["body"].get("usage") or {}
+            contents[item["custom_id"]] = Completion(
+                choice["message"]["content"] or "",
+                choice.get("finish_reason") == "length",
+                usage.get("completion_tokens", 0),
+            )
+        return contents
+
+    def run(self, requests: List[dict], name: str) -> Dict[str, Completion]:
+        if not requests:
+            return {}
+        return self.results(self.wait(self.submit(requests, name)))
+
+
+def _generate_blocks(
+    runner: BatchRunner,
+    chunks: List[List[str]],
+    categories: Dict[Tuple[int, int], List[str]],
+    requests: Dict[str, _QARequest],
+) -> Dict[Tuple[int, int, int], Dict[tuple, Tuple[float, list]]]:
+    """Run Q&A ``requests``; return ``{unit: {path: (temperature, pairs)}}``.
+
+    As in :meth:`AIQAGenerator.generate_qa_for_category`, a block cut off at
+    ``max_tokens`` keeps its complete pairs and the rest is requested again in
+    two halves (here in a follow-up batch), with the output budget grown from
+    the truncation.
+    """
+    generator = runner.generator
+    budget = generator.output_budget
+    blocks: Dict[Tuple[int, int, int], Dict[tuple, Tuple[float, list]]] = {}
+    for depth in range(MAX_TRUNCATION_SPLITS + 1):
+        if not requests:
+            break
+        max_tokens: Dict[str, int] = {}
+        lines = []
+        for custom_id, request in requests.items():
+            d, c, k = request.unit
+            max_tokens[custom_id] = budget.max_tokens(request.questions)
+            messages = generator.qa_messages(chunks[d][c], categories[d, c][k], request.questions)
+            lines.append(runner.request_line(custom_id, messages, max_tokens[custom_id], request.temperature))
+        completions = runner.run(lines, f"qa{depth}" if depth else "qa")
+        retries: Dict[str, _QARequest] = {}
+        for custom_id, request in requests.items():
+            completion = completions.get(custom_id)
+            if completion is None:
+                continue
+            if completion.truncated:
+                budget.observe_truncation(request.questions, max_tokens[custom_id])
+                pairs = salvage_qa_pairs(completion.content)[: request.questions]
+                remaining = request.questions - len(pairs)
+                if depth == MAX_TRUNCATION_SPLITS:
+                    logger.warning(
+                        "truncated Q&A block %s: kept %d of %d pairs", custom_id, len(pairs), request.questions
+                    )
+                else:
+                    logger.info(
+                        "truncated Q&A block %s: kept %d pairs, requesting %d more", custom_id, len(pairs), remaining
+                    )
+                    half = (remaining + 1) // 2
+                    for part, count in enumerate([half, remaining - half]):
+                        if count:
+                            retries[f"{custom_id}-{part}"] = request._replace(
+                                path=request.path + (part,), questions=count
+                            )
+            else:
+                try:
+                    pairs = generator.parse_qa(completion.content).get("qa_pairs", [])
+                except ValueError as e:
+                    logger.warning("invalid Q&A JSON for %s: %s", custom_id, e)
+                    continue
+                budget.observe(request.questions, completion.completion_tokens)
+            blocks.setdefault(request.unit, {})[request.path] = (request.temperature, pairs)
+        requests = retries
+    return blocks
+
+
+def generate_with_batches(
+    documents: List[Tuple[str, str]],
+    runner: BatchRunner,
+    *,
+    engine: Optional[QAEngine] = None,
+) -> Iterator[dict]:
+    """Generate Q&A records for ``(source_info, text)`` documents with the Batch API.
+
+    The first batch proposes categories for every chunk, the second generates
+    Q&A for every (chunk, category). Chunking, question counts, block size
+    and temperatures come from ``engine`` (by default a :class:`QAEngine`
+    with its default settings), so each block of :meth:`QAEngine.generate_category`
+    becomes one request. Blocks cut off at ``max_tokens`` are completed in
+    follow-up batches. Records are yielded in document, chunk, category and
+    block order; units whose request failed or could not be parsed are
+    logged and skipped.
+    """
+
+    generator = runner.generator
+    if engine is None:
+        engine = QAEngine(generator)
+    chunks = [engine.split(text) for _, text in documents]
+
+    category_requests = [
+        runner.request_line(
+            f"categories-{d}-{c}",
+            generator.category_messages(chunk, engine.num_categories),
+            CATEGORY_MAX_TOKENS,
+        )
+        for d, doc_chunks in enumerate(chunks)
+        for c, chunk in enumerate(doc_chunks)
+    ]
+    category_completions = runner.run(category_requests, "categories")
+
+    categories: Dict[Tuple[int, int], List[str]] = {}
+    qa_requests: Dict[str, _QARequest] = {}
+    for d, doc_chunks in enumerate(chunks):
+        for c in range(len(doc_chunks)):
+            completion = category_completions.get(f"categories-{d}-{c}")
+            if completion is None:
+                continue
+            categories[d, c] = generator.parse_categories(completion.content, engine.num_categories)
+            for k, count in enumerate(engine.question_counts(len(categories[d, c]))):
+                for b, (temperature, n) in enumerate(engine.plan_blocks(count)):
+                    qa_requests[f"qa-{d}-{c}-{k}-{b}"] = _QARequest((d, c, k), (b,), temperature, n)
+    blocks = _generate_blocks(runner, chunks, categories, qa_requests)
+
+    for d, (source_info, _) in enumerate(documents):
+        for c in range(len(chunks[d])):
+            for k, category in enumerate(categories.get((d, c), [])):
+                unit_blocks = blocks.get((d, c, k), {})
+                for path in sorted(unit_blocks):
+                    temperature, pairs = unit_blocks[path]
+                    for qa in pairs:
+                        yield make_record(qa, category, source_info, temperature)
@@ -0,0 +1,67 @@
+import math
+import threading
+
+DEFAULT_TOKENS_PER_QUESTION = 120  # question, answer and quoted source
+JSON_OVERHEAD_TOKENS = 30  # {"qa_pairs": [...]} wrapper, per category
+MAX_OUTPUT_TOKENS = 16384  # output limit of the gpt-4o family
+HEADROOM = 1.5
+SMOOTHING = 0.2
+TRUNCATION_GROWTH = 1.5
+
+
+class OutputBudget:
+    """Size ``max_tokens`` of Q&A requests from the observed tokens per question.
+
+    A fixed ``max_tokens`` either truncates large blocks into invalid JSON or
+    reserves far more of the TPM budget than small blocks use. The budget is
+    ``overhead + num_questions * tokens_per_question * headroom``, where
+    ``tokens_per_question`` is an exponential moving average of completed
+    responses and grows whenever a response is cut off at ``max_tokens``.
+    """
+
+    def __init__(
+        self,
+        tokens_per_question: float = DEFAULT_TOKENS_PER_QUESTION,
+        *,
+        overhead: int = JSON_OVERHEAD_TOKENS,
+        headroom: float = HEADROOM,
+        smoothing: float = SMOOTHING,
+        limit: int = MAX_OUTPUT_TOKENS,
+    ):
+        self.tokens_per_question = float(tokens_per_question)
+        self.overhead = overhead
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.limit = limit
+        self.observed = 0
+        self.truncated = 0
+        self._lock = threading.Lock()
+
+    def max_tokens(self, num_questions: int, *, sections: int = 1) -> int:
+        """Output budget for ``num_questions`` questions spread over ``sections`` categories."""
+        with self._lock:
+            per_question = self.tokens_per_question
+        budget = self.overhead * sections + num_questions * per_question * self.headroom
+        return min(self.limit, math.ceil(budget))
+
+    def observe(self, num_questions: int, completion_tokens: int) -> None:
+        """Fold a complete response's token usage into the running average."""
+        if num_questions <= 0 or completion_tokens <= 0:
+            return
+        sample = max(1.0, (completion_tokens - self.overhead) / num_questions)
+        with self._lock:
+            self.observed += 1
+            self.tokens_per_question += self.smoothing * (sample - self.tokens_per_question)
+
+    def observe_truncation(self, num_questions: int, max_tokens: int) -> None:
+        """Grow the estimate after a response hit ``max_tokens`` before finishing."""
+        floor = (max_tokens - self.overhead) / max(1, num_questions)
+        with self._lock:
+            self.truncated += 1
+            self.tokens_per_question = max(self.tokens_per_question, floor) * TRUNCATION_GROWTH
+
+    def summary(self) -> str:
+        return (
+            f"output budget: {self.tokens_per_question:.0f} tokens/question "
+            f"from {self.observed} responses, {self.truncated} truncated"
+        )
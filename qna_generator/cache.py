@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+DEFAULT_CACHE_PATH = os.environ.get("QNA_CACHE_PATH", ".qna_cache.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+
+def make_cache_key(model, messages, temperature, max_tokens, variant=None) -> str:
+    """Return a content hash identifying one completion request.
+
+    ``variant`` distinguishes otherwise identical requests whose results are
+    expected to differ (e.g. successive blocks generated with the same prompt).
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    if variant is not None:
+        payload["variant"] = variant
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Persistent, size-bounded LRU cache of completion texts backed by SQLite.
+
+    The database can be shared between processes (e.g. the CLI and the
+    Streamlit app). When the stored payload exceeds ``max_bytes`` the least
+    recently used entries are evicted. ``hits`` and ``misses`` count lookups
+    made through this instance.
+
+    ``table`` selects an independent cache in the same file, with its own
+    entries and size budget (e.g. the fetcher's pages next to the completions).
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES, table: str = "entries"):
+        if not table.isidentifier():
+            raise ValueError(f"不正なキャッシュテーブル名です: {table}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.table = table
+        # The completion cache keeps its original size row so existing files stay valid.
+        self._size_name = "total_size" if table == "entries" else f"{table}_size"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table}(last_access)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            f"INSERT OR IGNORE INTO meta VALUES (?, (SELECT COALESCE(SUM(size), 0) FROM {table}))",
+            (self._size_name,),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                delta = size - (row[0] if row else 0)
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                    (key, value, size, time.time()),
+                )
+                total = self._add_total(delta)
+                if total > self.max_bytes:
+                    self._evict(total - self.max_bytes)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _add_total(self, delta: int) -> int:
+        self._conn.execute(
+            "UPDATE meta SET value = value + ? WHERE name = ?", (delta, self._size_name)
+        )
+        return self._conn.execute(
+            "SELECT value FROM meta WHERE name = ?", (self._size_name,)
+        ).fetchone()[0]
+
+    def _evict(self, excess: int) -> None:
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY last_access"
+        ):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
+        self._add_total(-freed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size_bytes": size}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.execute("UPDATE meta SET value = 0 WHERE name = ?", (self._size_name,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+Unit = Tuple[Any, ...]
+
+
+def _unit_key(unit: Unit) -> str:
+    return json.dumps(list(unit), ensure_ascii=False)
+
+
+class Journal:
+    """Append-only JSONL journal of completed work units.
+
+    Each line stores a unit key (e.g. ``("qa", source, chunk, category)``)
+    and the value produced for it. Lines are flushed and fsynced as they are
+    written, so a crashed run loses at most the unit in flight. Only the file
+    offset of each entry is kept in memory; values are read back on demand.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self._offsets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, "a+b")
+        else:
+            self._file = open(path, "w+b")
+
+    def _load(self) -> None:
+        good_end = 0
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn write from a crash; drop it and everything after
+                if not line.endswith(b"\n"):
+                    break
+                self._offsets[_unit_key(entry["unit"])] = offset
+                offset += len(line)
+                good_end = offset
+        if good_end != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def is_done(self, unit: Unit) -> bool:
+        return _unit_key(unit) in self._offsets
+
+    def get(self, unit: Unit) -> Any:
+        """Return the value recorded for ``unit``. Raises ``KeyError`` if absent."""
+        offset = self._offsets[_unit_key(unit)]
+        with self._lock:
+            self._file.seek(offset)
+            line = self._file.readline()
+        return json.loads(line)["value"]
+
+    def record(self, unit: Unit, value: Any) -> None:
+        line = json.dumps({"unit": list(unit), "value": value}, ensure_ascii=False)
+        data = (line + "\n").encode("utf-8")
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._offsets[_unit_key(unit)] = offset
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
@@ -1,28 +1,389 @@
 import argparse
+import logging
 import os
-from typing import List
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
 
 from qna_generator.ai_qa_generator import AIQAGenerator
-from qna_generator.data_processor import (
-    extract_text_from_url,
-    extract_text_from_pdf,
-    extract_text_from_docx,
-)
-from qna_generator.data_exporter import export_to_jsonl
+from qna_generator.batch import BatchRunner, generate_with_batches
+from qna_generator.cache import DEFAULT_CACHE_PATH, ResponseCache
+from qna_generator.checkpoint import Journal
+from qna_generator.rate_limit import DEFAULT_LIMITS, FALLBACK_LIMITS, RateLimiter
+from qna_generator.data_processor import extract_text_from_source, iter_text_from_source, source_info
+from qna_generator.data_exporter import JsonlWriter, export_to_parquet, iter_jsonl
+from qna_generator.dedup import DEFAULT_THRESHOLD, NearDuplicateFilter
+from qna_generator.fetcher import Fetcher, open_page_cache
+from qna_generator.manifest import Manifest
+from qna_generator.pipeline import DEFAULT_CHUNK_TOKENS, QAEngine
+from qna_generator.tracing import JsonlSpanSink, OpenTelemetrySpanSink, Tracer, set_tracer
+from qna_generator.utils import read_lines
 
+logger = logging.getLogger(__name__)
 
-def _read_lines(path: str) -> List[str]:
-    with open(path, "r", encoding="utf-8") as f:
-        return [line.strip() for line in f if line.strip()]
+PROGRESS_INTERVAL = 1.0  # seconds between progress lines
 
 
-def _extract_text_from_file(path: str) -> str:
-    ext = os.path.splitext(path)[1].lower()
-    if ext == ".pdf":
-        return extract_text_from_pdf(path)
-    if ext == ".docx":
-        return extract_text_from_docx(path)
-    raise ValueError(f"Unsupported file type: {path}")
+class StageStats:
+    """Thread-safe counters and timings for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def submit(self, pool: ThreadPoolExecutor, func: Callable, *args):
+        with self._lock:
+            self.submitted += 1
+        return pool.submit(self._run, func, *args)
+
+    def _run(self, func: Callable, *args):
+        start = time.perf_counter()
+        with self._lock:
+            if self._started is None:
+                self._started = start
+        try:
+            return func(*args)
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.completed += 1
+                self.busy_seconds += end - start
+                self._finished = end
+
+    def mark_failed(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    @property
+    def wall_seconds(self) -> float:
+        if self._started is None or self._finished is None:
+            return 0.0
+        return self._finished - self._started
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}: {self.completed}/{self.submitted} done, "
+            f"{self.failed} failed, busy {self.busy_seconds:.1f}s, "
+            f"wall {self.wall_seconds:.1f}s"
+        )
+
+
+def _stream_chunks(engine: QAEngine, kind: str, value: str, fetcher: Optional[Fetcher], handoff: Future) -> None:
+    """Fetch-stage task: extract a source and pass on each chunk as soon as it is complete.
+
+    ``handoff`` resolves to ``(chunk, next_handoff)`` for every chunk and to
+    ``None`` after the last one, or to the extraction error, so the
+    coordinator can wait on it like on any other future.
+    """
+    try:
+        for chunk in engine.iter_chunks(iter_text_from_source(kind, value, fetcher)):
+            following = Future()
+            handoff.set_result((chunk, following))
+            handoff = following
+    except Exception as e:
+        handoff.set_exception(e)
+    else:
+        handoff.set_result(None)
+
+
+def run_pipeline(
+    sources: List[Tuple[str, str]],
+    generator: AIQAGenerator,
+    *,
+    fetch_workers: int = 4,
+    llm_workers: int = 8,
+    journal: Optional[Journal] = None,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    sink: Optional[Callable[[dict], None]] = None,
+    fetcher: Optional[Fetcher] = None,
+    manifest: Optional[Manifest] = None,
+    engine: Optional[QAEngine] = None,
+) -> Tuple[List[dict], Dict[str, StageStats]]:
+    """Generate Q&A records for ``sources`` with a two-stage pipeline.
+
+    ``sources`` is a list of ``(kind, value)`` tuples where ``kind`` is
+    ``"url"`` or ``"file"``. Text extraction runs on a pool of
+    ``fetch_workers`` threads and every OpenAI call (categories and Q&A) on a
+    separate pool of ``llm_workers`` threads, so a slow download never blocks
+    generation for sources that are already extracted. Documents are chunked
+    while they are extracted (PDFs page by page, see
+    :func:`~qna_generator.data_processor.iter_text_from_source`), and each
+    chunk goes to the OpenAI pool as soon as it is complete, before the rest
+    of the document has been read. Records are produced in
+    input order (source, chunk, category) regardless of completion order.
+    Sources that fail are logged and skipped.
+
+    Categories and Q&A are generated by ``engine`` (by default a
+    :class:`~qna_generator.pipeline.QAEngine` with ``chunk_tokens`` and five
+    questions per category in one request), so the question counts, block
+    size and temperature schedule match the Streamlit app. Each category of
+    each chunk is one unit on the OpenAI pool.
+
+    When ``sink`` is given, each record is passed to it as soon as every
+    earlier source has finished, and the returned list is empty. Only a
+    bounded window of sources is in flight at once, so memory use does not
+    grow with the number of sources.
+
+    URLs are downloaded through ``fetcher`` when given (see
+    :class:`~qna_generator.fetcher.Fetcher`).
+
+    When a :class:`Journal` is given, every completed unit is appended to it
+    and units it already contains are reused instead of being regenerated.
+    Fully completed sources are not even fetched again.
+
+    When a :class:`Manifest` is given, chunks whose content hash matches the
+    previous run reuse its records instead of being regenerated, and every
+    emitted chunk is written to the new manifest. Sources that fail keep their
+    previous entries.
+    """
+
+    if engine is None:
+        engine = QAEngine(generator, chunk_tokens=chunk_tokens)
+    stats = {"fetch": StageStats("fetch"), "llm": StageStats("llm")}
+    collected: List[dict] = []
+    emit = collected.append if sink is None else sink
+    window = 2 * max(fetch_workers, llm_workers)
+    # results[source][chunk][category] -> list of records; released once emitted
+    results: Dict[int, List[List[List[dict]]]] = {}
+    remaining: Dict[int, int] = {}  # unresolved extraction/categories/qa units per source
+    hashes: Dict[int, List[str]] = {}  # chunk content hashes per source (with a manifest)
+    failed = set()
+    finished = set()
+    next_admit = 0
+    next_emit = 0
+    last_progress = time.monotonic()
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, ThreadPoolExecutor(
+        max_workers=llm_workers
+    ) as llm_pool:
+
+        def unit_resolved(index: int) -> None:
+            remaining[index] -= 1
+            if remaining[index] == 0:
+                finished.add(index)
+                if index not in failed and journal is not None:
+                    if manifest is not None:
+                        journal.record(("hashes", sources[index][1]), hashes[index])
+                    journal.record(("source", sources[index][1]), len(results[index]))
+
+        def qa_done(index: int, chunk_index: int, category_index: int, records: List[dict]) -> None:
+            results[index][chunk_index][category_index] = records
+            unit_resolved(index)
+
+        def categories_done(index: int, chunk_index: int, chunk: str, categories: List[str]) -> None:
+            kind, value = sources[index]
+            results[index][chunk_index] = [[] for _ in categories]
+            remaining[index] += len(categories)
+            counts = engine.question_counts(len(categories))
+            for category_index, (category, count) in enumerate(zip(categories, counts)):
+                unit = ("qa", value, chunk_index, category)
+                if journal is not None and journal.is_done(unit):
+                    qa_done(index, chunk_index, category_index, journal.get(unit))
+                    continue
+                future = stats["llm"].submit(
+                    llm_pool,
+                    engine.generate_category,
+                    chunk,
+                    category,
+                    count,
+                    source_info(kind, value),
+                )
+                pending[future] = ("qa", index, chunk_index, category_index, category)
+            unit_resolved(index)
+
+        def chunk_ready(index: int, chunk_index: int, chunk: str) -> None:
+            value = sources[index][1]
+            results[index].append([])
+            remaining[index] += 1
+            if manifest is not None:
+                hashes[index].append(manifest.chunk_hash(chunk))
+                records = manifest.lookup(value, hashes[index][chunk_index])
+                if records is not None:
+                    if journal is not None:
+                        journal.record(("reused", value, chunk_index), records)
+                    results[index][chunk_index] = [records]
+                    unit_resolved(index)
+                    return
+            unit = ("categories", value, chunk_index)
+            if journal is not None and journal.is_done(unit):
+                categories_done(index, chunk_index, chunk, journal.get(unit))
+                return
+            future = stats["llm"].submit(llm_pool, engine.generate_categories, chunk)
+            pending[future] = ("categories", index, chunk_index, chunk)
+
+        def admit(index: int) -> None:
+            kind, value = sources[index]
+            if journal is not None and journal.is_done(("source", value)):
+                # Replayed from the journal when it is this source's turn to emit.
+                finished.add(index)
+                return
+            results[index] = []
+            remaining[index] = 1  # the extraction itself, resolved after the last chunk
+            if manifest is not None:
+                hashes[index] = []
+            handoff = Future()
+            stats["fetch"].submit(fetch_pool, _stream_chunks, engine, kind, value, fetcher, handoff)
+            pending[handoff] = ("chunk", index, 0)
+
+        def emit_chunk(
+            value: str, chunk_index: int, chunk_hashes: Optional[List[str]], records: List[dict]
+        ) -> None:
+            for record in records:
+                emit(record)
+            if chunk_hashes is not None:
+                manifest.record(value, chunk_index, chunk_hashes[chunk_index], records)
+
+        def emit_source(index: int) -> None:
+            value = sources[index][1]
+            if index in failed:
+                # Partial results are still emitted, but the manifest keeps the
+                # previous run's entries for this source.
+                hashes.pop(index, None)
+                for per_chunk in results.pop(index, []):
+                    for per_category in per_chunk:
+                        for record in per_category:
+                            emit(record)
+                if manifest is not None:
+                    manifest.keep(value)
+                return
+            if index in results:
+                chunk_hashes = hashes.pop(index, None)
+                for chunk_index, per_chunk in enumerate(results.pop(index)):
+                    records = [record for per_category in per_chunk for record in per_category]
+                    emit_chunk(value, chunk_index, chunk_hashes, records)
+                return
+            chunk_hashes = None
+            if manifest is not None and journal.is_done(("hashes", value)):
+                chunk_hashes = journal.get(("hashes", value))
+            for chunk_index in range(journal.get(("source", value))):
+                if journal.is_done(("reused", value, chunk_index)):
+                    records = journal.get(("reused", value, chunk_index))
+                else:
+                    records = [
+                        record
+                        for category in journal.get(("categories", value, chunk_index))
+                        for record in journal.get(("qa", value, chunk_index, category))
+                    ]
+                emit_chunk(value, chunk_index, chunk_hashes, records)
+
+        while next_emit < len(sources):
+            while next_admit < len(sources) and next_admit < next_emit + window:
+                admit(next_admit)
+                next_admit += 1
+            while next_emit in finished:
+                emit_source(next_emit)
+                finished.discard(next_emit)
+                remaining.pop(next_emit, None)
+                next_emit += 1
+            if not pending:
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, index, *extra = pending.pop(future)
+                kind, value = sources[index]
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    stats["fetch" if stage == "chunk" else "llm"].mark_failed()
+                    logger.warning("%s failed for %s: %s", "fetch" if stage == "chunk" else stage, value, e)
+                    failed.add(index)
+                    unit_resolved(index)
+                    continue
+
+                if stage == "chunk":
+                    (chunk_index,) = extra
+                    if outcome is None:
+                        unit_resolved(index)  # extraction finished
+                    else:
+                        chunk, following = outcome
+                        pending[following] = ("chunk", index, chunk_index + 1)
+                        chunk_ready(index, chunk_index, chunk)
+                elif stage == "categories":
+                    chunk_index, chunk = extra
+                    if journal is not None:
+                        journal.record(("categories", value, chunk_index), outcome)
+                    categories_done(index, chunk_index, chunk, outcome)
+                else:
+                    chunk_index, category_index, category = extra
+                    if journal is not None:
+                        journal.record(("qa", value, chunk_index, category), outcome)
+                    qa_done(index, chunk_index, category_index, outcome)
+
+            now = time.monotonic()
+            if now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                print(" | ".join(s.summary() for s in stats.values()), file=sys.stderr)
+
+    return collected, stats
+
+
+def _dedup_sink(
+    dedup: NearDuplicateFilter, writer: JsonlWriter, dropped: JsonlWriter
+) -> Callable[[dict], None]:
+    """Return a sink that writes kept records and logs near-duplicates to ``dropped``."""
+
+    def sink(record: dict) -> None:
+        duplicate = dedup.check(record)
+        if duplicate is None:
+            writer.write(record)
+        else:
+            dropped.write({**duplicate._asdict(), "record": record})
+
+    return sink
+
+
+def _extract_documents(
+    sources: List[Tuple[str, str]], workers: int, fetcher: Optional[Fetcher] = None
+) -> List[Tuple[str, str]]:
+    """Extract every source concurrently; return ``(source_info, text)`` in input order."""
+
+    def extract(source: Tuple[str, str]) -> Optional[Tuple[str, str]]:
+        kind, value = source
+        try:
+            return source_info(kind, value), extract_text_from_source(kind, value, fetcher)
+        except Exception as e:
+            logger.warning("fetch failed for %s: %s", value, e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [doc for doc in pool.map(extract, sources) if doc is not None]
+
+
+def _export_embeddings(args: argparse.Namespace, api_key: str) -> None:
+    """Embed the records written to ``args.output`` into ``args.embeddings``."""
+    from qna_generator.embeddings import HashingEmbedder, OpenAIEmbedder, export_embeddings
+
+    if args.embedding_provider == "hashing":
+        embedder = HashingEmbedder()
+    else:
+        embedder = OpenAIEmbedder(api_key, args.embedding_model)
+    export_embeddings(iter_jsonl(args.output), args.embeddings, embedder)
+    print(f"wrote embeddings to {args.embeddings}", file=sys.stderr)
+
+
+def _export_outputs(args: argparse.Namespace, api_key: str) -> None:
+    """Write the optional Parquet copy and embeddings of the records in ``args.output``."""
+    if args.parquet:
+        export_to_parquet(iter_jsonl(args.output), args.parquet)
+        print(f"wrote {args.parquet}", file=sys.stderr)
+    if args.embeddings:
+        _export_embeddings(args, api_key)
+
+
+def _finish_trace(tracer: Tracer) -> None:
+    print(tracer.summary_table(), file=sys.stderr)
+    tracer.close()
+    set_tracer(None)
 
 
 def main() -> None:
@@ -34,7 +395,7 @@ def main() -> None:
         "--file-list", help="Text file containing file paths to PDF or DOCX files."
     )
     parser.add_argument(
-        "--output", required=True, help="Output path for generated Q&A JSONL file."
+        "--output", required=True, help="Output path for generated Q&A JSONL file (.gz or .zst to compress)."
     )
     parser.add_argument(
         "--api-key",
@@ -44,6 +405,154 @@ def main() -> None:
     parser.add_argument(
         "--model", default="gpt-4o-mini", help="OpenAI model name to use."
     )
+    parser.add_argument(
+        "--num-categories",
+        type=int,
+        default=3,
+        help="Number of categories proposed for each chunk.",
+    )
+    parser.add_argument(
+        "--questions",
+        type=int,
+        default=5,
+        help="Questions generated per category.",
+    )
+    parser.add_argument(
+        "--total-questions",
+        type=int,
+        default=None,
+        help="Questions per chunk spread over its categories (overrides --questions).",
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=None,
+        help="Questions per request; the temperature rises block by block (default: all at once).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream Q&A completions, parsing pairs as they arrive and keeping the valid pairs of malformed responses.",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=4,
+        help="Number of concurrent URL fetches / file extractions.",
+    )
+    parser.add_argument(
+        "--llm-workers",
+        type=int,
+        default=8,
+        help="Number of concurrent OpenAI requests.",
+    )
+    parser.add_argument(
+        "--cache",
+        default=DEFAULT_CACHE_PATH,
+        help="SQLite file used to cache OpenAI responses between runs.",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Disable the response cache."
+    )
+    parser.add_argument(
+        "--no-http-cache",
+        action="store_true",
+        help="Do not store pages and their ETag/Last-Modified validators for conditional re-downloads.",
+    )
+    parser.add_argument(
+        "--journal",
+        default=None,
+        help="Checkpoint journal path. Defaults to OUTPUT.journal.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip work units already recorded in the journal.",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=None,
+        help="Requests-per-minute budget for the model (defaults to tier-1 limits).",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=None,
+        help="Tokens-per-minute budget for the model (defaults to tier-1 limits).",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=4,
+        help="Maximum concurrent requests to the same host.",
+    )
+    parser.add_argument(
+        "--politeness",
+        type=float,
+        default=0.0,
+        help="Minimum seconds between requests to the same host.",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write every timed span (fetch, parse, chunk, OpenAI, export) to this JSONL file.",
+    )
+    parser.add_argument(
+        "--otel",
+        action="store_true",
+        help="Also send spans to OpenTelemetry (requires opentelemetry-api).",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=None,
+        help="Chunk hash manifest; chunks unchanged since the run that wrote it reuse their Q&A.",
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Drop near-duplicate Q&A records (dropped ones go to OUTPUT.dropped.jsonl).",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Similarity (0-1) at which --dedup treats two records as duplicates.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Use the OpenAI Batch API (offline, up to 24h) instead of live requests.",
+    )
+    parser.add_argument(
+        "--batch-poll-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between batch status checks in --batch mode.",
+    )
+    parser.add_argument(
+        "--parquet",
+        default=None,
+        metavar="PATH",
+        help="Also write the output records as a Parquet file (requires pyarrow).",
+    )
+    parser.add_argument(
+        "--embeddings",
+        default=None,
+        metavar="DIR",
+        help="Also write RAG embeddings and a search index for the output records to DIR (requires numpy).",
+    )
+    parser.add_argument(
+        "--embedding-provider",
+        choices=["openai", "hashing"],
+        default="openai",
+        help="Embedding source for --embeddings; 'hashing' is an offline character n-gram stub.",
+    )
+    parser.add_argument(
+        "--embedding-model",
+        default="text-embedding-3-small",
+        help="OpenAI embedding model for --embeddings.",
+    )
     args = parser.parse_args()
 
     api_key = args.api_key or os.environ.get("OPENAI_API_KEY")
@@ -51,47 +560,134 @@ def main() -> None:
         parser.error(
             "OpenAI API key must be provided via --api-key or OPENAI_API_KEY environment variable."
         )
+    if args.fetch_workers < 1 or args.llm_workers < 1:
+        parser.error("--fetch-workers and --llm-workers must be at least 1.")
+    if args.manifest and args.batch:
+        parser.error("--manifest cannot be combined with --batch.")
+    if args.stream and args.batch:
+        parser.error("--stream cannot be combined with --batch.")
+    if args.parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--parquet requires the pyarrow package.")
+    if args.embeddings:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            parser.error("--embeddings requires the numpy package.")
 
-    generator = AIQAGenerator(api_key=api_key, model=args.model)
-    qa_data = []
-
+    sources: List[Tuple[str, str]] = []
     if args.url_list:
-        for url in _read_lines(args.url_list):
-            text = extract_text_from_url(url)
-            categories = generator.generate_categories(text)
-            for category in categories:
-                result = generator.generate_qa_for_category(text, category)
-                for qa in result.get("qa_pairs", []):
-                    qa_data.append(
-                        {
-                            "question": qa.get("question", ""),
-                            "answer": qa.get("answer", ""),
-                            "category": category,
-                            "source": qa.get("source", ""),
-                            "source_info": f"URL: {url}",
-                            "temperature": 0.0,
-                        }
-                    )
-
+        sources.extend(("url", url) for url in read_lines(args.url_list))
     if args.file_list:
-        for path in _read_lines(args.file_list):
-            text = _extract_text_from_file(path)
-            categories = generator.generate_categories(text)
-            for category in categories:
-                result = generator.generate_qa_for_category(text, category)
-                for qa in result.get("qa_pairs", []):
-                    qa_data.append(
-                        {
-                            "question": qa.get("question", ""),
-                            "answer": qa.get("answer", ""),
-                            "category": category,
-                            "source": qa.get("source", ""),
-                            "source_info": f"File: {path}",
-                            "temperature": 0.0,
-                        }
-                    )
-
-    export_to_jsonl(qa_data, args.output)
+        sources.extend(("file", path) for path in read_lines(args.file_list))
+
+    sinks = [JsonlSpanSink(args.trace)] if args.trace else []
+    if args.otel:
+        try:
+            sinks.append(OpenTelemetrySpanSink())
+        except ImportError:
+            parser.error("--otel requires the opentelemetry-api package.")
+    # Spans are always aggregated so the per-stage table can be printed at the end.
+    tracer = Tracer(sinks)
+    set_tracer(tracer)
+
+    cache = None if args.no_cache else ResponseCache(args.cache)
+    # Pages live in their own table of the same file, with their own size limit.
+    http_cache = None if args.no_http_cache else open_page_cache(args.cache)
+    fetcher = Fetcher(
+        pool_size=max(args.fetch_workers, 10),
+        per_host=args.per_host,
+        min_interval=args.politeness,
+        cache=http_cache,
+    )
+    rpm, tpm = DEFAULT_LIMITS.get(args.model, FALLBACK_LIMITS)
+    rate_limiter = RateLimiter({args.model: (args.rpm or rpm, args.tpm or tpm)})
+    generator = AIQAGenerator(
+        api_key=api_key, model=args.model, cache=cache, rate_limiter=rate_limiter, stream=args.stream
+    )
+    # Dropped records go to OUTPUT.dropped.jsonl, so the report only counts them.
+    dedup = NearDuplicateFilter(args.dedup_threshold, keep_dropped=False) if args.dedup else None
+    engine = QAEngine(
+        generator,
+        num_categories=args.num_categories,
+        questions=args.questions,
+        total_questions=args.total_questions,
+        block_size=args.block_size,
+    )
+    if args.batch:
+        documents = _extract_documents(sources, args.fetch_workers, fetcher)
+        runner = BatchRunner(generator, poll_interval=args.batch_poll_interval)
+        records = generate_with_batches(documents, runner, engine=engine)
+        with JsonlWriter(args.output) as writer:
+            if dedup is not None:
+                with JsonlWriter(f"{args.output}.dropped.jsonl") as dropped:
+                    sink = _dedup_sink(dedup, writer, dropped)
+                    for record in records:
+                        sink(record)
+            else:
+                writer.write_all(records)
+        print(f"wrote {writer.count} records to {args.output}", file=sys.stderr)
+        if dedup is not None:
+            print(dedup.report.summary(), file=sys.stderr)
+        _export_outputs(args, api_key)
+        _finish_trace(tracer)
+        return
+
+    journal = Journal(args.journal or f"{args.output}.journal", resume=args.resume)
+    if args.resume:
+        print(f"resuming with {len(journal)} completed units", file=sys.stderr)
+    dropped = JsonlWriter(f"{args.output}.dropped.jsonl") if dedup is not None else None
+    manifest = Manifest(args.manifest, salt=engine.fingerprint()) if args.manifest else None
+    try:
+        with JsonlWriter(args.output) as writer:
+            _, stats = run_pipeline(
+                sources,
+                generator,
+                fetch_workers=args.fetch_workers,
+                llm_workers=args.llm_workers,
+                journal=journal,
+                sink=writer.write if dedup is None else _dedup_sink(dedup, writer, dropped),
+                fetcher=fetcher,
+                manifest=manifest,
+                engine=engine,
+            )
+        if manifest is not None:
+            manifest.commit()
+    finally:
+        journal.close()
+        if manifest is not None:
+            manifest.close()
+        if dropped is not None:
+            dropped.close()
+
+    print(f"wrote {writer.count} records to {args.output}", file=sys.stderr)
+    print(f"retries: {generator.retries}", file=sys.stderr)
+    print(generator.output_budget.summary(), file=sys.stderr)
+    print(
+        f"http: {fetcher.requests_sent} requests, {fetcher.not_modified} not modified",
+        file=sys.stderr,
+    )
+    for stage in stats.values():
+        print(stage.summary(), file=sys.stderr)
+    if dedup is not None:
+        print(dedup.report.summary(), file=sys.stderr)
+    if manifest is not None:
+        print(manifest.summary(), file=sys.stderr)
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(
+            f"cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['entries']} entries",
+            file=sys.stderr,
+        )
+        cache.close()
+    fetcher.close()
+    if http_cache is not None:
+        http_cache.close()
+    _export_outputs(args, api_key)
+    _finish_trace(tracer)
 
 
 if __name__ == "__main__":
@@ -1,29 +1,208 @@
 import json
 import csv
+import gzip
+import io
+import os
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
-def export_to_jsonl(qa_data, filename=None):
-    """Q&AデータをJSONL形式でエクスポート"""
-    if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"qa_data_{timestamp}.jsonl"
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        for qa in qa_data:
-            json.dump(qa, f, ensure_ascii=False)
-            f.write('\n')
-    
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+from qna_generator.tracing import get_tracer, span
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024  # 1MB write buffer
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+DEFAULT_ROW_GROUP_SIZE = 64 * 1024
+PARQUET_COLUMNS = ("category", "question", "answer", "source", "source_info", "temperature")
+DICTIONARY_COLUMNS = ("category", "source_info")
+EXPORT_FORMATS = ("json", "csv", "jsonl", "rag", "finetuning")
+# Reused encoders: json.dumps builds a new encoder per call for non-default options.
+_encode_line = json.JSONEncoder(ensure_ascii=False).encode
+_encode_pretty = json.JSONEncoder(ensure_ascii=False, indent=2).encode
+
+
+def _is_file(target):
+    return hasattr(target, "write")
+
+
+@contextmanager
+def _open_output(target, newline=None, buffer_size=-1):
+    """Yield ``target`` itself if it is a text file object, otherwise open it as a path."""
+    if _is_file(target):
+        yield target
+    else:
+        with open(target, 'w', newline=newline, encoding='utf-8', buffering=buffer_size) as f:
+            yield f
+
+
+def _describe(target):
+    return target if not _is_file(target) else type(target).__name__
+
+
+def _compression_for(target, compression):
+    """Resolve ``compression`` ("infer", "gzip", "zstd" or None) for ``target``."""
+    if compression == "infer":
+        if _is_file(target):
+            return None
+        return COMPRESSION_SUFFIXES.get(os.path.splitext(str(target))[1])
+    if compression not in (None, "gzip", "zstd"):
+        raise ValueError(f"不明な圧縮形式です: {compression}")
+    if compression is not None and _is_file(target):
+        raise ValueError("圧縮はファイル名を指定した場合のみ使用できます")
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("zstd圧縮にはzstandardパッケージが必要です")
+    return compression
+
+
+def _open_text(filename, mode, compression, buffer_size=DEFAULT_BUFFER_SIZE):
+    """Open ``filename`` for text reading ("r") or writing ("w"), compressed as requested."""
+    if compression is None:
+        return open(filename, mode, encoding='utf-8', buffering=buffer_size)
+    if compression == "gzip":
+        raw = gzip.GzipFile(filename, mode + "b", compresslevel=GZIP_LEVEL)
+    else:
+        f = open(filename, mode + "b")
+        if mode == "w":
+            raw = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f)
+        else:
+            raw = zstandard.ZstdDecompressor().stream_reader(f)
+    # Hand the compressor large blocks rather than the text layer's small chunks.
+    buffered = io.BufferedWriter(raw, buffer_size) if mode == "w" else io.BufferedReader(raw, buffer_size)
+    return io.TextIOWrapper(buffered, encoding='utf-8')
+
+
+def _default_filename(prefix, extension, compression=None):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix = {"gzip": ".gz", "zstd": ".zst"}.get(compression, "")
+    return f"{prefix}_{timestamp}.{extension}{suffix}"
+
+
+class JsonlWriter:
+    """Incrementally write records to a JSONL file through a buffered stream.
+
+    ``filename`` may also be an open text file object (e.g. ``io.StringIO``),
+    which is written to but not closed. ``compression`` is "gzip", "zstd"
+    (requires zstandard) or None; by default it follows the file name suffix
+    (``.gz`` / ``.zst``). Records are serialized and compressed one at a time,
+    so memory use does not depend on the number of records written::
+
+        with JsonlWriter("qa.jsonl") as writer:
+            for qa in records:
+                writer.write(qa)
+    """
+
+    def __init__(self, filename, buffer_size=DEFAULT_BUFFER_SIZE, compression="infer"):
+        self.filename = filename
+        self.count = 0
+        self.compression = _compression_for(filename, compression)
+        self._owned = not _is_file(filename)
+        self._file = _open_text(filename, 'w', self.compression, buffer_size) if self._owned else filename
+        # Time spent serializing and writing is summed into one "export.jsonl"
+        # span on close rather than one span per record.
+        self._timed = get_tracer().enabled
+        self._write_time = 0.0
+
+    def write(self, record):
+        if self._timed:
+            start = time.perf_counter()
+        self._file.write(_encode_line(record))
+        self._file.write('\n')
+        self.count += 1
+        if self._timed:
+            self._write_time += time.perf_counter() - start
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+        if self._timed:
+            get_tracer().record("export.jsonl", self._write_time, records=self.count, path=_describe(self.filename))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def stream_to_jsonl(records, filename, buffer_size=DEFAULT_BUFFER_SIZE, compression="infer"):
+    """Write any iterable (including generators) of records to ``filename`` (a path or text file object)."""
+    with JsonlWriter(filename, buffer_size, compression) as writer:
+        writer.write_all(records)
     return filename
 
+
+def iter_jsonl(filename, compression="infer"):
+    """Yield the records of a JSONL file one at a time, decompressing gzip/zstd files as they are read."""
+    with _open_text(filename, 'r', _compression_for(filename, compression)) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _rag_item(index, qa):
+    return {
+        "id": f"{qa['category']}_{index}",
+        "text": f"質問: {qa['question']}\n回答: {qa['answer']}",
+        "metadata": {
+            "category": qa['category'],
+            "source": qa['source'],
+            "source_info": qa['source_info'],
+            "temperature": qa['temperature']
+        }
+    }
+
+
+def _finetuning_item(index, qa):
+    return {
+        "messages": [
+            {"role": "system", "content": f"あなたは{qa['category']}に関する質問に答えるアシスタントです。"},
+            {"role": "user", "content": qa['question']},
+            {"role": "assistant", "content": qa['answer']}
+        ]
+    }
+
+
+def iter_rag_items(qa_data):
+    """Yield RAG-formatted items for ``qa_data`` one at a time."""
+    for index, qa in enumerate(qa_data):
+        yield _rag_item(index, qa)
+
+
+def iter_finetuning_items(qa_data):
+    """Yield fine-tuning conversation items for ``qa_data`` one at a time."""
+    for index, qa in enumerate(qa_data):
+        yield _finetuning_item(index, qa)
+
+
+def export_to_jsonl(qa_data, filename=None, compression="infer"):
+    """Q&AデータをJSONL形式でエクスポート
+
+    ``compression`` ("gzip" or "zstd") compresses the file while it is written.
+    """
+    if filename is None:
+        filename = _default_filename("qa_data", "jsonl", compression)
+
+    return stream_to_jsonl(qa_data, filename, compression=compression)
+
 def export_to_json(qa_data, filename=None):
     """Q&AデータをJSON形式でエクスポート"""
     if filename is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"qa_data_{timestamp}.json"
-    
-    with open(filename, 'w', encoding='utf-8') as f:
+
+    with span("export.json", records=len(qa_data), path=_describe(filename)), _open_output(filename) as f:
         json.dump(qa_data, f, ensure_ascii=False, indent=2)
-    
+
     return filename
 
 def export_to_csv(qa_data, filename=None):
@@ -31,64 +210,159 @@ def export_to_csv(qa_data, filename=None):
     if filename is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"qa_data_{timestamp}.csv"
-    
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
+
+    with span("export.csv", records=len(qa_data), path=_describe(filename)), _open_output(filename, newline='') as f:
         if qa_data:
             fieldnames = qa_data[0].keys()
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(qa_data)
-    
+
     return filename
 
-def export_for_rag(qa_data, filename=None):
-    """RAG用のフォーマットでエクスポート"""
+def export_for_rag(qa_data, filename=None, compression="infer"):
+    """RAG用のフォーマットでエクスポート
+
+    ``qa_data`` may be any iterable; items are transformed and written one at a time.
+    """
     if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"rag_data_{timestamp}.jsonl"
-    
-    rag_data = []
-    for qa in qa_data:
-        rag_item = {
-            "id": f"{qa['category']}_{len(rag_data)}",
-            "text": f"質問: {qa['question']}\n回答: {qa['answer']}",
-            "metadata": {
-                "category": qa['category'],
-                "source": qa['source'],
-                "source_info": qa['source_info'],
-                "temperature": qa['temperature']
-            }
-        }
-        rag_data.append(rag_item)
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        for item in rag_data:
-            json.dump(item, f, ensure_ascii=False)
-            f.write('\n')
-    
-    return filename
+        filename = _default_filename("rag_data", "jsonl", compression)
+
+    return stream_to_jsonl(iter_rag_items(qa_data), filename, compression=compression)
 
-def export_for_finetuning(qa_data, filename=None):
-    """ファインチューニング用のフォーマットでエクスポート"""
+def export_for_finetuning(qa_data, filename=None, compression="infer"):
+    """ファインチューニング用のフォーマットでエクスポート
+
+    ``qa_data`` may be any iterable; items are transformed and written one at a time.
+    """
     if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"finetuning_data_{timestamp}.jsonl"
-    
-    finetuning_data = []
-    for qa in qa_data:
-        finetuning_item = {
-            "messages": [
-                {"role": "system", "content": f"あなたは{qa['category']}に関する質問に答えるアシスタントです。"},
-                {"role": "user", "content": qa['question']},
-                {"role": "assistant", "content": qa['answer']}
-            ]
-        }
-        finetuning_data.append(finetuning_item)
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        for item in finetuning_data:
-            json.dump(item, f, ensure_ascii=False)
-            f.write('\n')
-    
+        filename = _default_filename("finetuning_data", "jsonl", compression)
+
+    return stream_to_jsonl(iter_finetuning_items(qa_data), filename, compression=compression)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet形式にはpyarrowパッケージが必要です") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _parquet_schema(pa):
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    types = {"temperature": pa.float64()}
+    return pa.schema(
+        [(name, dictionary if name in DICTIONARY_COLUMNS else types.get(name, pa.string())) for name in PARQUET_COLUMNS]
+    )
+
+
+def export_to_parquet(qa_data, filename=None, row_group_size=DEFAULT_ROW_GROUP_SIZE, compression="zstd"):
+    """Q&AデータをParquet形式でエクスポート
+
+    Records are buffered ``row_group_size`` at a time and written as row
+    groups, so ``qa_data`` may be any iterable. ``category`` and
+    ``source_info`` are dictionary-encoded. Requires pyarrow.
+    """
+    pa, pq = _require_pyarrow()
+    if filename is None:
+        filename = _default_filename("qa_data", "parquet")
+
+    schema = _parquet_schema(pa)
+    columns = {name: [] for name in PARQUET_COLUMNS}
+    count = 0
+    with span("export.parquet", path=_describe(filename)) as export_span:
+        with pq.ParquetWriter(
+            filename, schema, compression=compression, use_dictionary=list(DICTIONARY_COLUMNS)
+        ) as writer:
+
+            def flush():
+                arrays = [pa.array(columns[field.name], field.type) for field in schema]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=row_group_size)
+                for values in columns.values():
+                    values.clear()
+
+            for qa in qa_data:
+                for name, values in columns.items():
+                    values.append(qa.get(name))
+                count += 1
+                if count % row_group_size == 0:
+                    flush()
+            if count % row_group_size:
+                flush()
+        export_span.set(records=count)
+
     return filename
 
+
+def iter_parquet(filename, columns=None, batch_size=DEFAULT_ROW_GROUP_SIZE):
+    """Yield the records of a Parquet export one at a time, reading only ``columns`` (all by default)."""
+    _, pq = _require_pyarrow()
+    for batch in pq.ParquetFile(filename).iter_batches(batch_size=batch_size, columns=columns):
+        yield from batch.to_pylist()
+
+
+JSON_BATCH = 256  # records encoded per call for the indented JSON format
+
+
+def write_all_formats(qa_data, sinks):
+    """Write ``qa_data`` in several formats at once, in a single pass over the records.
+
+    ``sinks`` maps format names from ``EXPORT_FORMATS`` to text file objects;
+    each receives exactly what the matching ``export_*`` function would
+    write. ``qa_data`` may be any iterable.
+    """
+    unknown = set(sinks) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"不明なエクスポート形式です: {', '.join(sorted(unknown))}")
+    json_out = sinks.get("json")
+    csv_out = sinks.get("csv")
+    line_outs = [
+        (sinks[name], convert)
+        for name, convert in (
+            ("jsonl", lambda index, qa: qa),
+            ("rag", _rag_item),
+            ("finetuning", _finetuning_item),
+        )
+        if name in sinks
+    ]
+    csv_writer = None
+    count = 0
+    json_batch = []
+
+    def flush_json():
+        # Encoding a slice of the array at once is much cheaper than one call per
+        # record; dropping its "[\n" and "\n]" leaves the lines json.dump would write.
+        json_out.write(",\n" if count > len(json_batch) else "[\n")
+        json_out.write(_encode_pretty(json_batch)[2:-2])
+        json_batch.clear()
+
+    with span("export.all", formats=",".join(sinks)) as export_span:
+        for index, qa in enumerate(qa_data):
+            count += 1
+            if json_out is not None:
+                json_batch.append(qa)
+                if len(json_batch) == JSON_BATCH:
+                    flush_json()
+            if csv_out is not None:
+                if csv_writer is None:
+                    csv_writer = csv.DictWriter(csv_out, fieldnames=qa.keys())
+                    csv_writer.writeheader()
+                csv_writer.writerow(qa)
+            for out, convert in line_outs:
+                out.write(_encode_line(convert(index, qa)))
+                out.write('\n')
+        if json_out is not None:
+            if json_batch:
+                flush_json()
+            json_out.write("\n]" if count else "[]")
+        export_span.set(records=count)
+    return count
+
+
+def export_all_formats(qa_data, formats=EXPORT_FORMATS):
+    """Return ``{format: text}`` for every format in ``formats``, built in memory in one pass."""
+    sinks = {name: io.StringIO() for name in formats}
+    write_all_formats(qa_data, sinks)
+    return {name: sink.getvalue() for name, sink in sinks.items()}
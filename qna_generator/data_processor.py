@@ -1,36 +1,44 @@
 
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import requests
-from bs4 import BeautifulSoup
 import fitz  # PyMuPDF
-from docx import Document
+
+from qna_generator.docx_text import docx_to_text, iter_docx_lines
+from qna_generator.html_text import html_to_text
+from qna_generator.tracing import span
 
 MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+PDF_PAGES_PER_SHARD = 32
+PDF_PARALLEL_MIN_PAGES = 64  # smaller documents are not worth a process pool
 
-def extract_text_from_url(url):
+def extract_text_from_url(url, fetcher=None):
     """Fetch and clean text content from the given URL.
 
     A 10-second timeout and a User-Agent header are used for the request.
+    Pass a shared :class:`~qna_generator.fetcher.Fetcher` to reuse pooled
+    connections, apply per-host limits and send conditional requests.
 
     Raises:
         requests.exceptions.RequestException: ネットワーク関連のエラーが発生した場合。
     """
     try:
-        response = requests.get(
-            url,
-            timeout=10,
-            headers={"User-Agent": "Mozilla/5.0"},
-        )
-        response.raise_for_status()  # HTTPエラーをチェック
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # スクリプトやスタイルタグを除去
-        for script in soup(["script", "style"]):
-            script.extract()
-        text = soup.get_text()
-        # 複数の空白や改行を一つにまとめる
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = "\n".join(chunk for chunk in chunks if chunk)
-        return text
+        with span("fetch", url=url) as fetch_span:
+            if fetcher is not None:
+                html = fetcher.fetch(url).text
+            else:
+                response = requests.get(
+                    url,
+                    timeout=10,
+                    headers={"User-Agent": "Mozilla/5.0"},
+                )
+                response.raise_for_status()  # HTTPエラーをチェック
+                html = response.text
+            fetch_span.set(chars=len(html))
+        with span("parse.html", chars=len(html)):
+            return html_to_text(html)
     except requests.exceptions.Timeout as e:
         raise requests.exceptions.RequestException(
             f"URLからのテキスト抽出エラー: タイムアウトが発生しました: {e}"
@@ -40,26 +48,140 @@ def extract_text_from_url(url):
             f"URLからのテキスト抽出エラー: {e}"
         ) from e
 
-def extract_text_from_pdf(file_path):
-    """Extract text from a PDF file."""
+def _open_pdf(source):
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _extract_pdf_page_range(source, start, stop):
+    """Worker: open the document independently and extract pages ``start:stop``."""
+    with _open_pdf(source) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def iter_pdf_pages(source, workers=None, pages_per_shard=PDF_PAGES_PER_SHARD):
+    """Lazily yield the text of each page of a PDF, in page order.
+
+    ``source`` is a file path or the PDF bytes. With ``workers`` > 1, page
+    ranges of ``pages_per_shard`` pages are extracted in a process pool where
+    each worker opens the document itself; pages are yielded as soon as their
+    shard (and every earlier one) is done, so consumers can start before the
+    last page is parsed. ``workers=None`` uses one process per CPU for
+    documents of at least ``PDF_PARALLEL_MIN_PAGES`` pages and extracts
+    smaller ones serially.
+    """
+    with _open_pdf(source) as doc:
+        page_count = doc.page_count
+        if workers is None:
+            workers = (os.cpu_count() or 1) if page_count >= PDF_PARALLEL_MIN_PAGES else 1
+        if workers <= 1 or page_count <= pages_per_shard:
+            for page in doc:
+                yield page.get_text()
+            return
+
+    ranges = [
+        (start, min(start + pages_per_shard, page_count))
+        for start in range(0, page_count, pages_per_shard)
+    ]
+    remaining = iter(ranges)
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def submit_next():
+            page_range = next(remaining, None)
+            if page_range is not None:
+                in_flight.append(pool.submit(_extract_pdf_page_range, source, *page_range))
+
+        # Keep a bounded number of shards in flight so memory stays flat.
+        for _ in range(2 * workers):
+            submit_next()
+        while in_flight:
+            pages = in_flight.popleft().result()
+            submit_next()
+            yield from pages
+
+
+def extract_text_from_pdf(file_path, workers=None):
+    """Extract text from a PDF file.
+
+    Large documents are extracted in parallel; see :func:`iter_pdf_pages`.
+    """
     try:
-        with fitz.open(file_path) as doc:
-            text_parts = [page.get_text() for page in doc]
-        return "".join(text_parts)
+        with span("extract.pdf", path=str(file_path)):
+            return "".join(iter_pdf_pages(file_path, workers))
     except Exception as e:
         raise RuntimeError(f"PDFからのテキスト抽出エラー: {e}") from e
 
 def extract_text_from_docx(file_path):
-    """Extract text from a DOCX file."""
-    text = ""
+    """Extract text from a DOCX file.
+
+    Paragraphs, tables, headers and footers are streamed from the archive;
+    see :func:`~qna_generator.docx_text.iter_docx_lines`.
+    """
     try:
-        doc = Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
+        with span("extract.docx", path=str(file_path)):
+            return docx_to_text(file_path)
     except Exception as e:
         raise RuntimeError(f"DOCXからのテキスト抽出エラー: {e}") from e
 
+def extract_text_from_file(file_path):
+    """Extract text from a local PDF or DOCX file, chosen by its extension."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".pdf":
+        return extract_text_from_pdf(file_path)
+    if ext == ".docx":
+        return extract_text_from_docx(file_path)
+    raise ValueError(f"Unsupported file type: {file_path}")
+
+
+def extract_text_from_source(kind, value, fetcher=None):
+    """Extract the text of a ``("url", url)`` or ``("file", path)`` source."""
+    if kind == "url":
+        return extract_text_from_url(value, fetcher=fetcher)
+    return extract_text_from_file(value)
+
+
+def iter_text_from_file(file_path):
+    """Lazily yield the text of a local PDF (page by page) or DOCX (line by line).
+
+    Joined, the pieces equal :func:`extract_text_from_file`; consumers such as
+    :meth:`~qna_generator.pipeline.QAEngine.iter_chunks` can start on the
+    first pages while later ones are still being extracted.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".pdf":
+        try:
+            with span("extract.pdf", path=str(file_path)):
+                yield from iter_pdf_pages(file_path)
+        except Exception as e:
+            raise RuntimeError(f"PDFからのテキスト抽出エラー: {e}") from e
+    elif ext == ".docx":
+        try:
+            with span("extract.docx", path=str(file_path)):
+                for line in iter_docx_lines(file_path):
+                    yield line + "\n"
+        except Exception as e:
+            raise RuntimeError(f"DOCXからのテキスト抽出エラー: {e}") from e
+    else:
+        raise ValueError(f"Unsupported file type: {file_path}")
+
+
+def iter_text_from_source(kind, value, fetcher=None):
+    """Lazily yield the text of a source in pieces; see :func:`iter_text_from_file`.
+
+    A web page is yielded as one piece.
+    """
+    if kind == "url":
+        yield extract_text_from_url(value, fetcher=fetcher)
+    else:
+        yield from iter_text_from_file(value)
+
+
+def source_info(kind, value):
+    """The ``source_info`` label stored with each record generated from a source."""
+    return f"URL: {value}" if kind == "url" else f"File: {value}"
+
 # Streamlitのfile_uploaderでアップロードされたファイルオブジェクトを処理するための関数
 def extract_text_from_uploaded_file(uploaded_file, file_type):
     """Handle text extraction for Streamlit-uploaded files."""
@@ -71,16 +193,15 @@ def extract_text_from_uploaded_file(uploaded_file, file_type):
     if file_type == "pdf":
         try:
             pdf_bytes = uploaded_file.read()
-            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-                text_parts = [page.get_text() for page in doc]
-            return "".join(text_parts)
+            with span("extract.pdf", bytes=len(pdf_bytes)):
+                # Serial: a process pool here would fork the whole Streamlit server.
+                return "".join(iter_pdf_pages(pdf_bytes, workers=1))
         except Exception as e:
             raise RuntimeError(f"PDFからのテキスト抽出エラー: {e}") from e
     elif file_type == "docx":
         try:
-            doc = Document(uploaded_file)
-            text_parts = [para.text + "\n" for para in doc.paragraphs]
-            return "".join(text_parts)
+            with span("extract.docx", bytes=uploaded_file.size):
+                return docx_to_text(uploaded_file)
         except Exception as e:
             raise RuntimeError(f"DOCXからのテキスト抽出エラー: {e}") from e
     else:
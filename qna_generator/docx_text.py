@@ -0,0 +1,152 @@
+import posixpath
+import zipfile
+from typing import Iterator, List
+from xml.etree import ElementTree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+READ_SIZE = 64 * 1024
+
+_P, _R, _T, _TC, _TR = W + "p", W + "r", W + "t", W + "tc", W + "tr"
+# Run-level elements that stand for characters.
+_SPECIAL_CHARS = {W + "tab": "\t", W + "br": "\n", W + "cr": "\n", W + "noBreakHyphen": "-"}
+# Subtrees without text: the VML fallback copy of text boxes and paragraph/run
+# properties (whose ``w:tabs`` hold tab stop definitions, not tab characters).
+_SKIPPED = {MC_FALLBACK, W + "pPr", W + "rPr"}
+
+
+class _DocxTarget:
+    """Parser target for one WordprocessingML part; receives SAX-style events.
+
+    Paragraphs are emitted as lines. A table row becomes one line of
+    tab-separated cells (the paragraphs of a cell joined with spaces), and
+    nested tables end up inside the cell that contains them. The VML fallback
+    copy of text boxes (``mc:Fallback``) is skipped so their text appears once,
+    and tabs and breaks count only inside runs (``w:r``).
+    """
+
+    def __init__(self, lines: List[str]):
+        self._lines = lines
+        self._paragraphs: List[List[str]] = []  # text pieces of each open paragraph
+        self._rows: List[List[str]] = []  # cells of each open table row
+        self._cells: List[List[str]] = []  # paragraphs of each open table cell
+        self._in_text = False
+        self._run_depth = 0
+        self._skip_depth = 0
+
+    def start(self, tag, attrib):
+        if self._skip_depth or tag in _SKIPPED:
+            self._skip_depth += 1
+        elif tag == _T:
+            self._in_text = True
+        elif tag == _R:
+            self._run_depth += 1
+        elif tag == _P:
+            self._paragraphs.append([])
+        elif tag in _SPECIAL_CHARS:
+            if self._run_depth and self._paragraphs:
+                self._paragraphs[-1].append(_SPECIAL_CHARS[tag])
+        elif tag == _TC:
+            self._cells.append([])
+        elif tag == _TR:
+            self._rows.append([])
+
+    def end(self, tag):
+        if self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == _T:
+            self._in_text = False
+        elif tag == _R:
+            self._run_depth -= 1
+        elif tag == _P:
+            self._emit("".join(self._paragraphs.pop()))
+        elif tag == _TC:
+            self._rows[-1].append(" ".join(part for part in self._cells.pop() if part))
+        elif tag == _TR:
+            self._emit("\t".join(self._rows.pop()))
+
+    def _emit(self, line: str) -> None:
+        if self._cells:
+            self._cells[-1].append(line)
+        else:
+            self._lines.append(line)
+
+    def data(self, data):
+        if self._in_text and self._paragraphs:
+            self._paragraphs[-1].append(data)
+
+    def close(self):
+        return None
+
+
+def _iter_part_lines(archive: zipfile.ZipFile, name: str) -> Iterator[str]:
+    """Yield the lines of part ``name``, decompressing and parsing it in pieces."""
+    lines: List[str] = []
+    parser = ElementTree.XMLParser(target=_DocxTarget(lines))
+    with archive.open(name) as part:
+        while True:
+            data = part.read(READ_SIZE)
+            if not data:
+                break
+            parser.feed(data)
+            yield from lines
+            lines.clear()
+    parser.close()
+    yield from lines
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> List[tuple]:
+    """``(type, target part)`` of each relationship of ``part``, in file order."""
+    directory, name = posixpath.split(part)
+    rels = posixpath.join(directory, "_rels", name + ".rels")
+    try:
+        root = ElementTree.fromstring(archive.read(rels))
+    except KeyError:
+        return []
+    result = []
+    for rel in root.iter(REL):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        target = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join(directory, target))
+        result.append((rel.get("Type", ""), target))
+    return result
+
+
+def iter_docx_lines(source) -> Iterator[str]:
+    """Lazily yield the text of a DOCX file, one paragraph or table row at a time.
+
+    ``source`` is a path or a binary file object. ``word/document.xml`` is
+    decompressed and parsed incrementally without building an element tree,
+    so memory use stays flat however long the document is. Body paragraphs
+    and tables are yielded in document order, preceded by the page headers
+    and followed by the page footers (each distinct text once).
+    """
+    with zipfile.ZipFile(source) as archive:
+        document = DEFAULT_DOCUMENT_PART
+        for rel_type, target in _relationships(archive, ""):
+            if rel_type == OFFICE_DOCUMENT:
+                document = target
+        related = _relationships(archive, document)
+        headers = [target for rel_type, target in related if rel_type.endswith("/header")]
+        footers = [target for rel_type, target in related if rel_type.endswith("/footer")]
+
+        def decorations(parts):
+            seen = set()
+            for part in parts:
+                text = "\n".join(line for line in _iter_part_lines(archive, part) if line)
+                if text and text not in seen:
+                    seen.add(text)
+                    yield text
+
+        yield from decorations(headers)
+        yield from _iter_part_lines(archive, document)
+        yield from decorations(footers)
+
+
+def docx_to_text(source) -> str:
+    """Return the text of a DOCX file with one line per paragraph or table row."""
+    return "".join(line + "\n" for line in iter_docx_lines(source))
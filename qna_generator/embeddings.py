@@ -0,0 +1,281 @@
+"""Embedding export for RAG: vectors in a memory-mapped matrix plus an IVF index.
+
+An export directory contains::
+
+    items.jsonl   RAG items (see ``data_exporter.iter_rag_items``) with a "row" field
+    vectors.f32   float32 matrix, one unit-length row per item
+    index.npz     IVF index: centroids, rows grouped by list, item byte offsets
+    meta.json     provider, model, dimension, count and index parameters
+
+Requires numpy.
+"""
+
+import json
+import math
+import os
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from qna_generator.dedup import char_shingles, shingle_hash
+from qna_generator.tracing import span
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_NPROBE = 8
+HASHING_DIM = 256
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+ASSIGN_BATCH = 65536
+
+ITEMS_FILE = "items.jsonl"
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.npz"
+META_FILE = "meta.json"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HashingEmbedder:
+    """Offline embedder: signed feature hashing of character n-grams.
+
+    Deterministic and dependency-free, so exports, tests and benchmarks run
+    without an API key. Similarity is lexical rather than semantic, which is
+    enough for near-verbatim queries and for exercising the index.
+    """
+
+    provider = "hashing"
+
+    def __init__(self, dim: int = HASHING_DIM, ngram: int = 2):
+        self.dim = dim
+        self.ngram = ngram
+        self.model = f"hashing-{ngram}gram"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for shingle in char_shingles(text, self.ngram):
+                value = int.from_bytes(shingle_hash(shingle, 8), "little")
+                vectors[row, value % self.dim] += 1.0 if value >> 63 else -1.0
+        return _normalize(vectors)
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API, ``len(texts)`` inputs per request."""
+
+    provider = "openai"
+
+    def __init__(self, api_key: str, model: str = DEFAULT_EMBEDDING_MODEL, *, base_url: Optional[str] = None,
+                 max_retries: int = 5):
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=max_retries)
+        self.model = model
+        self.dim = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        with span("openai.embed", texts=len(texts)) as embed_span:
+            response = self.client.embeddings.create(model=self.model, input=list(texts))
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                embed_span.set(prompt_tokens=usage.prompt_tokens)
+        data = sorted(response.data, key=lambda item: item.index)
+        vectors = np.asarray([item.embedding for item in data], dtype=np.float32)
+        self.dim = vectors.shape[1]
+        return _normalize(vectors)
+
+
+class IVFIndex:
+    """Inverted-file index over unit vectors (inner product = cosine similarity).
+
+    Rows are clustered with spherical k-means into ``nlist`` lists; a query is
+    compared with the centroids and then only with the rows of its ``nprobe``
+    closest lists.
+    """
+
+    def __init__(self, centroids: np.ndarray, rows: np.ndarray, list_offsets: np.ndarray):
+        self.centroids = centroids
+        self.rows = rows
+        self.list_offsets = list_offsets
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, nlist: Optional[int] = None, *, iterations: int = KMEANS_ITERATIONS,
+              seed: int = 0) -> "IVFIndex":
+        count = len(vectors)
+        if nlist is None:
+            nlist = max(1, min(4096, int(math.sqrt(count))))
+        nlist = max(1, min(nlist, count))
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample = np.asarray(vectors[np.sort(rng.choice(count, sample_size, replace=False))])
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        assignment = np.empty(count, dtype=np.int64)
+        for start in range(0, count, ASSIGN_BATCH):
+            block = np.asarray(vectors[start:start + ASSIGN_BATCH])
+            assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        rows = np.argsort(assignment, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))])
+        return cls(centroids.astype(np.float32), rows, list_offsets)
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int = 5,
+               nprobe: int = DEFAULT_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(scores, rows)`` of the ``k`` best matches for one query vector."""
+        nprobe = min(nprobe, self.nlist)
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        candidates = np.concatenate([self.rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists])
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        candidates.sort()  # sequential reads from the memory map
+        scores = np.asarray(vectors[candidates]) @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return scores[top], candidates[top]
+
+
+def export_embeddings(
+    qa_data: Iterable[dict],
+    directory: str,
+    embedder,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    nlist: Optional[int] = None,
+) -> str:
+    """Embed ``qa_data`` as RAG items into ``directory`` and index them; return the directory.
+
+    Records are read, embedded ``batch_size`` at a time and appended to the
+    vector file, so memory use does not depend on the number of records.
+    """
+    from qna_generator.data_exporter import iter_rag_items
+
+    os.makedirs(directory, exist_ok=True)
+    items_path = os.path.join(directory, ITEMS_FILE)
+    vectors_path = os.path.join(directory, VECTORS_FILE)
+    item_offsets: List[int] = []
+    dim = None
+    with span("export.embeddings") as export_span, open(items_path, "wb") as items, open(vectors_path, "wb") as out:
+
+        def flush(batch: List[dict]) -> None:
+            nonlocal dim
+            vectors = np.asarray(embedder.embed([item["text"] for item in batch]), dtype=np.float32)
+            dim = vectors.shape[1]
+            out.write(np.ascontiguousarray(vectors).tobytes())
+            for item in batch:
+                item_offsets.append(items.tell())
+                items.write(json.dumps(item, ensure_ascii=False).encode("utf-8"))
+                items.write(b"\n")
+
+        batch: List[dict] = []
+        for row, item in enumerate(iter_rag_items(qa_data)):
+            batch.append({"row": row, **item})
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        export_span.set(records=len(item_offsets))
+
+    count = len(item_offsets)
+    meta = {"provider": embedder.provider, "model": embedder.model, "dim": dim, "count": count, "metric": "cosine"}
+    if isinstance(embedder, HashingEmbedder):
+        meta["ngram"] = embedder.ngram
+    if count:
+        with span("index.build", records=count):
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(count, dim))
+            index = IVFIndex.build(vectors, nlist)
+            del vectors
+        np.savez(
+            os.path.join(directory, INDEX_FILE),
+            centroids=index.centroids,
+            rows=index.rows,
+            list_offsets=index.list_offsets,
+            item_offsets=np.asarray(item_offsets, dtype=np.int64),
+        )
+        meta["nlist"] = index.nlist
+    with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return directory
+
+
+class EmbeddingStore:
+    """Query an export written by :func:`export_embeddings`.
+
+    Vectors stay memory-mapped and items are read from ``items.jsonl`` by
+    offset, so opening a large export is cheap::
+
+        store = EmbeddingStore("rag_index")
+        for score, item in store.search("申請に必要な書類は？", k=3):
+            print(f"{score:.2f}", item["text"])
+
+    Text queries are embedded with ``embedder``, which defaults to the
+    hashing embedder for hashing exports and must be given otherwise.
+    """
+
+    def __init__(self, directory: str, embedder=None):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if embedder is None and self.meta["provider"] == HashingEmbedder.provider:
+            embedder = HashingEmbedder(self.meta["dim"], self.meta["ngram"])
+        self.embedder = embedder
+        count = self.meta["count"]
+        if not count:
+            raise ValueError("埋め込みが空です")
+        self.vectors = np.memmap(
+            os.path.join(directory, VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, self.meta["dim"])
+        )
+        with np.load(os.path.join(directory, INDEX_FILE)) as data:
+            self.index = IVFIndex(data["centroids"], data["rows"], data["list_offsets"])
+            self._item_offsets = data["item_offsets"]
+        self._items = open(os.path.join(directory, ITEMS_FILE), "rb")
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def item(self, row: int) -> dict:
+        self._items.seek(int(self._item_offsets[row]))
+        return json.loads(self._items.readline())
+
+    def embed_query(self, text: str) -> np.ndarray:
+        if self.embedder is None:
+            raise ValueError("クエリを埋め込むembedderが指定されていません")
+        return np.asarray(self.embedder.embed([text]), dtype=np.float32)[0]
+
+    def search(self, query, k: int = 5, nprobe: int = DEFAULT_NPROBE) -> List[Tuple[float, dict]]:
+        """Return ``(score, item)`` for the ``k`` items closest to ``query`` (text or vector)."""
+        vector = self.embed_query(query) if isinstance(query, str) else np.asarray(query, dtype=np.float32)
+        with span("index.search", k=k, nprobe=nprobe):
+            scores, rows = self.index.search(self.vectors, vector, k, nprobe)
+        return [(float(score), self.item(row)) for score, row in zip(scores, rows)]
+
+    def exact_search(self, vector: np.ndarray, k: int = 5) -> np.ndarray:
+        """Rows of the true top ``k`` by brute force, for measuring recall."""
+        scores = np.asarray(self.vectors) @ vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def close(self) -> None:
+        self._items.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
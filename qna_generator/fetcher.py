@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from qna_generator.cache import DEFAULT_CACHE_PATH, ResponseCache
+
+DEFAULT_USER_AGENT = "Mozilla/5.0"
+DEFAULT_TIMEOUT = 10
+PAGE_CACHE_TABLE = "pages"
+DEFAULT_PAGE_CACHE_MAX_BYTES = 128 * 1024 * 1024  # 128MB
+
+FetchResult = namedtuple("FetchResult", ["url", "status_code", "text", "not_modified"])
+
+
+def open_page_cache(path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_PAGE_CACHE_MAX_BYTES) -> ResponseCache:
+    """Open the page/validator cache: its own table in ``path`` with its own size limit."""
+    return ResponseCache(path, max_bytes=max_bytes, table=PAGE_CACHE_TABLE)
+
+
+class Fetcher:
+    """Shared HTTP fetcher with connection pooling and per-host politeness.
+
+    All requests go through one ``requests.Session``, so connections (and TLS
+    sessions) are kept alive and reused. At most ``per_host`` requests run
+    against the same host at once, and consecutive requests to a host start at
+    least ``min_interval`` seconds apart. When a ``cache`` is given, ETag and
+    Last-Modified validators are stored with each page and sent on the next
+    fetch; a ``304 Not Modified`` answer is served from the cache. Use
+    :func:`open_page_cache` so pages do not share the size budget of the
+    completion cache. Instances are thread-safe.
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_size: int = 32,
+        per_host: int = 4,
+        min_interval: float = 0.0,
+        timeout: float = DEFAULT_TIMEOUT,
+        user_agent: str = DEFAULT_USER_AGENT,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._host_last_start: Dict[str, float] = {}
+        self.requests_sent = 0
+        self.not_modified = 0
+
+    def _host_state(self, host: str):
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+                self._host_locks[host] = threading.Lock()
+            return self._host_slots[host], self._host_locks[host]
+
+    def _wait_politely(self, host: str, host_lock: threading.Lock) -> None:
+        with host_lock:
+            last = self._host_last_start.get(host)
+            now = time.monotonic()
+            if last is not None and now - last < self.min_interval:
+                time.sleep(self.min_interval - (now - last))
+            self._host_last_start[host] = time.monotonic()
+
+    def _validators(self, url: str) -> Optional[dict]:
+        if self.cache is None:
+            return None
+        stored = self.cache.get(url)
+        return json.loads(stored) if stored is not None else None
+
+    def fetch(self, url: str) -> FetchResult:
+        """GET ``url`` and return its body.
+
+        Raises:
+            requests.exceptions.RequestException: ネットワーク関連またはHTTPのエラー。
+        """
+        host = urlsplit(url).netloc
+        slots, host_lock = self._host_state(host)
+        stored = self._validators(url)
+        headers = {}
+        if stored:
+            if stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            if stored.get("last_modified"):
+                headers["If-Modified-Since"] = stored["last_modified"]
+
+        with slots:
+            if self.min_interval > 0:
+                self._wait_politely(host, host_lock)
+            response = self.session.get(url, timeout=self.timeout, headers=headers)
+        with self._lock:
+            self.requests_sent += 1
+
+        if response.status_code == 304 and stored:
+            with self._lock:
+                self.not_modified += 1
+            return FetchResult(url, 304, stored["text"], True)
+        response.raise_for_status()
+        text = response.text
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self.cache is not None and (etag or last_modified):
+            self.cache.set(
+                url,
+                json.dumps(
+                    {"etag": etag, "last_modified": last_modified, "text": text},
+                    ensure_ascii=False,
+                ),
+            )
+        return FetchResult(url, response.status_code, text, False)
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,149 @@
+from html.parser import HTMLParser
+from typing import Iterable, List
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is optional
+    etree = None
+
+SKIP_TAGS = frozenset({"script", "style"})
+ENGINES = ("auto", "lxml", "html.parser")
+
+
+class _LineNormalizer:
+    """Collapse whitespace line by line as text arrives.
+
+    Each line is stripped and split on runs of two spaces; every non-empty
+    phrase becomes one output line. Only the current incomplete line is kept
+    pending, so the raw page text is never held in full.
+    """
+
+    def __init__(self):
+        self._pending: List[str] = []
+        self._lines: List[str] = []
+
+    def _emit(self, line: str) -> None:
+        for phrase in line.strip().split("  "):
+            phrase = phrase.strip()
+            if phrase:
+                self._lines.append(phrase)
+
+    def write(self, data: str) -> None:
+        self._pending.append(data)
+        if "\n" not in data and "\r" not in data:
+            return
+        lines = "".join(self._pending).splitlines(True)
+        self._pending = []
+        if lines[-1] == lines[-1].rstrip("\r\n"):
+            # The final line has no terminator yet; wait for the rest of it.
+            self._pending.append(lines.pop())
+        for line in lines:
+            self._emit(line)
+
+    def close(self) -> str:
+        for line in "".join(self._pending).splitlines():
+            self._emit(line)
+        self._pending = []
+        return "\n".join(self._lines)
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, out: _LineNormalizer, skip_tags: Iterable[str]):
+        super().__init__(convert_charrefs=True)
+        self._out = out
+        self._skip_tags = frozenset(skip_tags)
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._skip_tags:
+            self._skip_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in self._skip_tags and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._out.write(data)
+
+
+class _LxmlTarget:
+    """Parser target for ``lxml.etree.HTMLParser``; receives SAX-style events."""
+
+    def __init__(self, out: _LineNormalizer, skip_tags: Iterable[str]):
+        self._out = out
+        self._skip_tags = frozenset(skip_tags)
+        self._skip_depth = 0
+
+    def start(self, tag, attrib):
+        if tag in self._skip_tags:
+            self._skip_depth += 1
+
+    def end(self, tag):
+        if tag in self._skip_tags and self._skip_depth:
+            self._skip_depth -= 1
+
+    def data(self, data):
+        if not self._skip_depth:
+            self._out.write(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return None
+
+
+class HTMLTextExtractor:
+    """Incrementally convert HTML to plain text in a single pass.
+
+    Feed the document in any number of pieces and call :meth:`close` for the
+    text. Tags in ``skip_tags`` (scripts and styles by default) are dropped
+    with their content and whitespace is collapsed as text arrives, so no
+    document tree is built. ``engine="auto"`` uses lxml when it is installed
+    and falls back to the standard library parser::
+
+        extractor = HTMLTextExtractor()
+        for piece in response.iter_content(decode_unicode=True):
+            extractor.feed(piece)
+        text = extractor.close()
+    """
+
+    def __init__(self, engine: str = "auto", skip_tags: Iterable[str] = SKIP_TAGS):
+        if engine not in ENGINES:
+            raise ValueError(f"不明なHTMLパーサーです: {engine}")
+        if engine == "lxml" and etree is None:
+            raise ImportError("lxmlがインストールされていません")
+        if engine == "auto":
+            engine = "lxml" if etree is not None else "html.parser"
+        self.engine = engine
+        self._out = _LineNormalizer()
+        if engine == "lxml":
+            self._parser = etree.HTMLParser(target=_LxmlTarget(self._out, skip_tags))
+        else:
+            self._parser = _StdlibParser(self._out, skip_tags)
+
+    def feed(self, data: str) -> None:
+        if data:
+            self._parser.feed(data)
+
+    def close(self) -> str:
+        if self.engine == "lxml":
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                # lxml raises on documents without any element (e.g. empty input).
+                pass
+        else:
+            self._parser.close()
+        return self._out.close()
+
+
+def html_to_text(html: str, engine: str = "auto") -> str:
+    """Strip tags, scripts and styles from ``html`` and collapse whitespace."""
+    extractor = HTMLTextExtractor(engine)
+    extractor.feed(html)
+    return extractor.close()
@@ -0,0 +1,565 @@
+"""Durable job queue and worker fleet for large generation runs.
+
+Work is split into jobs stored in a SQLite database:
+
+* ``source`` – extract one URL or file and split it into chunks,
+* ``chunk`` – propose categories for one chunk,
+* ``qa`` – generate the Q&A records of one (chunk, category).
+
+A finished job inserts its child jobs in the same transaction, so the queue
+always describes the remaining work. Any number of worker processes, on one
+machine or on several sharing the database file, claim jobs under a lease
+that a heartbeat keeps extending while the job runs (up to
+``max_job_seconds``); the jobs of a worker that dies or hangs are claimed
+again once their lease expires.
+
+A queue lives on a local disk in WAL mode by default. For workers on several
+machines, create it with ``--shared-fs``, which uses SQLite's rollback
+journal instead: WAL relies on shared memory that a network filesystem
+cannot provide, while the rollback journal only needs the filesystem to
+honour POSIX (fcntl) byte-range locks. ::
+
+    python -m qna_generator.jobs enqueue --queue jobs.db --url-list urls.txt
+    python -m qna_generator.jobs work --queue jobs.db --processes 4   # on every machine
+    python -m qna_generator.jobs status --queue jobs.db --watch 10
+    python -m qna_generator.jobs export --queue jobs.db --output qa.jsonl
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import namedtuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from qna_generator.data_processor import extract_text_from_source, source_info
+from qna_generator.pipeline import DEFAULT_CHUNK_TOKENS, QAEngine
+from qna_generator.utils import read_lines
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_MAX_JOB_SECONDS = 1800.0  # heartbeats stop extending a job running longer than this
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_INTERVAL = 1.0
+EXPORT_BATCH = 256  # finished Q&A jobs read per query by iter_records
+KINDS = ("source", "chunk", "qa")
+STATES = ("pending", "leased", "done", "failed")
+# Claim the deepest work first so sources in flight finish before new ones start.
+_PRIORITY = {"qa": 0, "chunk": 1, "source": 2}
+
+Job = namedtuple("Job", "id kind source source_index chunk_index category_index parent payload attempts")
+
+
+class JobQueue:
+    """SQLite-backed queue of source, chunk and Q&A jobs with leases.
+
+    Each instance holds one connection guarded by a lock, so it may be shared
+    by the threads of a worker; every process opens its own. Claims and
+    completions run in ``BEGIN IMMEDIATE`` transactions, which serialize them
+    across processes through SQLite's file lock.
+
+    ``shared_fs`` only matters when the queue is created: the database then
+    uses the rollback journal, which works on network filesystems with
+    working POSIX locks, instead of WAL. Later opens keep the file's mode.
+    """
+
+    def __init__(self, path: str, shared_fs: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        exists = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'jobs'").fetchone()
+        if not exists:
+            self._conn.execute("PRAGMA journal_mode=DELETE" if shared_fs else "PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY, kind TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "source TEXT NOT NULL, source_index INTEGER NOT NULL, "
+            "chunk_index INTEGER NOT NULL DEFAULT -1, category_index INTEGER NOT NULL DEFAULT -1, "
+            "parent INTEGER, payload TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, lease_until REAL, "
+            "result TEXT, error TEXT, updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_unit ON jobs(kind, source_index, chunk_index, category_index)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs(state, priority, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_lease ON jobs(state, lease_until)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def _transaction(self, func: Callable, *args):
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(conn, *args)
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def set_config(self, config: Dict) -> None:
+        """Store the generation settings every worker builds its engine from."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('config', ?)", (json.dumps(config, ensure_ascii=False),)
+            )
+
+    def config(self) -> Dict:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'config'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def enqueue_sources(self, sources: List[Tuple[str, str]]) -> int:
+        """Add ``(kind, value)`` sources after those already queued; return how many were new."""
+
+        def insert(conn):
+            known = {row[0] for row in conn.execute("SELECT source FROM jobs WHERE kind = 'source'")}
+            start = conn.execute("SELECT COALESCE(MAX(source_index) + 1, 0) FROM jobs").fetchone()[0]
+            new = [(kind, value) for kind, value in dict.fromkeys(sources) if value not in known]
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO jobs (kind, priority, source, source_index, payload, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    ("source", _PRIORITY["source"], value, start + i, json.dumps({"kind": kind}), now)
+                    for i, (kind, value) in enumerate(new)
+                ],
+            )
+            return len(new)
+
+        return self._transaction(insert)
+
+    def claim(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Optional[Job]:
+        """Lease the next runnable job to ``worker``, or return ``None`` if there is none.
+
+        Jobs whose lease has expired (their worker died or hung) are released
+        first, or marked failed once they have used ``max_attempts`` attempts.
+        """
+
+        def take(conn):
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = 'lease expired (worker ' || worker || ')', worker = NULL, updated = ? "
+                "WHERE state = 'leased' AND lease_until < ?",
+                (max_attempts, now, now),
+            )
+            row = conn.execute(
+                "SELECT id, kind, source, source_index, chunk_index, category_index, parent, payload, attempts "
+                "FROM jobs WHERE state = 'pending' ORDER BY priority, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = ?",
+                (worker, now + lease_seconds, now, row[0]),
+            )
+            return Job(*row[:7], json.loads(row[7]), row[8] + 1)
+
+        return self._transaction(take)
+
+    def heartbeat(self, worker: str, job_ids: List[int], lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+        """Extend the leases ``worker`` holds on ``job_ids``; return how many were extended."""
+        if not job_ids:
+            return 0
+        with self._lock:
+            return self._conn.execute(
+                f"UPDATE jobs SET lease_until = ? WHERE worker = ? AND state = 'leased' "
+                f"AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time() + lease_seconds, worker, *job_ids),
+            ).rowcount
+
+    def complete(self, job: Job, worker: str, result, children: List[Tuple[str, int, int, Dict]] = ()) -> bool:
+        """Store ``result`` and enqueue ``(kind, chunk_index, category_index, payload)`` children.
+
+        Returns False, without changing anything, if ``worker`` no longer
+        holds the lease (it expired and the job went to another worker).
+        """
+
+        def finish(conn):
+            now = time.time()
+            updated = conn.execute(
+                "UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_until = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND state = 'leased'",
+                (json.dumps(result, ensure_ascii=False), now, job.id, worker),
+            ).rowcount
+            if not updated:
+                return False
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (kind, priority, source, source_index, chunk_index, category_index, "
+                "parent, payload, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (kind, _PRIORITY[kind], job.source, job.source_index, chunk_index, category_index, job.id,
+                     json.dumps(payload, ensure_ascii=False), now)
+                    for kind, chunk_index, category_index, payload in children
+                ],
+            )
+            return True
+
+        return self._transaction(finish)
+
+    def fail(self, job: Job, worker: str, error: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        """Return ``job`` to the queue for another attempt, or mark it failed after ``max_attempts``."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, worker = NULL, lease_until = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND state = 'leased'",
+                (max_attempts, error, time.time(), job.id, worker),
+            )
+
+    def payload(self, job_id: int) -> Dict:
+        with self._lock:
+            return json.loads(self._conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+
+    def unfinished(self) -> int:
+        """Number of jobs that are pending or leased."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'leased')"
+            ).fetchone()[0]
+
+    def status(self, window: float = 60.0) -> Dict:
+        """Job counts per kind and state, active workers and recent throughput."""
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            counts = {kind: dict.fromkeys(STATES, 0) for kind in KINDS}
+            for kind, state, count in conn.execute("SELECT kind, state, COUNT(*) FROM jobs GROUP BY kind, state"):
+                counts[kind][state] = count
+            workers = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT DISTINCT worker FROM jobs WHERE state = 'leased' AND lease_until >= ? ORDER BY worker",
+                    (now,),
+                )
+            ]
+            recent = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'done' AND updated >= ?", (now - window,)
+            ).fetchone()[0]
+            records = conn.execute(
+                "SELECT COALESCE(SUM(json_array_length(result)), 0) FROM jobs WHERE kind = 'qa' AND state = 'done'"
+            ).fetchone()[0]
+            errors = conn.execute(
+                "SELECT kind, source, error FROM jobs WHERE state = 'failed' ORDER BY id LIMIT 10"
+            ).fetchall()
+        return {
+            "counts": counts,
+            "workers": workers,
+            "jobs_per_minute": recent * 60.0 / window,
+            "records": records,
+            "failed": errors,
+        }
+
+    def iter_records(self, batch_size: int = EXPORT_BATCH) -> Iterator[dict]:
+        """Yield the records of finished Q&A jobs in (source, chunk, category) order.
+
+        Results are read ``batch_size`` jobs at a time, so memory use does not
+        grow with the size of the run.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT result FROM jobs WHERE kind = 'qa' AND state = 'done' "
+                "ORDER BY source_index, chunk_index, category_index"
+            )
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for (result,) in rows:
+                    yield from json.loads(result)
+        finally:
+            cursor.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class Worker:
+    """Claim and run jobs from a :class:`JobQueue` on ``threads`` threads.
+
+    A heartbeat thread extends the leases of the jobs in progress every
+    third of ``lease_seconds``, but only until a job has run for
+    ``max_job_seconds``; after that a hung job's lease runs out and another
+    worker takes it over (the late result, if any, is discarded). Failed jobs are retried (by any worker) up to
+    ``max_attempts`` times. :meth:`run` returns once the queue has no pending
+    or leased jobs left.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        engine: QAEngine,
+        *,
+        threads: int = 1,
+        extract: Callable[[str, str], str] = extract_text_from_source,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_job_seconds: float = DEFAULT_MAX_JOB_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.engine = engine
+        self.threads = threads
+        self.extract = extract
+        self.lease_seconds = lease_seconds
+        self.max_job_seconds = max_job_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.completed = 0
+        self.failed = 0
+        self._counter_lock = threading.Lock()
+        self._running: Dict[int, float] = {}  # job id -> time.monotonic() when it started
+        self._stop = threading.Event()
+
+    def process(self, job: Job):
+        """Run ``job``; return ``(result, children)``."""
+        if job.kind == "source":
+            kind = job.payload["kind"]
+            chunks = self.engine.split(self.extract(kind, job.source))
+            info = source_info(kind, job.source)
+            children = [("chunk", i, -1, {"chunk": chunk, "source_info": info}) for i, chunk in enumerate(chunks)]
+            return len(chunks), children
+        if job.kind == "chunk":
+            categories = self.engine.generate_categories(job.payload["chunk"])
+            counts = self.engine.question_counts(len(categories))
+            children = [
+                ("qa", job.chunk_index, i, {"category": category, "count": count})
+                for i, (category, count) in enumerate(zip(categories, counts))
+            ]
+            return categories, children
+        chunk = self.queue.payload(job.parent)
+        records = self.engine.generate_category(
+            chunk["chunk"], job.payload["category"], job.payload["count"], chunk["source_info"]
+        )
+        return records, []
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            job = self.queue.claim(self.id, self.lease_seconds, self.max_attempts)
+            if job is None:
+                if not self.queue.unfinished():
+                    return
+                # Other workers hold the remaining jobs; wait in case their leases expire.
+                self._stop.wait(self.poll_interval)
+                continue
+            with self._counter_lock:
+                self._running[job.id] = time.monotonic()
+            try:
+                result, children = self.process(job)
+            except Exception as e:
+                logger.warning("%s job failed for %s (attempt %d): %s", job.kind, job.source, job.attempts, e)
+                self.queue.fail(job, self.id, str(e), self.max_attempts)
+                with self._counter_lock:
+                    self.failed += 1
+                continue
+            finally:
+                with self._counter_lock:
+                    del self._running[job.id]
+            if not self.queue.complete(job, self.id, result, children):
+                logger.warning("lease lost for %s job %d; result discarded", job.kind, job.id)
+                continue
+            with self._counter_lock:
+                self.completed += 1
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            deadline = time.monotonic() - self.max_job_seconds
+            with self._counter_lock:
+                job_ids = [job_id for job_id, started in self._running.items() if started > deadline]
+            try:
+                self.queue.heartbeat(self.id, job_ids, self.lease_seconds)
+            except Exception as e:  # e.g. "database is locked"; the next beat retries
+                logger.warning("heartbeat failed for worker %s: %s", self.id, e)
+
+    def run(self) -> int:
+        """Process jobs until the queue is drained; return the number completed."""
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        loops = [threading.Thread(target=self._loop) for _ in range(self.threads)]
+        for thread in loops:
+            thread.start()
+        try:
+            for thread in loops:
+                thread.join()
+        finally:
+            self._stop.set()
+        return self.completed
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def build_engine(config: Dict, api_key: str, *, cache_path: Optional[str] = None, rate_share: float = 1.0,
+                 stream: bool = False) -> QAEngine:
+    """Create the generator and engine described by a queue's stored ``config``."""
+    from qna_generator.ai_qa_generator import AIQAGenerator
+    from qna_generator.cache import ResponseCache
+    from qna_generator.rate_limit import DEFAULT_LIMITS, FALLBACK_LIMITS, RateLimiter
+
+    model = config.get("model", "gpt-4o-mini")
+    rpm, tpm = DEFAULT_LIMITS.get(model, FALLBACK_LIMITS)
+    rpm, tpm = config.get("rpm") or rpm, config.get("tpm") or tpm
+    generator = AIQAGenerator(
+        api_key=api_key,
+        model=model,
+        cache=ResponseCache(cache_path) if cache_path else None,
+        rate_limiter=RateLimiter({model: (max(1, int(rpm * rate_share)), max(1, int(tpm * rate_share)))}),
+        stream=stream,
+    )
+    return QAEngine(
+        generator,
+        num_categories=config.get("num_categories", 3),
+        questions=config.get("questions", 5),
+        total_questions=config.get("total_questions"),
+        block_size=config.get("block_size"),
+        chunk_tokens=config.get("chunk_tokens", DEFAULT_CHUNK_TOKENS),
+    )
+
+
+def _work(queue_path: str, api_key: str, threads: int, cache_path: Optional[str], rate_share: float,
+          lease_seconds: float, max_job_seconds: float, max_attempts: int) -> int:
+    queue = JobQueue(queue_path)
+    try:
+        engine = build_engine(queue.config(), api_key, cache_path=cache_path, rate_share=rate_share)
+        worker = Worker(queue, engine, threads=threads, lease_seconds=lease_seconds,
+                        max_job_seconds=max_job_seconds, max_attempts=max_attempts)
+        completed = worker.run()
+        print(f"worker {worker.id}: {completed} jobs done, {worker.failed} attempts failed", file=sys.stderr)
+        return completed
+    finally:
+        queue.close()
+
+
+def format_status(status: Dict) -> str:
+    lines = [f"{'kind':<8}" + "".join(f"{state:>10}" for state in STATES)]
+    for kind in KINDS:
+        lines.append(f"{kind:<8}" + "".join(f"{status['counts'][kind][state]:>10}" for state in STATES))
+    lines.append(
+        f"workers: {len(status['workers'])} active, {status['jobs_per_minute']:.1f} jobs/min, "
+        f"{status['records']} records"
+    )
+    for kind, source, error in status["failed"]:
+        lines.append(f"failed {kind} {source}: {error}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Durable Q&A generation queue shared by worker processes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add URLs or files and the generation settings to a queue.")
+    enqueue.add_argument("--url-list", help="Text file containing URLs (one per line).")
+    enqueue.add_argument("--file-list", help="Text file containing file paths to PDF or DOCX files.")
+    enqueue.add_argument("--model", default=None, help="OpenAI model name to use (default gpt-4o-mini).")
+    enqueue.add_argument("--num-categories", type=int, default=None, help="Number of categories per chunk.")
+    enqueue.add_argument("--questions", type=int, default=None, help="Questions generated per category.")
+    enqueue.add_argument("--total-questions", type=int, default=None, help="Questions per chunk (overrides --questions).")
+    enqueue.add_argument("--block-size", type=int, default=None, help="Questions per request.")
+    enqueue.add_argument("--rpm", type=int, default=None, help="Requests per minute for the whole fleet.")
+    enqueue.add_argument("--tpm", type=int, default=None, help="Tokens per minute for the whole fleet.")
+    enqueue.add_argument(
+        "--shared-fs", action="store_true",
+        help="Create the queue for workers on several machines (rollback journal instead of WAL).",
+    )
+
+    work = commands.add_parser("work", help="Run worker processes until the queue is drained.")
+    work.add_argument("--api-key", default=None, help="OpenAI API key. Defaults to OPENAI_API_KEY environment variable.")
+    work.add_argument("--processes", type=int, default=1, help="Worker processes on this machine.")
+    work.add_argument("--threads", type=int, default=8, help="Concurrent jobs per process.")
+    work.add_argument(
+        "--rate-share", type=float, default=None,
+        help="Fraction of the fleet's RPM/TPM budget used by this machine (default 1).",
+    )
+    work.add_argument(
+        "--cache", default=None, help="SQLite response cache shared by the processes (keep it on a local disk)."
+    )
+    work.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="Lease length in seconds.")
+    work.add_argument(
+        "--max-job-seconds", type=float, default=DEFAULT_MAX_JOB_SECONDS,
+        help="Stop extending the lease of a job running longer than this, so a hung job is retried.",
+    )
+    work.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, help="Attempts per job.")
+
+    status = commands.add_parser("status", help="Print job counts, active workers and throughput.")
+    status.add_argument("--watch", type=float, default=None, metavar="SECONDS", help="Refresh until drained.")
+
+    export = commands.add_parser("export", help="Write finished records in input order.")
+    export.add_argument("--output", required=True, help="Output JSONL path (.gz or .zst to compress).")
+
+    for command in (enqueue, work, status, export):
+        command.add_argument("--queue", required=True, help="SQLite queue file.")
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        sources = []
+        if args.url_list:
+            sources.extend(("url", url) for url in read_lines(args.url_list))
+        if args.file_list:
+            sources.extend(("file", path) for path in read_lines(args.file_list))
+        queue = JobQueue(args.queue, shared_fs=args.shared_fs)
+        settings = {
+            name: getattr(args, name)
+            for name in ("model", "num_categories", "questions", "total_questions", "block_size", "rpm", "tpm")
+            if getattr(args, name) is not None
+        }
+        queue.set_config({**queue.config(), **settings})
+        print(f"enqueued {queue.enqueue_sources(sources)} sources", file=sys.stderr)
+        queue.close()
+    elif args.command == "work":
+        api_key = args.api_key or os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            parser.error("OpenAI API key must be provided via --api-key or OPENAI_API_KEY environment variable.")
+        rate_share = (args.rate_share or 1.0) / args.processes
+        work_args = (args.queue, api_key, args.threads, args.cache, rate_share, args.lease,
+                     args.max_job_seconds, args.max_attempts)
+        if args.processes == 1:
+            _work(*work_args)
+        else:
+            processes = [
+                multiprocessing.Process(target=_work, args=work_args, daemon=False) for _ in range(args.processes)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        queue = JobQueue(args.queue)
+        print(format_status(queue.status()), file=sys.stderr)
+        queue.close()
+    elif args.command == "status":
+        queue = JobQueue(args.queue)
+        try:
+            while True:
+                print(format_status(queue.status()))
+                if args.watch is None or not queue.unfinished():
+                    break
+                time.sleep(args.watch)
+                print()
+        finally:
+            queue.close()
+    else:
+        from qna_generator.data_exporter import JsonlWriter
+
+        queue = JobQueue(args.queue)
+        with JsonlWriter(args.output) as writer:
+            writer.write_all(queue.iter_records())
+        queue.close()
+        print(f"wrote {writer.count} records to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
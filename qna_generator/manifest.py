@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+
+class Manifest:
+    """Content hash of every chunk of every source, with the Q&A generated from it.
+
+    The manifest left by the previous run is read for lookups while a fresh one
+    is written next to it (``PATH.tmp``); :meth:`commit` atomically replaces the
+    old file, so an interrupted run leaves the previous manifest intact. Each
+    line is ``{"source", "chunk", "hash", "records"}``; only file offsets of the
+    previous manifest are held in memory.
+
+    ``salt`` is mixed into every hash so that changing generation settings
+    invalidates all entries; pass :meth:`QAEngine.fingerprint
+    <qna_generator.pipeline.QAEngine.fingerprint>`, which covers the model,
+    question counts, chunk size and temperature schedule.
+    """
+
+    def __init__(self, path: str, *, salt: str = ""):
+        self.path = path
+        self.salt = salt
+        self.reused = 0
+        self.changed = 0
+        self._entries: Dict[Tuple[str, str], int] = {}
+        self._source_lines: Dict[str, List[int]] = {}
+        self._previous = None
+        if os.path.exists(path):
+            self._previous = open(path, "rb")
+            self._load()
+        self._new = open(f"{path}.tmp", "w", encoding="utf-8")
+        self._committed = False
+
+    def _load(self) -> None:
+        offset = 0
+        for line in self._previous:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            self._entries[entry["source"], entry["hash"]] = offset
+            self._source_lines.setdefault(entry["source"], []).append(offset)
+            offset += len(line)
+
+    def _read(self, offset: int) -> dict:
+        self._previous.seek(offset)
+        return json.loads(self._previous.readline())
+
+    def chunk_hash(self, chunk: str) -> str:
+        return hashlib.sha256(f"{self.salt}\0{chunk}".encode("utf-8")).hexdigest()
+
+    def lookup(self, source: str, chunk_hash: str) -> Optional[List[dict]]:
+        """Return the records generated for this chunk last time, or ``None`` if it changed."""
+        offset = self._entries.get((source, chunk_hash))
+        if offset is None:
+            self.changed += 1
+            return None
+        self.reused += 1
+        return self._read(offset)["records"]
+
+    def record(self, source: str, chunk_index: int, chunk_hash: str, records: List[dict]) -> None:
+        entry = {"source": source, "chunk": chunk_index, "hash": chunk_hash, "records": records}
+        self._new.write(json.dumps(entry, ensure_ascii=False))
+        self._new.write("\n")
+
+    def keep(self, source: str) -> None:
+        """Carry the previous entries of ``source`` over unchanged (e.g. after a failed fetch)."""
+        for offset in self._source_lines.get(source, []):
+            entry = self._read(offset)
+            self.record(source, entry["chunk"], entry["hash"], entry["records"])
+
+    def summary(self) -> str:
+        return f"manifest: {self.reused} chunks reused, {self.changed} new or changed"
+
+    def commit(self) -> None:
+        """Replace the previous manifest with the one written by this run."""
+        self._new.close()
+        if self._previous is not None:
+            self._previous.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        self._committed = True
+
+    def close(self) -> None:
+        """Discard this run's manifest unless it was committed."""
+        if self._committed:
+            return
+        self._new.close()
+        if self._previous is not None:
+            self._previous.close()
+        os.remove(f"{self.path}.tmp")
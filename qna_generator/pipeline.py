@@ -0,0 +1,373 @@
+import asyncio
+import json
+from collections import namedtuple
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from qna_generator.utils import (
+    calculate_temperature_step,
+    increment_temperature,
+    iter_text_chunks,
+    plan_temperature_bands,
+    split_text_into_chunks,
+)
+
+DEFAULT_CHUNK_TOKENS = 3000
+
+# Outcome of one category of one chunk: ``records`` on success, ``error`` otherwise.
+CategoryResult = namedtuple("CategoryResult", "category records error")
+
+
+class GenerationError(RuntimeError):
+    """Raised when category or Q&A generation returns an error."""
+
+
+def distribute_questions(total: int, num_categories: int) -> List[int]:
+    """Split ``total`` questions over ``num_categories`` as evenly as possible.
+
+    Earlier categories receive the remainder, e.g. 5 over 3 gives ``[2, 2, 1]``.
+    """
+    if num_categories <= 0:
+        return []
+    base, remainder = divmod(total, num_categories)
+    return [base + (1 if i < remainder else 0) for i in range(num_categories)]
+
+
+def make_record(qa: dict, category: str, source_info: str, temperature: float) -> dict:
+    return {
+        "category": category,
+        "question": qa.get("question", ""),
+        "answer": qa.get("answer", ""),
+        "source": qa.get("source", ""),
+        "source_info": source_info,
+        "temperature": temperature,
+    }
+
+
+class _TemperatureSchedule:
+    """Block sizes and temperatures for generating one category block by block.
+
+    ``calculate_temperature_step(target)`` questions are generated per
+    temperature, starting at 0.0 and raised with :func:`increment_temperature`.
+    """
+
+    def __init__(self, target: int, block_size: Optional[int]):
+        self.target = target
+        self.block_size = block_size or target
+        self.generated = 0
+        self.temperature = 0.0
+        self.step = calculate_temperature_step(target)
+        self.next_step = self.step
+
+    def next_block(self) -> Optional[Tuple[float, int, Optional[int]]]:
+        """Return ``(temperature, count, cache_variant)`` for the next request, or None when done."""
+        if self.generated >= self.target:
+            return None
+        count = min(self.block_size, self.target - self.generated)
+        return self.temperature, count, self.generated or None
+
+    def accept(self, pairs: list) -> bool:
+        """Count a block's Q&A pairs; return False if it produced none."""
+        self.generated += len(pairs)
+        while self.generated >= self.next_step:
+            self.temperature = increment_temperature(self.temperature)
+            self.next_step += self.step
+        return bool(pairs)
+
+
+def _error_message(result) -> Optional[str]:
+    if not isinstance(result, dict):
+        return "Q&Aの生成中に不明なエラーが発生しました"
+    return result.get("error")
+
+
+class QAEngine:
+    """Chunk → categories → Q&A generation shared by the app, the CLI and library code.
+
+    Questions per category are either ``questions`` each or ``total_questions``
+    spread over the generated categories (:func:`distribute_questions`). Each
+    category is generated ``block_size`` questions per request (``None`` means
+    all at once) with the temperature raised block by block; with
+    ``batch_categories`` all categories of a chunk share one request per
+    temperature band instead.
+
+    The pieces are pluggable:
+
+    * concurrency – the async methods run every category of a chunk (and, in
+      :meth:`arun`, every chunk) concurrently, capped by the generator's
+      ``max_concurrency``; the sync :meth:`generate_categories` and
+      :meth:`generate_category` let a caller schedule units on its own thread
+      pool, as the CLI does;
+    * caching – whatever ``cache`` the generator was built with;
+    * output – records are passed to ``sink`` in input order as soon as a chunk
+      is complete. ``on_record``, if given, additionally sees every record the
+      moment its pair has been streamed in (in completion order, per category
+      request; not used with ``batch_categories``), e.g. for a live preview.
+    """
+
+    def __init__(
+        self,
+        generator,
+        *,
+        num_categories: int = 3,
+        questions: int = 5,
+        total_questions: Optional[int] = None,
+        block_size: Optional[int] = None,
+        batch_categories: bool = False,
+        chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+        on_record: Optional[Callable[[dict], None]] = None,
+    ):
+        self.generator = generator
+        self.num_categories = num_categories
+        self.questions = questions
+        self.total_questions = total_questions
+        self.block_size = block_size
+        self.batch_categories = batch_categories
+        self.chunk_tokens = chunk_tokens
+        self.on_record = on_record
+
+    def split(self, text: str) -> List[str]:
+        return split_text_into_chunks(text, self.chunk_tokens)
+
+    def iter_chunks(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Chunk a text given as consecutive ``pieces`` (e.g. PDF pages) while they arrive.
+
+        Yields the same chunks as :meth:`split` on the joined text, each as
+        soon as it is complete. :meth:`split` returns a text that forms a
+        single chunk unchanged, so chunks completed at the end of the text are
+        held until it is known whether there is more than one. (A chunk
+        completed earlier is passed on at once; only if the rest of the text
+        is whitespace does it come out stripped where :meth:`split` would
+        keep the surrounding whitespace.)
+        """
+        if self.chunk_tokens <= 0:
+            yield "".join(pieces)
+            return
+        held: Optional[List[str]] = []  # pieces seen while there may be only one chunk
+        exhausted = False
+
+        def remember(pieces):
+            nonlocal exhausted
+            for piece in pieces:
+                if held is not None:
+                    held.append(piece)
+                yield piece
+            exhausted = True
+
+        first = None
+        for chunk in iter_text_chunks(remember(pieces), self.chunk_tokens):
+            if held is None:
+                yield chunk
+            elif first is None and not exhausted:
+                held = None
+                yield chunk
+            elif first is None:
+                first = chunk
+            else:
+                held = None
+                yield first
+                yield chunk
+        if held is not None:
+            yield "".join(held)
+
+    def question_counts(self, num_categories: int) -> List[int]:
+        """Questions to generate for each of ``num_categories`` categories of one chunk."""
+        if self.total_questions is not None:
+            return distribute_questions(self.total_questions, num_categories)
+        return [self.questions] * num_categories
+
+    def fingerprint(self) -> str:
+        """JSON of every setting that shapes the output for a chunk: model, counts, chunking and temperatures.
+
+        Used as the :class:`~qna_generator.manifest.Manifest` salt, so records
+        generated with other settings are never reused.
+        """
+        count = self.questions if self.total_questions is None else self.total_questions
+        settings = {
+            "model": getattr(self.generator, "model", None),
+            "num_categories": self.num_categories,
+            "questions": self.questions,
+            "total_questions": self.total_questions,
+            "block_size": self.block_size,
+            "batch_categories": self.batch_categories,
+            "chunk_tokens": self.chunk_tokens,
+            "temperatures": [temperature for temperature, _ in self.plan_blocks(count)],
+        }
+        return json.dumps(settings, sort_keys=True)
+
+    def plan_blocks(self, count: int) -> List[Tuple[float, int]]:
+        """``(temperature, questions)`` of each request for a ``count``-question category.
+
+        These are the blocks of :meth:`generate_category`, planned up front as
+        if every block returned all of its questions, for callers that submit
+        every request at once (the Batch API).
+        """
+        schedule = _TemperatureSchedule(count, self.block_size)
+        blocks: List[Tuple[float, int]] = []
+        while True:
+            block = schedule.next_block()
+            if block is None:
+                return blocks
+            temperature, n, _ = block
+            blocks.append((temperature, n))
+            schedule.accept([None] * n)
+
+    def _streaming(self, category: str, source_info: str, temperature: float) -> dict:
+        """Keyword arguments that stream a Q&A request into :attr:`on_record`."""
+        if self.on_record is None:
+            return {}
+        on_record = self.on_record
+        return {"on_pair": lambda qa: on_record(make_record(qa, category, source_info, temperature))}
+
+    def _check_categories(self, categories) -> List[str]:
+        if isinstance(categories, dict):
+            raise GenerationError(categories.get("error") or "カテゴリの生成中に不明なエラーが発生しました")
+        if not categories:
+            raise GenerationError("カテゴリが生成されませんでした")
+        return categories
+
+    def generate_categories(self, chunk: str) -> List[str]:
+        """Propose categories for ``chunk``; raise :class:`GenerationError` on failure."""
+        return self._check_categories(
+            self.generator.generate_categories(chunk, num_categories=self.num_categories)
+        )
+
+    async def agenerate_categories(self, chunk: str) -> List[str]:
+        return self._check_categories(
+            await self.generator.agenerate_categories(chunk, num_categories=self.num_categories)
+        )
+
+    def generate_category(self, chunk: str, category: str, count: int, source_info: str) -> List[dict]:
+        """Generate ``count`` records for one category; raise :class:`GenerationError` on failure."""
+        schedule = _TemperatureSchedule(count, self.block_size)
+        records: List[dict] = []
+        while True:
+            block = schedule.next_block()
+            if block is None:
+                return records
+            temperature, n, variant = block
+            result = self.generator.generate_qa_for_category(
+                chunk, category, temperature, n, cache_variant=variant,
+                **self._streaming(category, source_info, temperature),
+            )
+            error = _error_message(result)
+            if error:
+                raise GenerationError(error)
+            pairs = result.get("qa_pairs", [])
+            records.extend(make_record(qa, category, source_info, temperature) for qa in pairs)
+            if not schedule.accept(pairs):
+                return records
+
+    async def agenerate_category(self, chunk: str, category: str, count: int, source_info: str) -> List[dict]:
+        """Async counterpart of :meth:`generate_category`."""
+        schedule = _TemperatureSchedule(count, self.block_size)
+        records: List[dict] = []
+        while True:
+            block = schedule.next_block()
+            if block is None:
+                return records
+            temperature, n, variant = block
+            result = await self.generator.agenerate_qa_for_category(
+                chunk, category, temperature, n, cache_variant=variant,
+                **self._streaming(category, source_info, temperature),
+            )
+            error = _error_message(result)
+            if error:
+                raise GenerationError(error)
+            pairs = result.get("qa_pairs", [])
+            records.extend(make_record(qa, category, source_info, temperature) for qa in pairs)
+            if not schedule.accept(pairs):
+                return records
+
+    async def _agenerate_bands(
+        self, chunk: str, categories: List[str], counts: List[int], source_info: str
+    ) -> List[CategoryResult]:
+        # One request per temperature band covers every category; the pairs are then split by category.
+        async def band(band_index: int, temperature: float, band_counts: List[int]) -> dict:
+            category_counts = {c: n for c, n in zip(categories, band_counts) if n > 0}
+            result = await self.generator.agenerate_qa_for_categories(
+                chunk, category_counts, temperature, cache_variant=band_index
+            )
+            if result.get("error"):
+                raise GenerationError(result["error"])
+            return {
+                category: [make_record(qa, category, source_info, temperature) for qa in entry.get("qa_pairs", [])]
+                for category, entry in result["categories"].items()
+            }
+
+        bands = await asyncio.gather(
+            *(band(i, temperature, band_counts) for i, (temperature, band_counts) in enumerate(plan_temperature_bands(counts))),
+            return_exceptions=True,
+        )
+        errors = [b for b in bands if isinstance(b, Exception)]
+        if errors:
+            return [CategoryResult(", ".join(categories), [], str(errors[0]))]
+        return [CategoryResult(c, [qa for b in bands for qa in b.get(c, [])], None) for c in categories]
+
+    async def agenerate_chunk(self, chunk: str, categories: List[str], source_info: str) -> List[CategoryResult]:
+        """Generate every category of ``chunk`` concurrently; errors are returned per category."""
+        counts = self.question_counts(len(categories))
+        if self.batch_categories:
+            return await self._agenerate_bands(chunk, categories, counts, source_info)
+        outcomes = await asyncio.gather(
+            *(self.agenerate_category(chunk, c, n, source_info) for c, n in zip(categories, counts)),
+            return_exceptions=True,
+        )
+        return [
+            CategoryResult(c, [], str(o)) if isinstance(o, Exception) else CategoryResult(c, o, None)
+            for c, o in zip(categories, outcomes)
+        ]
+
+    async def _closing(self, coro):
+        try:
+            return await coro
+        finally:
+            # The connection pool is bound to the event loop, so close it before the loop ends.
+            await self.generator.aclose()
+
+    def run_chunk(self, chunk: str, categories: List[str], source_info: str) -> List[CategoryResult]:
+        """Blocking wrapper around :meth:`agenerate_chunk` for synchronous callers."""
+        return asyncio.run(self._closing(self.agenerate_chunk(chunk, categories, source_info)))
+
+    async def arun(
+        self,
+        documents: Iterable[Tuple[str, str]],
+        sink: Optional[Callable[[dict], None]] = None,
+    ) -> List[dict]:
+        """Generate records for ``(source_info, text)`` documents, all chunks concurrently.
+
+        Records are passed to ``sink`` (or collected and returned when no sink
+        is given) in document, chunk and category order. The first failing
+        chunk raises :class:`GenerationError` once earlier chunks are emitted.
+        """
+        collected: List[dict] = []
+        emit = collected.append if sink is None else sink
+
+        async def chunk_records(chunk: str, source_info: str) -> List[CategoryResult]:
+            categories = await self.agenerate_categories(chunk)
+            return await self.agenerate_chunk(chunk, categories, source_info)
+
+        tasks = [
+            asyncio.ensure_future(chunk_records(chunk, source_info))
+            for source_info, text in documents
+            for chunk in self.split(text)
+        ]
+        try:
+            for task in tasks:
+                for result in await task:
+                    if result.error:
+                        raise GenerationError(f"{result.category}: {result.error}")
+                    for record in result.records:
+                        emit(record)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return collected
+
+    def run(
+        self,
+        documents: Iterable[Tuple[str, str]],
+        sink: Optional[Callable[[dict], None]] = None,
+    ) -> List[dict]:
+        """Blocking wrapper around :meth:`arun`."""
+        return asyncio.run(self._closing(self.arun(documents, sink)))
@@ -0,0 +1,104 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# (requests per minute, tokens per minute); OpenAI usage tier 1 defaults.
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gpt-4o-mini": (500, 200_000),
+    "gpt-4o": (500, 30_000),
+}
+FALLBACK_LIMITS: Tuple[int, int] = (500, 30_000)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute / 60`` units per second.
+
+    :meth:`reserve` always succeeds and may drive the level negative; the
+    returned delay is how long the caller must wait before its reservation is
+    covered. Later callers therefore queue up behind earlier ones.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        now = self._clock()
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def drain(self, seconds: float) -> None:
+        """Withhold ``seconds`` worth of refill, e.g. after the server throttled us."""
+        self._refill(self._clock())
+        self.level = min(self.level, 0.0) - seconds * self.rate
+
+
+class RateLimiter:
+    """Client-side requests-per-minute and tokens-per-minute budgets per model.
+
+    Callers :meth:`acquire` (or ``await`` :meth:`aacquire`) with the estimated
+    token cost of a request before sending it, which spaces requests so that
+    they stay under both budgets instead of bursting into 429 responses.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        default: Tuple[int, int] = FALLBACK_LIMITS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.default = default
+        self._clock = clock
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def _buckets_for(self, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            rpm, tpm = self.limits.get(model, self.default)
+            buckets = (TokenBucket(rpm, self._clock), TokenBucket(tpm, self._clock))
+            self._buckets[model] = buckets
+        return buckets
+
+    def reserve(self, model: str, tokens: int) -> float:
+        """Reserve budget for one request and return the seconds to wait."""
+        with self._lock:
+            requests, token_bucket = self._buckets_for(model)
+            return max(requests.reserve(1), token_bucket.reserve(tokens))
+
+    def acquire(self, model: str, tokens: int) -> None:
+        delay = self.reserve(model, tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self, model: str, tokens: int) -> None:
+        delay = self.reserve(model, tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, model: str, seconds: float) -> None:
+        """Hold back all requests for ``model`` for about ``seconds``."""
+        with self._lock:
+            for bucket in self._buckets_for(model):
+                bucket.drain(seconds)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for retry number ``attempt`` (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# Shared by every AIQAGenerator that is not given its own limiter, so separate
+# generator instances in one process draw from the same budget.
+default_rate_limiter = RateLimiter()
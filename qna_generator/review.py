@@ -0,0 +1,106 @@
+import math
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional
+
+Page = namedtuple("Page", "indices number pages total")
+
+EDITABLE_FIELDS = ("question", "answer", "category")
+
+
+class QAStore:
+    """Q&A records with a category → record indices index kept up to date.
+
+    The Streamlit app keeps one store in its session state instead of a bare
+    list, so the review view can list categories and page through one
+    category without rescanning every record on each rerun. ``version`` is
+    increased by every change; use it to key widgets and memoize derived data
+    such as exports::
+
+        store = QAStore()
+        store.extend(records)
+        page = store.page(category="料金", number=2, size=25)
+        store.update_many({i: {"answer": "..."} for i in page.indices})
+    """
+
+    def __init__(self, records: Optional[Iterable[dict]] = None):
+        self.records: List[dict] = []
+        self._by_category: Dict[str, List[int]] = {}
+        self.version = 0
+        if records is not None:
+            self.extend(records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index: int) -> dict:
+        return self.records[index]
+
+    def extend(self, records: Iterable[dict]) -> None:
+        start = len(self.records)
+        self.records.extend(records)
+        for index in range(start, len(self.records)):
+            self._by_category.setdefault(self.records[index]["category"], []).append(index)
+        if len(self.records) > start:
+            self.version += 1
+
+    def replace(self, records: Iterable[dict]) -> None:
+        """Replace every record, e.g. with the survivors of deduplication."""
+        self.records = []
+        self._by_category = {}
+        self.extend(records)
+        self.version += 1
+
+    def clear(self) -> None:
+        self.replace([])
+
+    def categories(self) -> List[str]:
+        """Categories in the order they first appeared."""
+        return list(self._by_category)
+
+    def count(self, category: Optional[str] = None) -> int:
+        if category is None:
+            return len(self.records)
+        return len(self._by_category.get(category, ()))
+
+    def indices(self, category: Optional[str] = None, query: str = "") -> List[int]:
+        """Record indices in ``category`` (all if ``None``) whose question or answer contains ``query``."""
+        if category is None:
+            indices = range(len(self.records))
+        else:
+            indices = self._by_category.get(category, [])
+        if not query:
+            return list(indices)
+        return [i for i in indices if query in self.records[i]["question"] or query in self.records[i]["answer"]]
+
+    def page(self, category: Optional[str] = None, number: int = 1, size: int = 20, query: str = "") -> Page:
+        """Return page ``number`` (1-based, clamped to the last page) of :meth:`indices`."""
+        indices = self.indices(category, query)
+        pages = max(1, math.ceil(len(indices) / size))
+        number = min(max(1, number), pages)
+        start = (number - 1) * size
+        return Page(indices[start:start + size], number, pages, len(indices))
+
+    def update_many(self, edits: Dict[int, dict]) -> int:
+        """Apply ``{index: {field: value}}`` edits at once; return the number of records changed."""
+        changed = 0
+        for index, fields in edits.items():
+            record = self.records[index]
+            updates = {k: v for k, v in fields.items() if k in EDITABLE_FIELDS and record.get(k) != v}
+            if not updates:
+                continue
+            if "category" in updates:
+                old = self._by_category[record["category"]]
+                old.remove(index)
+                if not old:
+                    del self._by_category[record["category"]]
+                bucket = self._by_category.setdefault(updates["category"], [])
+                bucket.append(index)
+                bucket.sort()
+            record.update(updates)
+            changed += 1
+        if changed:
+            self.version += 1
+        return changed
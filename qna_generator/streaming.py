@@ -0,0 +1,98 @@
+import json
+from typing import List
+
+_WHITESPACE = " \t\r\n"
+
+
+class QAPairStreamParser:
+    """Incrementally extract complete objects from the ``qa_pairs`` arrays of a completion.
+
+    Feed the completion text as it arrives; :meth:`feed` returns every pair
+    object that was closed by the new text. Objects are decoded one by one,
+    so a malformed pair is skipped (and counted in :attr:`malformed`) without
+    losing the pairs around it, and the pairs of a truncated completion are
+    available even though the whole document never parses::
+
+        parser = QAPairStreamParser()
+        for delta in stream:
+            for pair in parser.feed(delta):
+                show(pair)
+    """
+
+    def __init__(self, key: str = "qa_pairs"):
+        self._marker = f'"{key}"'
+        self._buffer = ""
+        self._pos = 0
+        self._state = "seek"  # seek -> array -> object -> array ... -> seek
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.pairs = 0
+        self.malformed = 0
+
+    @property
+    def content(self) -> str:
+        return self._buffer
+
+    def feed(self, text: str) -> List[dict]:
+        self._buffer += text
+        found: List[dict] = []
+        buffer = self._buffer
+        pos = self._pos
+        end = len(buffer)
+        while pos < end:
+            if self._state == "seek":
+                marker = buffer.find(self._marker, pos)
+                bracket = buffer.find("[", marker + len(self._marker)) if marker >= 0 else -1
+                if bracket < 0:
+                    # Rescan from the marker, or from a possible partial marker, next time.
+                    pos = marker if marker >= 0 else max(pos, end - len(self._marker) + 1)
+                    break
+                self._state = "array"
+                pos = bracket + 1
+            elif self._state == "array":
+                char = buffer[pos]
+                if char == "{":
+                    self._state = "object"
+                    self._start = pos
+                    self._depth = 1
+                    self._in_string = self._escape = False
+                elif char == "]":
+                    self._state = "seek"
+                elif char not in _WHITESPACE and char != ",":
+                    self.malformed += 1
+                pos += 1
+            else:
+                char = buffer[pos]
+                pos += 1
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                    elif char == "\\":
+                        self._escape = True
+                    elif char == '"':
+                        self._in_string = False
+                elif char == '"':
+                    self._in_string = True
+                elif char == "{":
+                    self._depth += 1
+                elif char == "}":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._state = "array"
+                        try:
+                            pair = json.loads(buffer[self._start:pos])
+                        except ValueError:
+                            self.malformed += 1
+                            continue
+                        if isinstance(pair, dict):
+                            self.pairs += 1
+                            found.append(pair)
+        self._pos = pos
+        return found
+
+
+def salvage_qa_pairs(content: str) -> List[dict]:
+    """Return every complete, well-formed pair in ``content``, even if the document is not valid JSON."""
+    return QAPairStreamParser().feed(content)
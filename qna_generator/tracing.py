@@ -0,0 +1,298 @@
+import contextvars
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+_current_span = contextvars.ContextVar("qna_generator_span", default=None)
+_span_ids = itertools.count(1)
+
+# Numeric span attributes that are summed per stage in the summary table.
+SUMMARY_COLUMNS = ("prompt_tokens", "completion_tokens", "retries", "cache_hit", "truncated", "records")
+RESERVOIR_SIZE = 1024  # span durations kept per stage for percentiles
+
+
+class Span:
+    """One timed operation. Use as a context manager via :meth:`Tracer.span`.
+
+    Spans nest through a context variable, so a span opened inside another one
+    (in the same thread or asyncio task) records it as its parent.
+    """
+
+    __slots__ = ("tracer", "name", "span_id", "parent_id", "start", "duration", "attributes", "error",
+                 "handle", "_t0", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = None
+        self.start = None
+        self.duration = None
+        self.attributes = attributes
+        self.error = None
+        self.handle = None  # per-sink state, e.g. the OpenTelemetry span
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, **counters) -> None:
+        for key, value in counters.items():
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.tracer._start(self, parent)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._t0
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer._end(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_s": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NullSpan:
+    """Shared do-nothing span returned while tracing is disabled."""
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def add(self, **counters) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class JsonlSpanSink:
+    """Append every finished span to a JSONL file, one object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span, parent: Optional[Span]) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line)
+            self._file.write("\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class OpenTelemetrySpanSink:
+    """Mirror spans to OpenTelemetry through the ``opentelemetry-api`` package.
+
+    Exporting is configured the usual OpenTelemetry way (an SDK tracer provider,
+    e.g. via ``opentelemetry-instrument`` and ``OTEL_*`` environment variables);
+    without one the API is a no-op.
+    """
+
+    def __init__(self, name: str = "qna_generator"):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(name)
+
+    def on_start(self, span: Span, parent: Optional[Span]) -> None:
+        context = None
+        if parent is not None and parent.handle is not None:
+            context = self._trace.set_span_in_context(parent.handle)
+        span.handle = self._tracer.start_span(span.name, context=context, start_time=int(span.start * 1e9))
+
+    def on_end(self, span: Span) -> None:
+        for key, value in span.attributes.items():
+            if isinstance(value, (bool, int, float, str)):
+                span.handle.set_attribute(key, value)
+        if span.error is not None:
+            span.handle.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        span.handle.end(end_time=int((span.start + span.duration) * 1e9))
+
+    def close(self) -> None:
+        pass
+
+
+class StageSummary:
+    """Running totals of one stage.
+
+    Percentiles come from ``durations``, a uniform sample of at most
+    ``reservoir_size`` span durations (reservoir sampling), so memory stays
+    constant however many spans a long run records.
+    """
+
+    def __init__(self, name: str, reservoir_size: int = RESERVOIR_SIZE):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.durations: List[float] = []
+        self.totals: Dict[str, float] = {}
+        self.reservoir_size = reservoir_size
+        self._random = random.Random(name)
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if len(self.durations) < self.reservoir_size:
+            self.durations.append(duration)
+            return
+        slot = self._random.randrange(self.count)
+        if slot < self.reservoir_size:
+            self.durations[slot] = duration
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self.durations)
+        return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+class Tracer:
+    """Collect spans, aggregate them per stage and forward them to ``sinks``.
+
+    Install one with :func:`set_tracer`; instrumented code calls :func:`span`,
+    which does nothing while no tracer is installed::
+
+        tracer = Tracer([JsonlSpanSink("trace.jsonl")])
+        set_tracer(tracer)
+        ...
+        print(tracer.summary_table())
+        tracer.close()
+    """
+
+    enabled = True
+
+    def __init__(self, sinks: Iterable = ()):
+        self.sinks = list(sinks)
+        self._stages: Dict[str, StageSummary] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attributes) -> Span:
+        return Span(self, name, attributes)
+
+    def record(self, name: str, duration: float, **attributes) -> None:
+        """Record an already measured span, e.g. time accumulated over many small calls."""
+        span = Span(self, name, attributes)
+        parent = _current_span.get()
+        span.parent_id = parent.span_id if parent is not None else None
+        span.start = time.time() - duration
+        span.duration = duration
+        self._start(span, parent)
+        self._end(span)
+
+    def _start(self, span: Span, parent: Optional[Span]) -> None:
+        for sink in self.sinks:
+            sink.on_start(span, parent)
+
+    def _end(self, span: Span) -> None:
+        with self._lock:
+            stage = self._stages.get(span.name)
+            if stage is None:
+                stage = self._stages[span.name] = StageSummary(span.name)
+            stage.add(span.duration)
+            if span.error is not None:
+                stage.errors += 1
+            for key in SUMMARY_COLUMNS:
+                value = span.attributes.get(key)
+                if isinstance(value, (int, float)):
+                    stage.totals[key] = stage.totals.get(key, 0) + value
+        for sink in self.sinks:
+            sink.on_end(span)
+
+    def stages(self) -> List[StageSummary]:
+        with self._lock:
+            return sorted(self._stages.values(), key=lambda s: s.total, reverse=True)
+
+    def summary_table(self) -> str:
+        """Per-stage count, total/mean/p95 time, errors and summed token/retry/cache counts."""
+        stages = self.stages()
+        if not stages:
+            return "no spans recorded"
+        extra = [key for key in SUMMARY_COLUMNS if any(key in s.totals for s in stages)]
+        header = ["stage", "count", "total_s", "mean_ms", "p95_ms", "errors", *extra]
+        rows = [
+            [
+                s.name,
+                str(s.count),
+                f"{s.total:.2f}",
+                f"{s.total / s.count * 1000:.1f}",
+                f"{s.percentile(95) * 1000:.1f}",
+                str(s.errors),
+                *(f"{s.totals.get(key, 0):g}" for key in extra),
+            ]
+            for s in stages
+        ]
+        widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+        return "\n".join(
+            "  ".join(cell.ljust(w) if i == 0 else cell.rjust(w) for i, (cell, w) in enumerate(zip(row, widths)))
+            for row in [header, *rows]
+        )
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class NullTracer:
+    """The default tracer: spans cost one function call and record nothing."""
+
+    enabled = False
+
+    def span(self, name: str, **attributes) -> _NullSpan:
+        return NULL_SPAN
+
+    def record(self, name: str, duration: float, **attributes) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+_tracer = NullTracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def set_tracer(tracer) -> object:
+    """Install ``tracer`` process-wide (``None`` disables tracing); return the previous one."""
+    global _tracer
+    previous = _tracer
+    _tracer = tracer if tracer is not None else NullTracer()
+    return previous
+
+
+def span(name: str, **attributes):
+    """Open a span on the installed tracer: ``with span("chunk") as s: s.set(chunks=3)``."""
+    return _tracer.span(name, **attributes)
@@ -1,5 +1,18 @@
 import math
-from typing import List
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from qna_generator.tracing import span
+
+TIKTOKEN_ENCODING = "o200k_base"  # used by the gpt-4o model family
+_SENTENCE_PATTERN = re.compile(r"[^\n]*?(?:(?P<end>[。！？!?]+[」』）)\"']*|\.(?=\s)|\n+)|$)")
+
+
+def read_lines(path: str) -> List[str]:
+    """Return the non-empty, stripped lines of a UTF-8 text file (e.g. a URL list)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
 
 
 def calculate_temperature_step(question_count: int, *, max_temp: float = 0.8, increment: float = 0.1) -> int:
@@ -19,24 +32,194 @@ def increment_temperature(current_temp: float, *, increment: float = 0.1, max_te
     return min(current_temp + increment, max_temp)
 
 
-def split_text_into_chunks(text: str, max_tokens: int) -> List[str]:
-    """Split ``text`` into chunks each within ``max_tokens`` *approximate* tokens.
+def plan_temperature_bands(
+    question_counts: List[int], *, max_temp: float = 0.8, increment: float = 0.1
+) -> List[Tuple[float, List[int]]]:
+    """Group the questions of several categories into temperature bands.
 
-    This simple implementation treats whitespace-separated words as tokens to
-    avoid external dependencies. It ensures that each returned chunk contains at
-    most ``max_tokens`` words. If ``max_tokens`` is non-positive, the original
-    text is returned as a single chunk.
+    Each category follows the same schedule as the block-by-block generation
+    loop: ``calculate_temperature_step(count)`` questions per temperature,
+    starting at 0.0 and raised with :func:`increment_temperature`, with all
+    remaining questions generated once ``max_temp`` is reached. Returns a list
+    of ``(temperature, counts)`` where ``counts[i]`` is the number of questions
+    for category ``i`` at that temperature.
     """
+    steps = [calculate_temperature_step(c, max_temp=max_temp, increment=increment) for c in question_counts]
+    remaining = list(question_counts)
+    bands: List[Tuple[float, List[int]]] = []
+    temperature = 0.0
+    while any(r > 0 for r in remaining):
+        at_max = temperature >= max_temp
+        counts = [r if at_max else min(step, r) for step, r in zip(steps, remaining)]
+        bands.append((temperature, counts))
+        remaining = [r - c for r, c in zip(remaining, counts)]
+        temperature = increment_temperature(temperature, increment=increment, max_temp=max_temp)
+    return bands
 
-    if max_tokens <= 0:
-        return [text]
 
-    words = text.split()
-    if len(words) <= max_tokens:
-        return [text]
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of model tokens in ``text``.
+
+    Non-ASCII characters (e.g. Japanese) are counted as one token each and
+    ASCII text as one token per four characters, which errs on the high side
+    for typical OpenAI tokenizers without requiring one.
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_count = len(text) - non_ascii
+    return non_ascii + math.ceil(ascii_count / 4)
+
 
-    chunks: List[str] = []
-    for i in range(0, len(words), max_tokens):
-        chunk = " ".join(words[i : i + max_tokens])
-        chunks.append(chunk)
-    return chunks
+@lru_cache(maxsize=1)
+def _load_encoding():
+    """Return a tiktoken encoding, or None if tiktoken or its BPE ranks are unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count model tokens in ``text``.
+
+    Uses tiktoken's BPE (a requirement, see ``requirements.txt``) when its
+    ranks can be loaded; tiktoken downloads them on first use. Offline, it
+    falls back to the heuristic :func:`estimate_tokens`, which is not
+    tokenizer-accurate. That estimate usually overcounts Japanese (about
+    1.5-2x, since common kana and kanji runs often share tokens) and is within
+    roughly ±30% for English prose. It undercounts digit-, symbol- or
+    code-heavy ASCII text, by up to 4x when every character is its own token.
+    """
+    encoding = _load_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _split_sentences(texts: Iterable[str]) -> Iterator[str]:
+    """Yield sentences from consecutive pieces of one text (e.g. PDF pages).
+
+    A trailing sentence without a terminator is held back and joined with the
+    next piece, so sentences spanning a page break are kept whole.
+    """
+    pending = ""
+    for text in texts:
+        pending += text
+        matches = [m for m in _SENTENCE_PATTERN.finditer(pending) if m.group()]
+        pending = ""
+        if matches and matches[-1].group("end") is None:
+            pending = matches.pop().group()
+        for match in matches:
+            yield match.group()
+    if pending:
+        yield pending
+
+
+def _split_oversized(sentence: str, max_tokens: int, count: Callable[[str], int]) -> Iterator[Tuple[str, int]]:
+    """Split a sentence longer than ``max_tokens`` at word, then character, boundaries."""
+    pieces: List[str] = []
+    for word in re.findall(r"\S+\s*|\s+", sentence):
+        if count(word) > max_tokens:
+            pieces.extend(word)
+        else:
+            pieces.append(word)
+    current: List[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = count(piece)
+        if current and current_tokens + tokens > max_tokens:
+            yield "".join(current), current_tokens
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        yield "".join(current), current_tokens
+
+
+def iter_text_chunks(
+    texts: Iterable[str],
+    max_tokens: int,
+    *,
+    overlap: int = 0,
+    token_counter: Optional[Callable[[str], int]] = None,
+) -> Iterator[str]:
+    """Lazily chunk a text given as consecutive pieces, such as PDF pages.
+
+    Works like :func:`split_text_into_chunks` but yields each chunk as soon as
+    it is complete, so downstream work can start before the whole document
+    has been extracted. ``max_tokens`` must be positive.
+    """
+
+    count = token_counter or count_tokens
+    overlap = max(0, min(overlap, max_tokens - 1))
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+    fresh = False  # whether ``current`` holds anything beyond the overlap
+
+    def flush() -> str:
+        nonlocal current, current_tokens, fresh
+        chunk = "".join(s for s, _ in current).strip()
+        carried: List[Tuple[str, int]] = []
+        carried_tokens = 0
+        for sentence, tokens in reversed(current):
+            if carried_tokens + tokens > overlap:
+                break
+            carried.insert(0, (sentence, tokens))
+            carried_tokens += tokens
+        current, current_tokens, fresh = carried, carried_tokens, False
+        return chunk
+
+    for sentence in _split_sentences(texts):
+        tokens = count(sentence)
+        # Pieces of an oversized sentence leave room for the overlap carried before each of them.
+        parts = (
+            [(sentence, tokens)] if tokens <= max_tokens else _split_oversized(sentence, max_tokens - overlap, count)
+        )
+        for part, part_tokens in parts:
+            if fresh and current_tokens + part_tokens > max_tokens:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+            while current and current_tokens + part_tokens > max_tokens:
+                _, dropped = current.pop(0)  # shrink the overlap to make room
+                current_tokens -= dropped
+            current.append((part, part_tokens))
+            current_tokens += part_tokens
+            fresh = True
+
+    if fresh:
+        chunk = flush()
+        if chunk:
+            yield chunk
+
+
+def split_text_into_chunks(
+    text: str,
+    max_tokens: int,
+    *,
+    overlap: int = 0,
+    token_counter: Optional[Callable[[str], int]] = None,
+) -> List[str]:
+    """Split ``text`` into chunks of at most ``max_tokens`` tokens.
+
+    Chunks end on sentence boundaries (``。！？!?``, ``. `` and line breaks) so
+    text without spaces, such as Japanese, is split as reliably as English.
+    Sentences longer than ``max_tokens`` are split at word or character
+    boundaries. Each sentence is counted once, so the text is processed in a
+    single pass. With ``overlap`` > 0, each chunk starts with up to ``overlap``
+    tokens of trailing sentences from the previous chunk; a sentence longer
+    than ``max_tokens`` is cut into pieces of ``max_tokens - overlap`` tokens,
+    so every piece after the first is preceded by the full previous piece.
+
+    ``token_counter`` defaults to :func:`count_tokens`. If ``max_tokens`` is
+    non-positive or the whole text fits, the original text is returned as a
+    single chunk.
+    """
+
+    if max_tokens <= 0:
+        return [text]
+    with span("chunk", chars=len(text)) as chunk_span:
+        chunks = list(iter_text_chunks([text], max_tokens, overlap=overlap, token_counter=token_counter))
+        chunk_span.set(chunks=len(chunks))
+    return chunks if len(chunks) > 1 else [text]
@@ -0,0 +1,116 @@
+"""A local stand-in for ``AIQAGenerator`` shared by the engine, CLI, manifest and job queue tests."""
+
+import asyncio
+import threading
+import time
+
+
+class Gauge:
+    """Counts calls in progress and remembers the highest count."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+class FakeGenerator:
+    """Answers every request locally and records it.
+
+    Categories are ``categories`` cut to ``num_categories``; a Q&A request
+    returns ``num_questions`` pairs with questions ``{text}/{category}/{n}``,
+    numbered from ``cache_variant``. Requests for a category in ``failing``
+    (or a ``(text, category)`` pair in it) return an error, only the first
+    ``failures`` times when that is given.
+
+    Sync calls take ``latency(text)`` seconds and the peak number running at
+    once is kept in ``gauge``; ``on_categories`` is called with each chunk
+    after its categories. ``calls`` lists ``(category, temperature,
+    num_questions, cache_variant)`` and ``qa_calls`` ``(text, category)`` of
+    every Q&A request.
+    """
+
+    model = "fake-model"
+
+    def __init__(self, categories=("料金", "手続き"), failing=(), failures=None, latency=None, on_categories=None):
+        self.categories = list(categories)
+        self.failing = set(failing)
+        self.failures = failures
+        self.latency = latency
+        self.on_categories = on_categories
+        self.gauge = Gauge()
+        self.calls = []
+        self.qa_calls = []
+        self.closed = 0
+        self._lock = threading.Lock()
+
+    def _wait(self, text):
+        with self.gauge:
+            if self.latency is not None:
+                time.sleep(self.latency(text))
+
+    def _fails(self, text, category):
+        if category not in self.failing and (text, category) not in self.failing:
+            return False
+        with self._lock:
+            if self.failures is None:
+                return True
+            if self.failures:
+                self.failures -= 1
+                return True
+            return False
+
+    def _qa(self, text, category, temperature, num_questions, cache_variant, on_pair=None):
+        with self._lock:
+            self.calls.append((category, temperature, num_questions, cache_variant))
+            self.qa_calls.append((text, category))
+        if self._fails(text, category):
+            return {"error": "Q&A生成エラー: boom"}
+        start = cache_variant or 0
+        pairs = [
+            {"question": f"{text}/{category}/{start + i}", "answer": "A", "source": text}
+            for i in range(num_questions)
+        ]
+        for pair in pairs if on_pair is not None else []:
+            on_pair(pair)
+        return {"qa_pairs": pairs}
+
+    def generate_categories(self, text, temperature=0.0, num_categories=3):
+        self._wait(text)
+        if self.on_categories is not None:
+            self.on_categories(text)
+        return self.categories[:num_categories]
+
+    async def agenerate_categories(self, text, temperature=0.0, num_categories=3):
+        return self.generate_categories(text, temperature, num_categories)
+
+    def generate_qa_for_category(self, text, category, temperature=0.0, num_questions=5, cache_variant=None,
+                                 on_pair=None):
+        self._wait(text)
+        return self._qa(text, category, temperature, num_questions, cache_variant, on_pair)
+
+    async def agenerate_qa_for_category(self, text, category, temperature=0.0, num_questions=5, cache_variant=None,
+                                        on_pair=None):
+        await asyncio.sleep(0)
+        return self._qa(text, category, temperature, num_questions, cache_variant, on_pair)
+
+    async def agenerate_qa_for_categories(self, text, category_counts, temperature=0.0, cache_variant=None):
+        self.calls.append((tuple(category_counts), temperature, sum(category_counts.values()), cache_variant))
+        return {
+            "categories": {
+                category: {"qa_pairs": [{"question": f"{category}/{temperature}/{i}"} for i in range(n)]}
+                for category, n in category_counts.items()
+            }
+        }
+
+    async def aclose(self):
+        self.closed += 1
@@ -0,0 +1,341 @@
+"""Local stand-in for the OpenAI chat, embedding, file and batch endpoints used in tests and benchmarks."""
+
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _qa_pairs(count):
+    return [{"question": "質問", "answer": "回答", "source": "引用"}] * count
+
+
+def default_responder(body):
+    """Return completion text for a chat request body, with as many pairs as requested."""
+    prompt = body["messages"][-1]["content"]
+    if prompt.endswith("カテゴリ:"):
+        return "料金, 手続き"
+    if "カテゴリと質問数:" in prompt:
+        requested = prompt.split("カテゴリと質問数:\n", 1)[1].split("\nテキスト:", 1)[0]
+        entries = [line[2:].rsplit(": ", 1) for line in requested.splitlines()]
+        return json.dumps(
+            {"categories": [{"category": name, "qa_pairs": _qa_pairs(int(count[:-1]))} for name, count in entries]},
+            ensure_ascii=False,
+        )
+    match = re.search(r"回答を(\d+)つ", prompt)
+    return json.dumps({"qa_pairs": _qa_pairs(int(match.group(1)) if match else 1)}, ensure_ascii=False)
+
+
+def fake_embedding(text, dim=16):
+    """Deterministic pseudo-embedding: identical texts get identical vectors."""
+    digest = hashlib.shake_128(text.encode("utf-8")).digest(dim)
+    return [byte / 127.5 - 1.0 for byte in digest]
+
+
+def completion_body(content, model="fake-model", prompt_tokens=0, max_tokens=None):
+    finish_reason = "stop"
+    if max_tokens is not None and len(content) > max_tokens:
+        content, finish_reason = content[:max_tokens], "length"
+    completion_tokens = len(content)
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def stream_events(payload, piece=8):
+    """Split a completion body into ``chat.completion.chunk`` events of ``piece`` characters."""
+    choice = payload["choices"][0]
+    content = choice["message"]["content"]
+    base = {"id": payload["id"], "object": "chat.completion.chunk", "created": payload["created"], "model": payload["model"]}
+    events = [{**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}]
+    for start in range(0, len(content), piece):
+        delta = {"content": content[start:start + piece]}
+        events.append({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+    events.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": choice["finish_reason"]}]})
+    events.append({**base, "choices": [], "usage": payload["usage"]})
+    return events
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # benchmarks open many connections at once
+
+
+class FakeOpenAIServer:
+    """Serve chat completions, embeddings, ``/v1/files`` and ``/v1/batches`` on a free local port.
+
+    Chat completions are answered with ``responder`` after ``latency`` seconds
+    (plus up to ``jitter`` more). A ``rate_limit_rate`` fraction of them get a
+    429 with a ``Retry-After`` of ``retry_after`` seconds and an ``error_rate``
+    fraction a 500. Token usage is reported as one token per character, and
+    content longer than the request's ``max_tokens`` is cut off with
+    ``finish_reason == "length"``. Requests with ``stream=True`` are answered
+    with server-sent events of ``stream_piece`` characters, ``stream_interval``
+    seconds apart; other requests wait as long before the whole answer is sent.
+
+    Embedding requests get :func:`fake_embedding` vectors of ``embedding_dim``.
+
+    Batches report ``in_progress`` for ``polls_until_complete`` retrievals and
+    are then completed by answering every input line with ``responder``.
+    """
+
+    def __init__(
+        self,
+        responder=default_responder,
+        polls_until_complete=1,
+        *,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        rate_limit_rate=0.0,
+        retry_after=0.05,
+        seed=0,
+        stream_piece=8,
+        stream_interval=0.0,
+        embedding_dim=16,
+    ):
+        self.responder = responder
+        self.polls_until_complete = polls_until_complete
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stream_piece = stream_piece
+        self.stream_interval = stream_interval
+        self.embedding_dim = embedding_dim
+        self.files = {}
+        self.batches = {}
+        self.chat_requests = 0
+        self.embedding_requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _new_id(self, prefix):
+        return f"{prefix}-{next(self._ids)}"
+
+    def _store_file(self, content, filename, purpose):
+        file_id = self._new_id("file")
+        self.files[file_id] = content
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    def stats(self):
+        """Chat request counters, also served as JSON from ``GET /_stats``."""
+        with self._lock:
+            return {
+                "chat_requests": self.chat_requests,
+                "embedding_requests": self.embedding_requests,
+                "rate_limited": self.rate_limited,
+                "errors": self.errors,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+    def _chat(self, body):
+        """Return ``(status, payload, headers)`` for one chat completion request."""
+        with self._lock:
+            self.chat_requests += 1
+            roll = self._random.random()
+            delay = self.latency + self._random.random() * self.jitter
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.rate_limited += 1
+            error = {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}
+            return 429, {"error": error}, {"retry-after": str(self.retry_after)}
+        time.sleep(delay)
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return 500, {"error": {"message": "internal error", "type": "server_error"}}, {}
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"])
+        payload = completion_body(self.responder(body), body["model"], prompt_tokens, body.get("max_tokens"))
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += payload["usage"]["completion_tokens"]
+        if self.stream_interval and not body.get("stream"):
+            # A non-streamed answer arrives once the whole completion is generated.
+            time.sleep(len(stream_events(payload, self.stream_piece)) * self.stream_interval)
+        return 200, payload, {}
+
+    def _embed(self, body):
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(len(text) for text in inputs)
+        with self._lock:
+            self.embedding_requests += 1
+            self.prompt_tokens += tokens
+        return {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text, self.embedding_dim)}
+                for i, text in enumerate(inputs)
+            ],
+            "model": body["model"],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _complete_batch(self, batch):
+        lines = []
+        for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            request = json.loads(line)
+            body = completion_body(
+                self.responder(request["body"]), request["body"]["model"], max_tokens=request["body"].get("max_tokens")
+            )
+            lines.append(
+                json.dumps(
+                    {
+                        "id": self._new_id("response"),
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "request_id": "req", "body": body},
+                        "error": None,
+                    },
+                    ensure_ascii=False,
+                )
+            )
+        output = self._store_file(("\n".join(lines) + "\n").encode("utf-8"), "output.jsonl", "batch_output")
+        batch.update(status="completed", output_file_id=output["id"], completed_at=int(time.time()))
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status=200, headers=None):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_events(self, events):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in [*(json.dumps(e, ensure_ascii=False) for e in events), "[DONE]"]:
+                    data = f"data: {event}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                    if server.stream_interval:
+                        time.sleep(server.stream_interval)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_POST(self):
+                if self.path == "/v1/chat/completions":
+                    body = json.loads(self._body())
+                    status, payload, headers = server._chat(body)
+                    if status == 200 and body.get("stream"):
+                        self._send_events(stream_events(payload, server.stream_piece))
+                    else:
+                        self._send_json(payload, status, headers)
+                elif self.path == "/v1/embeddings":
+                    self._send_json(server._embed(json.loads(self._body())))
+                elif self.path == "/v1/files":
+                    header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                    message = BytesParser(policy=default_policy).parsebytes(header + self._body())
+                    fields = {}
+                    for part in message.iter_parts():
+                        name = part.get_param("name", header="content-disposition")
+                        fields[name] = (part.get_filename(), part.get_payload(decode=True))
+                    filename, content = fields["file"]
+                    purpose = fields["purpose"][1].decode()
+                    self._send_json(server._store_file(content, filename, purpose))
+                elif self.path == "/v1/batches":
+                    request = json.loads(self._body())
+                    batch = {
+                        "id": server._new_id("batch"),
+                        "object": "batch",
+                        "endpoint": request["endpoint"],
+                        "input_file_id": request["input_file_id"],
+                        "completion_window": request["completion_window"],
+                        "status": "validating",
+                        "created_at": int(time.time()),
+                        "output_file_id": None,
+                        "polls": 0,
+                    }
+                    server.batches[batch["id"]] = batch
+                    self._send_json({k: v for k, v in batch.items() if k != "polls"})
+                else:
+                    self._send_json({"error": {"message": "not found"}}, 404)
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if parts == ["_stats"]:
+                    self._send_json(server.stats())
+                elif parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in server.batches:
+                    batch = server.batches[parts[2]]
+                    batch["polls"] += 1
+                    if batch["status"] != "completed":
+                        if batch["polls"] > server.polls_until_complete:
+                            server._complete_batch(batch)
+                        else:
+                            batch["status"] = "in_progress"
+                    self._send_json({k: v for k, v in batch.items() if k != "polls"})
+                elif parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content":
+                    data = server.files[parts[2]]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    self._send_json({"error": {"message": "not found"}}, 404)
+
+        return Handler
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from openai import RateLimitError
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_openai_server import FakeOpenAIServer
+from qna_generator import ai_qa_generator
+from qna_generator.ai_qa_generator import AIQAGenerator
+from qna_generator.cache import ResponseCache
+
+QA_CONTENT = json.dumps(
+    {"qa_pairs": [{"question": "Q1", "answer": "A1", "source": "src"}]},
+    ensure_ascii=False,
+)
+
+
+def make_response(content):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeAsyncClient:
+    """Records the peak number of concurrent ``create`` calls."""
+
+    def __init__(self, content=QA_CONTENT):
+        self.content = content
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return make_response(self.content)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_async(monkeypatch):
+    client = FakeAsyncClient()
+    monkeypatch.setattr(ai_qa_generator, "AsyncOpenAI", lambda **kwargs: client)
+    return client
+
+
+def test_agenerate_qa_for_category(fake_async):
+    generator = AIQAGenerator(api_key="test")
+    result = asyncio.run(generator.agenerate_qa_for_category("text", "cat", 0.3, 2))
+    assert result == json.loads(QA_CONTENT)
+    assert fake_async.calls[0]["temperature"] == 0.3
+    assert "2つ" in fake_async.calls[0]["messages"][1]["content"]
+
+
+def test_agenerate_categories(fake_async):
+    fake_async.content = "A, B, C, D"
+    generator = AIQAGenerator(api_key="test")
+    result = asyncio.run(generator.agenerate_categories("text", num_categories=3))
+    assert result == ["A", "B", "C"]
+
+
+def test_async_concurrency_is_capped(fake_async):
+    generator = AIQAGenerator(api_key="test", max_concurrency=3)
+
+    async def run():
+        return await asyncio.gather(
+            *(generator.agenerate_qa_for_category("text", "cat") for _ in range(20))
+        )
+
+    results = asyncio.run(run())
+    assert len(results) == 20
+    assert fake_async.peak == 3
+
+
+def test_async_error_is_returned(monkeypatch):
+    class FailingClient(FakeAsyncClient):
+        async def create(self, **kwargs):
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(ai_qa_generator, "AsyncOpenAI", lambda **kwargs: FailingClient())
+    generator = AIQAGenerator(api_key="test")
+    result = asyncio.run(generator.agenerate_qa_for_category("text", "cat"))
+    assert "boom" in result["error"]
+    assert "boom" in asyncio.run(generator.agenerate_categories("text"))["error"]
+
+
+def test_generate_uses_response_cache(tmp_path):
+    class FakeSyncClient:
+        def __init__(self):
+            self.calls = 0
+            self.chat = SimpleNamespace(completions=self)
+
+        def create(self, **kwargs):
+            self.calls += 1
+            return make_response(QA_CONTENT)
+
+    generator = AIQAGenerator(api_key="test", cache=ResponseCache(str(tmp_path / "c.db")))
+    generator.client = FakeSyncClient()
+    first = generator.generate_qa_for_category("text", "cat")
+    second = generator.generate_qa_for_category("text", "cat")
+    assert first == second
+    assert generator.client.calls == 1
+    generator.generate_qa_for_category("text", "cat", cache_variant=1)
+    assert generator.client.calls == 2
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    class FlakySyncClient:
+        def __init__(self):
+            self.calls = 0
+            self.chat = SimpleNamespace(completions=self)
+
+        def create(self, **kwargs):
+            self.calls += 1
+            if self.calls < 3:
+                response = SimpleNamespace(
+                    status_code=429, headers={"retry-after": "0"}, request=None
+                )
+                raise RateLimitError("slow down", response=response, body=None)
+            return make_response(QA_CONTENT)
+
+    monkeypatch.setattr(ai_qa_generator.time, "sleep", lambda seconds: None)
+    generator = AIQAGenerator(api_key="test", rate_limiter=None)
+    generator.client = FlakySyncClient()
+    assert generator.generate_qa_for_category("text", "cat") == json.loads(QA_CONTENT)
+    assert generator.client.calls == 3
+    assert generator.retries == 2
+
+
+def test_non_retryable_errors_fail_fast():
+    class BrokenSyncClient:
+        def __init__(self):
+            self.calls = 0
+            self.chat = SimpleNamespace(completions=self)
+
+        def create(self, **kwargs):
+            self.calls += 1
+            raise ValueError("bad request")
+
+    generator = AIQAGenerator(api_key="test", rate_limiter=None)
+    generator.client = BrokenSyncClient()
+    assert "bad request" in generator.generate_qa_for_category("text", "cat")["error"]
+    assert generator.client.calls == 1
+    assert "bad request" in generator.generate_categories("text")["error"]
+
+
+def test_generate_qa_for_categories_single_request():
+    content = json.dumps(
+        {
+            "categories": [
+                {"category": "A", "qa_pairs": [{"question": "QA", "answer": "a"}]},
+                {"category": "B (renamed)", "qa_pairs": [{"question": "QB", "answer": "b"}]},
+            ]
+        },
+        ensure_ascii=False,
+    )
+
+    class FakeSyncClient:
+        def __init__(self):
+            self.calls = []
+            self.chat = SimpleNamespace(completions=self)
+
+        def create(self, **kwargs):
+            self.calls.append(kwargs)
+            return make_response(content)
+
+    generator = AIQAGenerator(api_key="test", rate_limiter=None)
+    generator.client = FakeSyncClient()
+    result = generator.generate_qa_for_categories("text", {"A": 1, "B": 1}, 0.2)
+    assert len(generator.client.calls) == 1
+    assert result["categories"]["A"]["qa_pairs"][0]["question"] == "QA"
+    assert result["categories"]["B"]["qa_pairs"][0]["question"] == "QB"
+
+
+def test_generator_retries_throttled_requests_against_fake_server():
+    with FakeOpenAIServer(rate_limit_rate=0.3, error_rate=0.1, retry_after=0.01, seed=1) as server:
+        generator = AIQAGenerator(
+            api_key="test", base_url=server.base_url, rate_limiter=None, max_retries=10
+        )
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    *(generator.agenerate_qa_for_category("本文", "料金", cache_variant=i) for i in range(20))
+                )
+            finally:
+                await generator.aclose()
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(ai_qa_generator, "backoff_delay", lambda attempt: 0.01)
+            results = asyncio.run(run())
+        stats = server.stats()
+
+    assert all(result["qa_pairs"][0]["question"] == "質問" for result in results)
+    assert stats["rate_limited"] + stats["errors"] == generator.retries > 0
+    assert stats["chat_requests"] == 20 + generator.retries
+    assert stats["completion_tokens"] > 0
@@ -0,0 +1,93 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_openai_server import FakeOpenAIServer
+from qna_generator.ai_qa_generator import AIQAGenerator
+from qna_generator.batch import BatchRunner, generate_with_batches
+from qna_generator.budget import OutputBudget
+from qna_generator.pipeline import QAEngine
+
+
+def uploaded_requests(server):
+    """Requests of every batch submitted to ``server``, in submission order."""
+    return [
+        [json.loads(line) for line in server.files[batch["input_file_id"]].decode("utf-8").splitlines()]
+        for batch in server.batches.values()
+    ]
+
+
+def test_generate_with_batches_joins_results(tmp_path):
+    with FakeOpenAIServer(polls_until_complete=2) as server:
+        generator = AIQAGenerator(api_key="test", base_url=server.base_url)
+        runner = BatchRunner(generator, workdir=str(tmp_path), poll_interval=0)
+        records = list(
+            generate_with_batches(
+                [("URL: http://a", "本文A"), ("File: b.pdf", "本文B")],
+                runner,
+                engine=QAEngine(generator, num_categories=2, questions=1),
+            )
+        )
+        requests = uploaded_requests(server)
+    assert len(server.batches) == 2
+    assert [(r["source_info"], r["category"]) for r in records] == [
+        ("URL: http://a", "料金"),
+        ("URL: http://a", "手続き"),
+        ("File: b.pdf", "料金"),
+        ("File: b.pdf", "手続き"),
+    ]
+    assert records[0]["question"] == "質問"
+    request = requests[1][0]
+    assert request["custom_id"] == "qa-0-0-0-0"
+    assert request["body"]["messages"] == generator.qa_messages("本文A", "料金", 1)
+    assert list(tmp_path.iterdir()) == []  # input files are removed once uploaded
+
+def test_failed_units_are_skipped(tmp_path):
+    def responder(body):
+        prompt = body["messages"][-1]["content"]
+        if prompt.endswith("カテゴリ:"):
+            return "料金"
+        return "not json" if "本文A" in prompt else json.dumps(
+            {"qa_pairs": [{"question": "Q", "answer": "A", "source": "S"}]}
+        )
+
+    with FakeOpenAIServer(responder=responder, polls_until_complete=0) as server:
+        generator = AIQAGenerator(api_key="test", base_url=server.base_url)
+        runner = BatchRunner(generator, workdir=str(tmp_path), poll_interval=0)
+        records = list(generate_with_batches([("a", "本文A"), ("b", "本文B")], runner))
+
+    assert [r["source_info"] for r in records] == ["b"]
+
+
+
+def test_blocks_and_question_totals_follow_the_engine(tmp_path):
+    with FakeOpenAIServer(polls_until_complete=0) as server:
+        generator = AIQAGenerator(api_key="test", base_url=server.base_url)
+        engine = QAEngine(generator, num_categories=2, total_questions=5, block_size=2)
+        records = list(generate_with_batches([("a", "本文A")], BatchRunner(generator, poll_interval=0), engine=engine))
+        qa_requests = uploaded_requests(server)[1]
+
+    # 5 questions over 2 categories is 3 + 2; blocks of 2 make 2 + 1 and 2 requests,
+    # with the temperature raised after the first block as in live runs.
+    assert [(r["custom_id"], r["body"]["temperature"]) for r in qa_requests] == [
+        ("qa-0-0-0-0", 0.0), ("qa-0-0-0-1", 0.2), ("qa-0-0-1-0", 0.0),
+    ]
+    assert [(r["category"], r["temperature"]) for r in records] == [
+        ("料金", 0.0), ("料金", 0.0), ("料金", 0.2), ("手続き", 0.0), ("手続き", 0.0),
+    ]
+
+
+def test_truncated_blocks_are_completed_in_a_follow_up_batch(tmp_path):
+    with FakeOpenAIServer(polls_until_complete=0) as server:
+        generator = AIQAGenerator(api_key="test", base_url=server.base_url)
+        generator.output_budget = OutputBudget(tokens_per_question=20)
+        engine = QAEngine(generator, num_categories=1, questions=3)
+        records = list(generate_with_batches([("a", "本文A")], BatchRunner(generator, poll_interval=0), engine=engine))
+        batches = uploaded_requests(server)
+
+    assert len(records) == 3
+    assert len(batches) == 3 and [r["custom_id"] for r in batches[2]] == ["qa-0-0-0-0-0"]
+    assert generator.output_budget.truncated == 1
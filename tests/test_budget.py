@@ -0,0 +1,83 @@
+import asyncio
+import json
+import re
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_openai_server import FakeOpenAIServer
+from qna_generator.ai_qa_generator import AIQAGenerator
+from qna_generator.budget import OutputBudget
+from qna_generator.cache import ResponseCache
+
+
+def long_answer_responder(body):
+    """Answer with the requested number of pairs, each about 300 characters long."""
+    prompt = body["messages"][-1]["content"]
+    if "カテゴリと質問数:" in prompt:
+        requested = prompt.split("カテゴリと質問数:\n", 1)[1].split("\nテキスト:", 1)[0]
+        categories = []
+        for line in requested.splitlines():
+            name, count = line[2:].rsplit(": ", 1)
+            pairs = [{"question": f"{name}{i}", "answer": "あ" * 300} for i in range(int(count[:-1]))]
+            categories.append({"category": name, "qa_pairs": pairs})
+        return json.dumps({"categories": categories}, ensure_ascii=False)
+    count = int(re.search(r"回答を(\d+)つ", prompt).group(1))
+    pairs = [{"question": f"質問{i}", "answer": "あ" * 300, "source": "引用"} for i in range(count)]
+    return json.dumps({"qa_pairs": pairs}, ensure_ascii=False)
+
+
+def test_budget_scales_with_questions_and_learns():
+    budget = OutputBudget(tokens_per_question=100, overhead=20, headroom=1.5, smoothing=0.5)
+    assert budget.max_tokens(1) == 170
+    assert budget.max_tokens(10) == 1520
+    assert budget.max_tokens(4, sections=2) == 640
+
+    budget.observe(2, 420)  # 200 tokens per question
+    assert budget.tokens_per_question == 150
+    budget.observe_truncation(4, 500)
+    assert budget.tokens_per_question == 225 and budget.truncated == 1
+    assert OutputBudget(limit=1000).max_tokens(100) == 1000
+
+
+def test_truncated_block_is_split_and_continued(tmp_path):
+    with FakeOpenAIServer(long_answer_responder) as server:
+        generator = AIQAGenerator(
+            api_key="test",
+            base_url=server.base_url,
+            rate_limiter=None,
+            cache=ResponseCache(str(tmp_path / "c.db")),
+            output_budget=OutputBudget(tokens_per_question=50),
+        )
+        result = generator.generate_qa_for_category("本文", "料金", num_questions=6)
+        requests = server.stats()["chat_requests"]
+
+        assert "error" not in result
+        assert len(result["qa_pairs"]) == 6
+        assert requests > 1
+        assert generator.output_budget.truncated >= 1
+        assert generator.output_budget.max_tokens(1) > 300
+        # With the grown budget the same block now fits in a single request.
+        assert len(generator.generate_qa_for_category("本文", "料金", num_questions=6)["qa_pairs"]) == 6
+        assert server.stats()["chat_requests"] == requests + 1
+
+
+def test_truncated_multi_category_request_is_split():
+    with FakeOpenAIServer(long_answer_responder) as server:
+        generator = AIQAGenerator(
+            api_key="test",
+            base_url=server.base_url,
+            rate_limiter=None,
+            output_budget=OutputBudget(tokens_per_question=50),
+        )
+
+        async def run():
+            try:
+                return await generator.agenerate_qa_for_categories("本文", {"料金": 2, "手続き": 2, "窓口": 1})
+            finally:
+                await generator.aclose()
+
+        result = asyncio.run(run())
+
+    assert "error" not in result
+    assert {c: len(e["qa_pairs"]) for c, e in result["categories"].items()} == {"料金": 2, "手続き": 2, "窓口": 1}
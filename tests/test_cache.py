@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.cache import ResponseCache, make_cache_key
+
+MESSAGES = [{"role": "user", "content": "質問"}]
+
+
+def test_make_cache_key_depends_on_all_parameters():
+    base = make_cache_key("gpt-4o-mini", MESSAGES, 0.0, 1000)
+    assert base == make_cache_key("gpt-4o-mini", MESSAGES, 0.0, 1000)
+    assert base != make_cache_key("gpt-4o", MESSAGES, 0.0, 1000)
+    assert base != make_cache_key("gpt-4o-mini", MESSAGES, 0.1, 1000)
+    assert base != make_cache_key("gpt-4o-mini", MESSAGES, 0.0, 50)
+    assert base != make_cache_key("gpt-4o-mini", MESSAGES, 0.0, 1000, variant=1)
+
+
+def test_cache_hit_and_miss_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("k") is None
+    cache.set("k", "値")
+    assert cache.get("k") == "値"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["size_bytes"] == len("値".encode("utf-8"))
+
+
+def test_cache_persists_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = ResponseCache(path)
+    first.set("k", "value")
+    first.close()
+    second = ResponseCache(path)
+    assert second.get("k") == "value"
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=10)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    assert cache.get("a") == "aaaa"  # "b" is now the least recently used
+    cache.set("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.stats()["size_bytes"] <= 10
+
+
+def test_tables_are_independent_caches(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    completions = ResponseCache(path, max_bytes=10)
+    pages = ResponseCache(path, max_bytes=10, table="pages")
+    completions.set("k", "aaaa")
+    pages.set("k", "bbbbbbbb")
+    pages.set("other", "cccccccc")  # evicts only within its own table
+
+    assert completions.get("k") == "aaaa" and pages.get("k") is None
+    assert completions.stats()["entries"] == 1 and pages.stats()["size_bytes"] == 8
+    with pytest.raises(ValueError):
+        ResponseCache(path, table="pages; DROP TABLE entries")
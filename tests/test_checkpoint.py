@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.checkpoint import Journal
+
+
+def test_journal_records_and_resumes(tmp_path):
+    path = str(tmp_path / "run.journal")
+    journal = Journal(path)
+    journal.record(("categories", "http://a", 0), ["c1", "c2"])
+    journal.record(("qa", "http://a", 0, "c1"), [{"question": "Q"}])
+    journal.close()
+
+    resumed = Journal(path, resume=True)
+    assert len(resumed) == 2
+    assert resumed.is_done(("categories", "http://a", 0))
+    assert not resumed.is_done(("qa", "http://a", 0, "c2"))
+    assert resumed.get(("qa", "http://a", 0, "c1")) == [{"question": "Q"}]
+    resumed.record(("qa", "http://a", 0, "c2"), [])
+    assert resumed.get(("categories", "http://a", 0)) == ["c1", "c2"]
+    resumed.close()
+
+
+def test_journal_without_resume_starts_fresh(tmp_path):
+    path = str(tmp_path / "run.journal")
+    journal = Journal(path)
+    journal.record(("source", "x"), 1)
+    journal.close()
+    assert len(Journal(path)) == 0
+
+
+def test_journal_drops_torn_final_line(tmp_path):
+    path = tmp_path / "run.journal"
+    journal = Journal(str(path))
+    journal.record(("source", "x"), 1)
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b'{"unit": ["source", "y"], "va')
+
+    resumed = Journal(str(path), resume=True)
+    assert resumed.is_done(("source", "x"))
+    assert not resumed.is_done(("source", "y"))
+    resumed.record(("source", "y"), 2)
+    resumed.close()
+    assert Journal(str(path), resume=True).get(("source", "y")) == 2
@@ -0,0 +1,153 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_generator import FakeGenerator, Gauge
+from qna_generator import cli
+from qna_generator.checkpoint import Journal
+from qna_generator.pipeline import QAEngine
+
+
+def fake_sources(monkeypatch, documents, delays, gauge=None, fetched=None):
+    """Serve ``documents[name]`` after ``delays[name]`` seconds; returns the sources in ``delays`` order.
+
+    A name without a document fails to fetch. Fetched names are appended to ``fetched``.
+    """
+
+    def pages(kind, value, fetcher=None):
+        if fetched is not None:
+            fetched.append(value)
+        with gauge or Gauge():
+            time.sleep(delays.get(value, 0.0))
+            if value not in documents:
+                raise OSError(f"unreachable: {value}")
+        yield documents[value]
+
+    monkeypatch.setattr(cli, "iter_text_from_source", pages)
+    return [("url", name) for name in delays]
+
+
+def test_generation_starts_before_extraction_finishes(monkeypatch):
+    first_chunk_sent = threading.Event()
+
+    def pages(kind, value, fetcher=None):
+        yield "一ページ目です。続きです。"
+        # The second page only arrives once the first chunk has reached the model.
+        if not first_chunk_sent.wait(5):
+            raise TimeoutError("first chunk was not generated while extracting")
+        yield "二ページ目です。"
+
+    monkeypatch.setattr(cli, "iter_text_from_source", pages)
+    generator = FakeGenerator(categories=["手続き"], on_categories=lambda text: first_chunk_sent.set())
+    records, stats = cli.run_pipeline(
+        [("file", "a.pdf")], generator, engine=QAEngine(generator, chunk_tokens=10, questions=1)
+    )
+
+    assert [record["question"] for record in records] == [
+        "一ページ目です。/手続き/0", "続きです。/手続き/0", "二ページ目です。/手続き/0"
+    ]
+    assert stats["fetch"].failed == 0
+
+
+def test_records_follow_input_order_regardless_of_latency(monkeypatch):
+    names = [f"s{i}" for i in range(6)]
+    documents = {name: f"{name}本文です。" for name in names}
+    # Earlier sources are slower to fetch and to generate, so they finish last.
+    delays = {name: 0.05 * (6 - i) for i, name in enumerate(names)}
+    sources = fake_sources(monkeypatch, documents, delays)
+    generator = FakeGenerator(latency=lambda text: 0.06 - 0.01 * int(text[1]))
+    streamed = []
+
+    records, _ = cli.run_pipeline(
+        sources, generator, fetch_workers=3, llm_workers=4,
+        engine=QAEngine(generator, num_categories=2, questions=1),
+    )
+    cli.run_pipeline(sources, generator, engine=QAEngine(generator, num_categories=2, questions=1),
+                     sink=streamed.append)
+
+    expected = [f"{name}本文です。/{category}/0" for name in names for category in ("料金", "手続き")]
+    assert [r["question"] for r in records] == expected
+    assert streamed == records
+
+
+def test_stages_stay_within_their_worker_bounds(monkeypatch):
+    documents = {f"s{i}": f"s{i}本文です。" for i in range(8)}
+    fetches = Gauge()
+    sources = fake_sources(monkeypatch, documents, dict.fromkeys(documents, 0.05), fetches)
+    generator = FakeGenerator(categories=("料金", "手続き", "窓口"), latency=lambda text: 0.03)
+
+    records, stats = cli.run_pipeline(
+        sources, generator, fetch_workers=2, llm_workers=3,
+        engine=QAEngine(generator, num_categories=3, questions=1),
+    )
+
+    assert len(records) == 24
+    assert fetches.peak == 2 and generator.gauge.peak == 3
+    assert stats["fetch"].completed == 8 and stats["llm"].completed == 8 + 24
+
+
+def test_failed_sources_are_skipped(monkeypatch):
+    documents = {"A": "A本文です。", "B": "B本文です。", "C": "C本文です。"}
+    delays = {"A": 0.0, "missing": 0.01, "B": 0.0, "C": 0.0}
+    sources = fake_sources(monkeypatch, documents, delays)
+    generator = FakeGenerator(failing={("B本文です。", "手続き")})
+
+    records, stats = cli.run_pipeline(sources, generator, engine=QAEngine(generator, num_categories=2, questions=1))
+
+    # The unreachable source is dropped; B keeps the category that succeeded.
+    assert [r["question"] for r in records] == [
+        "A本文です。/料金/0", "A本文です。/手続き/0",
+        "B本文です。/料金/0",
+        "C本文です。/料金/0", "C本文です。/手続き/0",
+    ]
+    assert stats["fetch"].failed == 1 and stats["llm"].failed == 1
+
+
+class Interrupted(FakeGenerator):
+    """Dies like a killed process on the Q&A request for ``at``, once the requests before it are recorded."""
+
+    def __init__(self, at=None):
+        super().__init__()
+        self.at = at
+
+    def generate_qa_for_category(self, text, category, *args, **kwargs):
+        if (text, category) == self.at:
+            time.sleep(0.2)
+            raise KeyboardInterrupt
+        return super().generate_qa_for_category(text, category, *args, **kwargs)
+
+
+def test_interrupted_run_resumes_from_journal(monkeypatch, tmp_path):
+    documents = {"A": "A本文です。", "B": "B本文です。", "C": "C本文です。"}
+    fetched = []
+    sources = fake_sources(monkeypatch, documents, dict.fromkeys(documents, 0.0), fetched=fetched)
+    path = str(tmp_path / "run.journal")
+
+    def run(generator, journal):
+        try:
+            return cli.run_pipeline(sources, generator, fetch_workers=1, llm_workers=1, journal=journal,
+                                    engine=QAEngine(generator, num_categories=2, questions=1))[0]
+        finally:
+            journal.close()
+
+    killed = Interrupted(at=("C本文です。", "手続き"))
+    with pytest.raises(KeyboardInterrupt):
+        run(killed, Journal(path))
+    journal = Journal(path, resume=True)
+    assert journal.is_done(("source", "B")) and journal.is_done(("qa", "C", 0, "料金"))
+    assert not journal.is_done(("qa", "C", 0, "手続き"))
+    journal.close()
+
+    fetched.clear()
+    resumed = Interrupted()
+    records = run(resumed, Journal(path, resume=True))
+
+    assert [r["question"] for r in records] == [
+        f"{name}本文です。/{category}/0" for name in documents for category in ("料金", "手続き")
+    ]
+    # Finished sources are replayed without fetching; only the lost unit is requested again.
+    assert fetched == ["C"] and resumed.qa_calls == [("C本文です。", "手続き")]
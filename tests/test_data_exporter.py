@@ -1,4 +1,5 @@
 import csv
+import io
 import json
 import sys
 from pathlib import Path
@@ -12,6 +13,13 @@ from qna_generator.data_exporter import (
     export_to_csv,
     export_for_rag,
     export_for_finetuning,
+    JsonlWriter,
+    export_all_formats,
+    export_to_parquet,
+    iter_jsonl,
+    iter_parquet,
+    stream_to_jsonl,
+    write_all_formats,
 )
 
 SAMPLE_QA = [
@@ -107,3 +115,122 @@ def test_export_for_finetuning(tmp_path):
         }
     ]
     assert items == expected
+
+
+def test_stream_to_jsonl_accepts_generator(tmp_path):
+    filename = tmp_path / "stream.jsonl"
+    records = ({"n": i} for i in range(3))
+    returned = stream_to_jsonl(records, str(filename))
+    assert returned == str(filename)
+    with open(filename, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+def test_jsonl_writer_writes_incrementally(tmp_path):
+    filename = tmp_path / "writer.jsonl"
+    with JsonlWriter(str(filename)) as writer:
+        writer.write(SAMPLE_QA[0])
+        writer.write_all(iter(SAMPLE_QA))
+    assert writer.count == 2
+    with open(filename, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == SAMPLE_QA * 2
+
+
+def test_export_for_rag_accepts_iterator(tmp_path):
+    filename = tmp_path / "rag.jsonl"
+    export_for_rag(iter(SAMPLE_QA * 2), str(filename))
+    with open(filename, encoding="utf-8") as f:
+        ids = [json.loads(line)["id"] for line in f]
+    assert ids == ["cat_0", "cat_1"]
+
+
+def test_exporters_write_to_file_objects():
+    buffers = {name: io.StringIO() for name in ("json", "csv", "jsonl")}
+    assert export_to_json(SAMPLE_QA, buffers["json"]) is buffers["json"]
+    export_to_csv(SAMPLE_QA, buffers["csv"])
+    with JsonlWriter(buffers["jsonl"]) as writer:
+        writer.write_all(SAMPLE_QA)
+
+    assert json.loads(buffers["json"].getvalue()) == SAMPLE_QA
+    assert next(csv.DictReader(io.StringIO(buffers["csv"].getvalue())))["question"] == "Q1"
+    # The caller's buffer is left open.
+    assert [json.loads(line) for line in buffers["jsonl"].getvalue().splitlines()] == SAMPLE_QA
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 300])
+def test_export_all_formats_matches_individual_exporters(tmp_path, count):
+    records = [dict(SAMPLE_QA[0], question=f"Q{i}", category=f"cat{i % 2}") for i in range(count)]
+    exporters = {
+        "json": export_to_json,
+        "csv": export_to_csv,
+        "jsonl": export_to_jsonl,
+        "rag": export_for_rag,
+        "finetuning": export_for_finetuning,
+    }
+    exported = export_all_formats(iter(records))
+
+    assert list(exported) == list(exporters)
+    for name, exporter in exporters.items():
+        path = tmp_path / f"{name}.out"
+        exporter(records, str(path))
+        with open(path, newline="", encoding="utf-8") as f:
+            assert exported[name] == f.read(), name
+
+
+def test_write_all_formats_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        write_all_formats(SAMPLE_QA, {"xml": io.StringIO()})
+
+
+def many_records(count):
+    return [
+        dict(SAMPLE_QA[0], question=f"Q{i}", category=f"cat{i % 3}", source_info=f"info{i % 2}")
+        for i in range(count)
+    ]
+
+
+def test_gzip_jsonl_round_trip(tmp_path):
+    records = many_records(500)
+    path = export_to_jsonl(iter(records), str(tmp_path / "qa.jsonl.gz"))
+    with open(path, "rb") as f:
+        assert f.read(2) == b"\x1f\x8b"
+    assert list(iter_jsonl(path)) == records
+
+    explicit = export_for_rag(records, str(tmp_path / "rag.out"), compression="gzip")
+    assert [item["id"] for item in iter_jsonl(explicit, compression="gzip")][:2] == ["cat0_0", "cat1_1"]
+
+
+def test_zstd_jsonl_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    records = many_records(500)
+    path = str(tmp_path / "qa.jsonl.zst")
+    with JsonlWriter(path) as writer:
+        writer.write_all(records)
+    assert writer.compression == "zstd"
+    assert list(iter_jsonl(path)) == records
+
+
+def test_compression_is_validated(tmp_path):
+    with pytest.raises(ValueError):
+        export_to_jsonl(SAMPLE_QA, str(tmp_path / "qa.jsonl"), compression="brotli")
+    with pytest.raises(ValueError):
+        JsonlWriter(io.StringIO(), compression="gzip")
+
+
+def test_parquet_round_trip_with_row_groups_and_column_selection(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    records = many_records(250)
+    path = export_to_parquet(iter(records), str(tmp_path / "qa.parquet"), row_group_size=100)
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    assert pa.types.is_dictionary(parquet.schema_arrow.field("category").type)
+    assert pa.types.is_dictionary(parquet.schema_arrow.field("source_info").type)
+    assert list(iter_parquet(path)) == records
+    assert list(iter_parquet(path, columns=["category"]))[:2] == [{"category": "cat0"}, {"category": "cat1"}]
+
+    empty = export_to_parquet([], str(tmp_path / "empty.parquet"))
+    assert list(iter_parquet(empty)) == []
@@ -8,12 +8,16 @@ import requests
 from docx import Document
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
+import qna_generator.data_processor as data_processor
 from qna_generator.data_processor import (
     MAX_UPLOAD_SIZE,
+    extract_text_from_file,
     extract_text_from_uploaded_file,
     extract_text_from_url,
     extract_text_from_pdf,
     extract_text_from_docx,
+    iter_pdf_pages,
+    iter_text_from_file,
 )
 
 
@@ -110,3 +114,55 @@ def test_extract_text_file_size_limit():
     upload = DummyUpload(large_data)
     with pytest.raises(ValueError):
         extract_text_from_uploaded_file(upload, "pdf")
+
+
+def create_multipage_pdf_bytes(page_count: int) -> bytes:
+    buf = io.BytesIO()
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i}")
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def test_iter_pdf_pages_parallel_preserves_order(tmp_path):
+    pdf_path = tmp_path / "multi.pdf"
+    pdf_path.write_bytes(create_multipage_pdf_bytes(10))
+    pages = list(iter_pdf_pages(str(pdf_path), workers=2, pages_per_shard=3))
+    assert [page.strip() for page in pages] == [f"Page {i}" for i in range(10)]
+
+
+def test_iter_pdf_pages_is_lazy_for_bytes():
+    pages = iter_pdf_pages(create_multipage_pdf_bytes(3), workers=1)
+    assert "Page 0" in next(pages)
+    assert len(list(pages)) == 2
+
+
+def test_extract_text_from_pdf_parallel_matches_serial(tmp_path):
+    pdf_path = tmp_path / "multi.pdf"
+    pdf_path.write_bytes(create_multipage_pdf_bytes(7))
+    serial = extract_text_from_pdf(str(pdf_path), workers=1)
+    assert extract_text_from_pdf(str(pdf_path), workers=3) == serial
+
+
+def test_iter_text_from_file_matches_extract(tmp_path):
+    pdf_path = tmp_path / "multi.pdf"
+    pdf_path.write_bytes(create_multipage_pdf_bytes(4))
+    docx_path = create_docx_file(tmp_path, "段落")
+    for path in (str(pdf_path), str(docx_path)):
+        pieces = list(iter_text_from_file(path))
+        assert "".join(pieces) == extract_text_from_file(path)
+    assert len(list(iter_text_from_file(str(pdf_path)))) == 4
+    with pytest.raises(RuntimeError, match="PDF"):
+        list(iter_text_from_file(str(create_docx_file(tmp_path, "x")).replace(".docx", ".pdf")))
+
+
+def test_uploaded_pdf_is_extracted_without_a_process_pool(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started from the upload path")
+
+    monkeypatch.setattr(data_processor, "ProcessPoolExecutor", no_pool)
+    upload = DummyUpload(create_multipage_pdf_bytes(data_processor.PDF_PARALLEL_MIN_PAGES))
+    text = extract_text_from_uploaded_file(upload, "pdf")
+    assert "Page 0" in text and f"Page {data_processor.PDF_PARALLEL_MIN_PAGES - 1}" in text
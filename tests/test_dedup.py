@@ -0,0 +1,97 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import qna_generator.dedup as dedup_module
+from qna_generator.dedup import NearDuplicateFilter, char_shingles, deduplicate
+
+
+def make_qa(question, answer):
+    return {"question": question, "answer": answer, "category": "手続き"}
+
+
+ORIGINAL = make_qa("住民票の写しはどこで取得できますか？", "市役所の窓口またはコンビニで取得できます。")
+PARAPHRASE = make_qa("住民票の写しはどこで取得できますか", "市役所の窓口またはコンビニで取得可能です。")
+OTHER = make_qa("パスワードを忘れた場合は？", "ログイン画面の再設定リンクから変更してください。")
+
+
+def test_char_shingles_ignore_width_case_and_punctuation():
+    assert char_shingles("ＡＢＣ、 d") == char_shingles("abcd")
+    assert char_shingles("あ") == {"あ"}
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_filter_drops_paraphrase_and_reports_it(monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(dedup_module, "np", None)
+    elif dedup_module.np is None:
+        pytest.skip("numpy is not installed")
+
+    kept, report = deduplicate([ORIGINAL, OTHER, PARAPHRASE, dict(ORIGINAL)])
+
+    assert kept == [ORIGINAL, OTHER]
+    assert report.seen == 4 and report.kept == 2
+    assert [(d.index, d.kept_index) for d in report.dropped] == [(2, 0), (3, 0)]
+    assert report.dropped[1].similarity == 1.0
+
+
+def test_stdlib_and_numpy_signatures_match(monkeypatch):
+    if dedup_module.np is None:
+        pytest.skip("numpy is not installed")
+    dedup = NearDuplicateFilter()
+    expected = dedup.signature("住民票の写し")
+    monkeypatch.setattr(dedup_module, "np", None)
+    assert dedup.signature("住民票の写し") == expected
+
+
+def test_filter_streams_lazily():
+    dedup = NearDuplicateFilter()
+    stream = dedup.filter(iter([ORIGINAL, PARAPHRASE, OTHER]))
+    assert next(stream) is ORIGINAL
+    assert dedup.report.seen == 1
+    assert list(stream) == [OTHER]
+
+
+def test_dropped_can_be_counted_only():
+    dedup = NearDuplicateFilter(keep_dropped=False)
+    assert list(dedup.filter([ORIGINAL, PARAPHRASE, OTHER, dict(ORIGINAL)])) == [ORIGINAL, OTHER]
+    assert dedup.report.dropped is None
+    assert dedup.report.num_dropped == 2 and dedup.report.kept == 2
+    assert dedup.report.summary() == "dedup: kept 2/4, dropped 2 near-duplicates"
+
+
+def test_distinct_records_are_all_kept():
+    rng = random.Random(0)
+    words = ["料金", "申請", "窓口", "書類", "期限", "住所", "変更", "予約", "返金", "会員"]
+    records = [
+        make_qa(f"質問{i}: " + "".join(rng.choices(words, k=8)), "".join(rng.choices(words, k=12)))
+        for i in range(300)
+    ]
+    kept, report = deduplicate(records + records[:50])
+    assert len(kept) == 300
+    assert [d.kept_index for d in report.dropped] == list(range(50))
+
+
+def test_bands_must_divide_num_perm():
+    with pytest.raises(ValueError):
+        NearDuplicateFilter(num_perm=100, bands=24)
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_index_stays_compact(monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(dedup_module, "np", None)
+    elif dedup_module.np is None:
+        pytest.skip("numpy is not installed")
+    dedup = NearDuplicateFilter()
+    rng = random.Random(1)
+    words = ["料金", "申請", "窓口", "書類", "期限", "住所", "変更", "予約", "返金", "会員"]
+    records = [make_qa("".join(rng.choices(words, k=8)), "".join(rng.choices(words, k=12))) for _ in range(4000)]
+    kept = list(dedup.filter(records + records[:100]))
+
+    assert len(kept) == 4000 and dedup.report.dropped[0].kept_index == 0
+    # Signatures (480 B) plus the band table, with at most 2x growth slack.
+    assert dedup.nbytes / len(kept) < 2 * (480 + 24 * 12 * 2)
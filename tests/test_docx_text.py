@@ -0,0 +1,87 @@
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from docx import Document
+from docx.shared import Inches
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.data_processor import extract_text_from_docx, extract_text_from_uploaded_file
+from qna_generator.docx_text import docx_to_text, iter_docx_lines
+
+
+class DummyUpload(io.BytesIO):
+    @property
+    def size(self):
+        return len(self.getvalue())
+
+
+def build_docx() -> bytes:
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "社内規程"
+    doc.sections[0].footer.paragraphs[0].text = "1ページ"
+    doc.add_paragraph("第1条 目的")
+    run = doc.add_paragraph("申請は").add_run("窓口で")
+    run.add_tab()
+    run.add_text("受け付けます")
+    run.add_break()
+    run.add_text("郵送も可")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "手数料"
+    table.cell(0, 1).text = "無料"
+    table.cell(1, 0).text = "受付時間"
+    table.cell(1, 1).paragraphs[0].text = "9時から"
+    table.cell(1, 1).add_paragraph("17時まで")
+    doc.add_paragraph("第2条 &<特殊文字>")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def test_lines_follow_document_order_with_tables_and_headers():
+    assert list(iter_docx_lines(io.BytesIO(build_docx()))) == [
+        "社内規程",
+        "第1条 目的",
+        "申請は窓口で\t受け付けます\n郵送も可",
+        "手数料\t無料",
+        "受付時間\t9時から 17時まで",
+        "第2条 &<特殊文字>",
+        "1ページ",
+    ]
+
+
+def test_body_paragraphs_match_python_docx(tmp_path):
+    doc = Document()
+    for i in range(50):
+        doc.add_paragraph(f"段落{i} " + "テキスト" * i)
+    doc.add_paragraph("")
+    path = tmp_path / "plain.docx"
+    doc.save(path)
+
+    expected = "".join(p.text + "\n" for p in Document(str(path)).paragraphs)
+    assert docx_to_text(str(path)) == expected
+    assert extract_text_from_docx(str(path)) == expected
+
+
+def test_tab_stops_are_not_tab_characters(tmp_path):
+    doc = Document()
+    paragraph = doc.add_paragraph()
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Inches(1))
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Inches(2))
+    paragraph.add_run("Hello world").bold = True
+    doc.add_paragraph("前").add_run("後").add_tab()
+    path = tmp_path / "tabs.docx"
+    doc.save(path)
+
+    assert docx_to_text(str(path)) == "Hello world\n前後\t\n"
+
+
+def test_uploaded_docx_uses_the_same_reader():
+    data = build_docx()
+    assert extract_text_from_uploaded_file(DummyUpload(data), "docx") == docx_to_text(io.BytesIO(data))
+
+
+def test_invalid_docx_raises_runtime_error():
+    with pytest.raises(RuntimeError, match="DOCX"):
+        extract_text_from_uploaded_file(DummyUpload(b"not a zip"), "docx")
@@ -0,0 +1,79 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_openai_server import FakeOpenAIServer
+from qna_generator.embeddings import (
+    EmbeddingStore,
+    HashingEmbedder,
+    IVFIndex,
+    OpenAIEmbedder,
+    export_embeddings,
+)
+
+RECORDS = [
+    {"category": "料金", "question": "利用料金はいくらですか？", "answer": "無料です。", "source": "本文", "source_info": "src", "temperature": 0.0},
+    {"category": "料金", "question": "支払い方法は？", "answer": "現金のみです。", "source": "本文", "source_info": "src", "temperature": 0.0},
+    {"category": "手続き", "question": "申請書はどこで受け取れますか？", "answer": "市役所の窓口です。", "source": "本文", "source_info": "src", "temperature": 0.0},
+    {"category": "手続き", "question": "郵送で申請できますか？", "answer": "できます。", "source": "本文", "source_info": "src", "temperature": 0.0},
+    {"category": "窓口", "question": "窓口の受付時間は？", "answer": "9時から17時です。", "source": "本文", "source_info": "src", "temperature": 0.0},
+]
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.embed(["申請書はどこ", "申請書はどこ", "まったく別の文"])
+    assert vectors.shape == (3, 64) and vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert np.array_equal(vectors[0], vectors[1])
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+def test_export_and_search_round_trip(tmp_path):
+    directory = export_embeddings(iter(RECORDS), str(tmp_path / "rag"), HashingEmbedder(), batch_size=2, nlist=2)
+
+    meta = json.loads((tmp_path / "rag" / "meta.json").read_text(encoding="utf-8"))
+    assert meta["count"] == 5 and meta["dim"] == 256 and meta["nlist"] == 2
+    assert (tmp_path / "rag" / "vectors.f32").stat().st_size == 5 * 256 * 4
+
+    with EmbeddingStore(directory) as store:
+        assert len(store) == 5
+        assert store.item(3)["id"] == "手続き_3" and store.item(3)["row"] == 3
+        results = store.search("申請書はどこで受け取れますか？", k=2, nprobe=2)
+        score, item = results[0]
+        assert item["metadata"]["category"] == "手続き" and item["row"] == 2
+        assert 0 < score < 1
+        assert len(results) == 2 and results[0][0] >= results[1][0]
+
+
+def test_ivf_matches_brute_force_when_probing_every_list():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 16)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = IVFIndex.build(vectors, nlist=8)
+
+    assert index.list_offsets[-1] == 500
+    assert sorted(index.rows.tolist()) == list(range(500))
+    for query in vectors[:10]:
+        _, rows = index.search(vectors, query, k=5, nprobe=8)
+        assert rows.tolist() == np.argsort(-(vectors @ query))[:5].tolist()
+
+
+def test_openai_embedder_batches_requests(tmp_path):
+    with FakeOpenAIServer(embedding_dim=8) as server:
+        embedder = OpenAIEmbedder("test", base_url=server.base_url)
+        export_embeddings(RECORDS, str(tmp_path / "rag"), embedder, batch_size=2)
+        assert server.stats()["embedding_requests"] == 3
+
+        with EmbeddingStore(str(tmp_path / "rag"), embedder) as store:
+            assert store.meta["provider"] == "openai" and store.meta["dim"] == 8
+            _, item = store.search(store.item(4)["text"], k=1)[0]
+            assert item["row"] == 4
+
+    with EmbeddingStore(str(tmp_path / "rag")) as store, pytest.raises(ValueError):
+        store.search("料金")
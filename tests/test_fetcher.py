@@ -0,0 +1,116 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.cache import ResponseCache
+from qna_generator.data_processor import extract_text_from_url
+from qna_generator.fetcher import Fetcher, open_page_cache
+
+
+@pytest.fixture
+def server():
+    state = {"requests": 0, "active": 0, "max_active": 0, "delay": 0.0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            with lock:
+                state["requests"] += 1
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+            time.sleep(state["delay"])
+            with lock:
+                state["active"] -= 1
+            if self.path == "/missing":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            etag = f'"{self.path}-v1"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = f"<html><body><p>ページ {self.path}</p></body></html>".encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(data)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    state["base_url"] = f"http://127.0.0.1:{httpd.server_port}"
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch_revalidates_with_etag(server, tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = open_page_cache(path)
+    fetcher = Fetcher(cache=cache)
+    url = f"{server['base_url']}/page"
+
+    first = fetcher.fetch(url)
+    second = fetcher.fetch(url)
+
+    assert not first.not_modified and first.status_code == 200
+    assert second.not_modified and second.text == first.text
+    assert fetcher.requests_sent == 2 and fetcher.not_modified == 1
+    # Pages never count against the completion cache in the same file.
+    assert cache.stats()["entries"] == 1 and ResponseCache(path).stats()["entries"] == 0
+    fetcher.close()
+    cache.close()
+
+
+def test_fetch_raises_for_http_errors(server):
+    fetcher = Fetcher()
+    with pytest.raises(requests.exceptions.HTTPError):
+        fetcher.fetch(f"{server['base_url']}/missing")
+    fetcher.close()
+
+
+def test_shared_fetcher_limits_requests_per_host(server):
+    server["delay"] = 0.05
+    fetcher = Fetcher(per_host=2)
+    urls = [f"{server['base_url']}/p{i}" for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(fetcher.fetch, urls))
+
+    assert [r.url for r in results] == urls
+    assert server["max_active"] == 2
+    fetcher.close()
+
+
+def test_politeness_interval_spaces_requests(server):
+    fetcher = Fetcher(min_interval=0.05)
+    start = time.monotonic()
+    for i in range(3):
+        fetcher.fetch(f"{server['base_url']}/p{i}")
+    assert time.monotonic() - start >= 0.1
+    fetcher.close()
+
+
+def test_extract_text_from_url_uses_fetcher(server):
+    fetcher = Fetcher()
+    assert extract_text_from_url(f"{server['base_url']}/page", fetcher=fetcher) == "ページ /page"
+    assert fetcher.requests_sent == 1
+    fetcher.close()
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.html_text import HTMLTextExtractor, etree, html_to_text
+
+ENGINES = ["html.parser"] + (["lxml"] if etree is not None else [])
+
+PAGE = (
+    "<html><head><title>料金</title><style>p { color: red }</style>"
+    "<script>var s = '</p>';</script></head>"
+    "<body><p>申請は  窓口で\n   受付けます</p><!-- memo --><br/>"
+    "A&amp;B &#12354;<script src='x.js'></script><div>末尾</div></body></html>"
+)
+EXPECTED = "料金申請は\n窓口で\n受付けますA&B あ末尾"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_html_to_text_drops_scripts_and_collapses_whitespace(engine):
+    assert html_to_text(PAGE, engine) == EXPECTED
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_extractor_accepts_arbitrary_pieces(engine):
+    extractor = HTMLTextExtractor(engine)
+    for i in range(0, len(PAGE), 7):
+        extractor.feed(PAGE[i:i + 7])
+    assert extractor.close() == EXPECTED
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_html_to_text_handles_empty_and_plain_input(engine):
+    assert html_to_text("", engine) == ""
+    assert html_to_text("plain  text", engine) == "plain\ntext"
+
+
+def test_extractor_rejects_unknown_engine():
+    with pytest.raises(ValueError):
+        HTMLTextExtractor("regex")
@@ -0,0 +1,163 @@
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_generator import FakeGenerator
+from qna_generator.jobs import JobQueue, Worker
+from qna_generator.pipeline import QAEngine
+
+
+def extract(kind, value):
+    return {"a.docx": "文書A", "b.docx": "文書B"}[value]
+
+
+def make_engine(generator=None):
+    return QAEngine(generator or FakeGenerator(), num_categories=2, questions=2)
+
+
+def test_workers_drain_queue_in_input_order(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    assert queue.enqueue_sources([("file", "a.docx"), ("file", "b.docx"), ("file", "a.docx")]) == 2
+    assert queue.enqueue_sources([("file", "b.docx")]) == 0
+
+    # Two workers with their own connections, as separate processes would have.
+    workers = [Worker(JobQueue(path), make_engine(), threads=2, extract=extract, poll_interval=0.01)
+               for _ in range(2)]
+    threads = [threading.Thread(target=worker.run) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    status = queue.status()
+    assert sum(worker.completed for worker in workers) == 8  # 2 sources, 2 chunks, 4 (chunk, category)
+    assert status["counts"]["qa"]["done"] == 4 and status["records"] == 8
+    questions = [record["question"] for record in queue.iter_records()]
+    assert questions[0] == "文書A/料金/0" and questions[-1] == "文書B/手続き/1"
+    assert {record["source_info"] for record in queue.iter_records()} == {"File: a.docx", "File: b.docx"}
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue_sources([("file", "a.docx")])
+
+    dead = queue.claim("dead", lease_seconds=0.01)
+    assert queue.claim("other") is None  # the only job is leased
+    time.sleep(0.02)
+    job = queue.claim("other")
+    assert job.id == dead.id and job.attempts == 2
+
+    # The stale worker's result is rejected; the current holder's is kept.
+    assert not queue.complete(dead, "dead", 1, [("chunk", 0, -1, {"chunk": "x", "source_info": ""})])
+    assert queue.complete(job, "other", 1, [("chunk", 0, -1, {"chunk": "x", "source_info": ""})])
+    assert queue.status()["counts"]["chunk"]["pending"] == 1
+
+
+def test_heartbeat_keeps_lease(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue_sources([("file", "a.docx")])
+    job = queue.claim("busy", lease_seconds=0.05)
+    for _ in range(3):
+        time.sleep(0.02)
+        assert queue.heartbeat("busy", [job.id], lease_seconds=0.05) == 1
+    assert queue.heartbeat("other", [job.id], lease_seconds=0.05) == 0
+    assert queue.claim("other") is None
+    assert queue.status()["workers"] == ["busy"]
+
+
+def test_hung_job_lease_is_not_extended_forever(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    queue.enqueue_sources([("file", "a.docx")])
+    release = threading.Event()
+
+    def hang(kind, value):
+        release.wait(5)
+        return "文書A"
+
+    hung = Worker(JobQueue(path), make_engine(), extract=hang, lease_seconds=0.06, max_job_seconds=0.1,
+                  poll_interval=0.01)
+    thread = threading.Thread(target=hung.run)
+    thread.start()
+    time.sleep(0.3)  # several heartbeats: extended at first, then left to expire
+
+    job = queue.claim("other", lease_seconds=5)
+    assert job is not None and job.kind == "source" and job.attempts == 2
+    assert queue.complete(job, "other", 0)
+    release.set()
+    thread.join()
+    assert hung.completed == 0  # its late result was rejected
+
+
+def test_failed_heartbeat_does_not_stop_heartbeats(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    queue.enqueue_sources([("file", "a.docx")])
+    release = threading.Event()
+
+    def slow(kind, value):
+        release.wait(5)
+        return "文書A"
+
+    worker_queue = JobQueue(path)
+    heartbeat = worker_queue.heartbeat
+    failures = []
+
+    def flaky_heartbeat(*args):
+        if not failures:
+            failures.append(True)
+            raise sqlite3.OperationalError("database is locked")
+        return heartbeat(*args)
+
+    worker_queue.heartbeat = flaky_heartbeat
+    worker = Worker(worker_queue, make_engine(), extract=slow, lease_seconds=0.09, poll_interval=0.01)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    try:
+        time.sleep(0.3)  # several lease lengths: only later heartbeats keep the job
+        assert failures and queue.claim("other", lease_seconds=0.01) is None
+    finally:
+        release.set()
+        thread.join()
+    assert worker.completed == 4  # the source, its chunk and 2 (chunk, category) jobs
+
+
+def test_iter_records_reads_in_batches(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    queue.enqueue_sources([("file", "a.docx"), ("file", "b.docx")])
+    Worker(JobQueue(path), make_engine(), extract=extract, poll_interval=0.01).run()
+    records = queue.iter_records(batch_size=1)
+    assert next(records)["question"] == "文書A/料金/0"
+    assert len(list(records)) == 7
+
+
+def test_shared_fs_queue_uses_rollback_journal(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path, shared_fs=True)
+    queue.enqueue_sources([("file", "a.docx")])
+    reopened = JobQueue(path)  # later opens keep the file's journal mode
+    assert reopened._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert reopened.claim("worker").kind == "source"
+    assert JobQueue(str(tmp_path / "local.db"))._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_failed_jobs_are_retried_then_given_up(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    queue.enqueue_sources([("file", "a.docx")])
+    worker = Worker(JobQueue(path), make_engine(FakeGenerator(failing={"料金"}, failures=1)), extract=extract,
+                    poll_interval=0.01)
+    worker.run()
+    assert worker.failed == 1 and queue.status()["records"] == 4
+
+    queue.enqueue_sources([("file", "missing.docx")])
+    worker = Worker(JobQueue(path), make_engine(), extract=extract, max_attempts=2, poll_interval=0.01)
+    worker.run()
+    status = queue.status()
+    assert worker.failed == 2 and status["counts"]["source"]["failed"] == 1
+    assert status["failed"][0][1] == "missing.docx"
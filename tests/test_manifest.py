@@ -0,0 +1,117 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_generator import FakeGenerator
+from qna_generator import cli
+from qna_generator.checkpoint import Journal
+from qna_generator.manifest import Manifest
+from qna_generator.pipeline import QAEngine
+
+
+def run(monkeypatch, tmp_path, documents, manifest_path, journal=None, questions=1):
+    monkeypatch.setattr(cli, "iter_text_from_source", lambda kind, value, fetcher=None: iter([documents[value]]))
+    generator = FakeGenerator(categories=["手続き"])
+    engine = QAEngine(generator, chunk_tokens=8, questions=questions)
+    manifest = Manifest(str(manifest_path), salt=engine.fingerprint())
+    records, _ = cli.run_pipeline(
+        [("file", name) for name in documents],
+        generator,
+        journal=journal,
+        manifest=manifest,
+        engine=engine,
+    )
+    manifest.commit()
+    return records, generator, manifest
+
+
+def test_manifest_reuses_unchanged_chunks(tmp_path):
+    path = str(tmp_path / "m.jsonl")
+    manifest = Manifest(path)
+    digest = manifest.chunk_hash("本文")
+    manifest.record("a.txt", 0, digest, [{"question": "Q"}])
+    manifest.commit()
+
+    manifest = Manifest(path)
+    assert manifest.lookup("a.txt", digest) == [{"question": "Q"}]
+    assert manifest.lookup("a.txt", manifest.chunk_hash("変更後")) is None
+    assert manifest.lookup("b.txt", digest) is None
+    assert (manifest.reused, manifest.changed) == (1, 2)
+    manifest.close()
+    # Closing without commit keeps the previous manifest.
+    assert not os.path.exists(f"{path}.tmp")
+    assert Manifest(path).lookup("a.txt", digest) == [{"question": "Q"}]
+
+
+def test_salt_invalidates_entries(tmp_path):
+    path = str(tmp_path / "m.jsonl")
+    assert Manifest(path, salt="gpt-4o").chunk_hash("x") != Manifest(path, salt="gpt-4o-mini").chunk_hash("x")
+
+
+def test_pipeline_regenerates_only_changed_chunks(monkeypatch, tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    documents = {"a.txt": "一文目です。二文目です。三文目です。", "b.txt": "別の文書です。"}
+    first, generator, _ = run(monkeypatch, tmp_path, documents, path)
+    assert len(generator.qa_calls) == 4
+
+    documents["a.txt"] = "一文目です。二文目を変更。三文目です。"
+    second, generator, manifest = run(monkeypatch, tmp_path, documents, path)
+
+    assert generator.qa_calls == [("二文目を変更。", "手続き")]
+    assert (manifest.reused, manifest.changed) == (3, 1)
+    assert [r["question"] for r in second] == [
+        "一文目です。/手続き/0",
+        "二文目を変更。/手続き/0",
+        "三文目です。/手続き/0",
+        "別の文書です。/手続き/0",
+    ]
+    assert first[0] == second[0]
+
+    # A third run over identical input makes no requests at all.
+    _, generator, _ = run(monkeypatch, tmp_path, documents, path)
+    assert generator.qa_calls == []
+
+
+def test_failed_source_keeps_previous_entries(monkeypatch, tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    run(monkeypatch, tmp_path, {"a.txt": "一文目です。"}, path)
+
+    def fail(kind, value, fetcher=None):
+        raise OSError("unreachable")
+        yield
+
+    monkeypatch.setattr(cli, "iter_text_from_source", fail)
+    manifest = Manifest(str(path))
+    cli.run_pipeline([("file", "a.txt")], FakeGenerator(), manifest=manifest)
+    manifest.commit()
+
+    _, generator, manifest = run(monkeypatch, tmp_path, {"a.txt": "一文目です。"}, path)
+    assert generator.qa_calls == [] and manifest.reused == 1
+
+
+def test_journal_replay_writes_manifest(monkeypatch, tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    documents = {"a.txt": "一文目です。二文目です。"}
+    journal = Journal(str(tmp_path / "run.journal"))
+    run(monkeypatch, tmp_path, documents, path, journal=journal)
+    journal.close()
+
+    os.remove(path)
+    journal = Journal(str(tmp_path / "run.journal"), resume=True)
+    records, generator, _ = run(monkeypatch, tmp_path, documents, path, journal=journal)
+    journal.close()
+    assert generator.qa_calls == [] and len(records) == 2
+
+    _, generator, manifest = run(monkeypatch, tmp_path, documents, path)
+    assert generator.qa_calls == [] and manifest.reused == 2
+
+
+def test_changed_settings_regenerate_every_chunk(monkeypatch, tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    documents = {"a.txt": "一文目です。二文目です。"}
+    run(monkeypatch, tmp_path, documents, path)
+
+    records, generator, manifest = run(monkeypatch, tmp_path, documents, path, questions=2)
+    assert len(generator.qa_calls) == 2 and manifest.reused == 0
+    assert len(records) == 4
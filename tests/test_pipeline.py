@@ -0,0 +1,112 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_generator import FakeGenerator
+from qna_generator.pipeline import GenerationError, QAEngine, distribute_questions
+
+
+def test_distribute_questions():
+    assert distribute_questions(5, 3) == [2, 2, 1]
+    assert distribute_questions(2, 3) == [1, 1, 0]
+    assert distribute_questions(5, 0) == []
+
+
+def test_generate_category_steps_temperature_per_block():
+    generator = FakeGenerator()
+    engine = QAEngine(generator, block_size=2)
+    records = engine.generate_category("本文", "料金", 16, "src")
+
+    assert len(records) == 16
+    assert [call[2] for call in generator.calls] == [2] * 8
+    assert [call[3] for call in generator.calls] == [None, 2, 4, 6, 8, 10, 12, 14]
+    assert [call[1] for call in generator.calls] == pytest.approx([0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7])
+    assert records[0] == {
+        "category": "料金",
+        "question": "本文/料金/0",
+        "answer": "A",
+        "source": "本文",
+        "source_info": "src",
+        "temperature": 0.0,
+    }
+
+
+def test_generate_category_raises_on_error():
+    engine = QAEngine(FakeGenerator(failing={"料金"}))
+    with pytest.raises(GenerationError, match="boom"):
+        engine.generate_category("本文", "料金", 5, "src")
+
+
+def test_generate_categories_raises_on_error():
+    generator = FakeGenerator()
+    generator.generate_categories = lambda *args, **kwargs: {"error": "カテゴリ生成エラー: timeout"}
+    with pytest.raises(GenerationError, match="timeout"):
+        QAEngine(generator).generate_categories("本文")
+    with pytest.raises(GenerationError, match="timeout"):
+        asyncio.run(QAEngine(generator).agenerate_categories("本文"))
+    with pytest.raises(GenerationError):
+        QAEngine(FakeGenerator(categories=[])).generate_categories("本文")
+    # Category names are never inspected for error wording.
+    assert QAEngine(FakeGenerator(categories=["エラー処理"])).generate_categories("本文") == ["エラー処理"]
+
+
+def test_run_chunk_reports_errors_per_category_and_closes_client():
+    generator = FakeGenerator(failing={"手続き"})
+    engine = QAEngine(generator, total_questions=3)
+    results = engine.run_chunk("本文", ["料金", "手続き"], "src")
+
+    assert [r.category for r in results] == ["料金", "手続き"]
+    assert len(results[0].records) == 2 and results[0].error is None
+    assert results[1].records == [] and "boom" in results[1].error
+    assert generator.closed == 1
+
+
+def test_batch_categories_use_one_request_per_band():
+    generator = FakeGenerator()
+    engine = QAEngine(generator, questions=2, batch_categories=True)
+    results = engine.run_chunk("本文", ["料金", "手続き"], "src")
+
+    assert [call[0] for call in generator.calls] == [("料金", "手続き"), ("料金", "手続き")]
+    assert [len(r.records) for r in results] == [2, 2]
+    assert [r["temperature"] for r in results[0].records] == [0.0, 0.1]
+
+
+def test_run_emits_records_in_document_order():
+    generator = FakeGenerator(categories=["料金"])
+    engine = QAEngine(generator, questions=1, chunk_tokens=8)
+    emitted = []
+    result = engine.run([("a", "一文目です。二文目です。"), ("b", "別の文書です。")], sink=emitted.append)
+
+    assert result == []
+    assert [r["question"] for r in emitted] == ["一文目です。/料金/0", "二文目です。/料金/0", "別の文書です。/料金/0"]
+    assert [r["source_info"] for r in emitted] == ["a", "a", "b"]
+
+    with pytest.raises(GenerationError):
+        QAEngine(FakeGenerator(failing={"料金"})).run([("a", "本文")])
+
+
+def test_on_record_sees_streamed_records():
+    streamed = []
+    engine = QAEngine(FakeGenerator(), questions=2, block_size=1, on_record=streamed.append)
+    results = engine.run_chunk("本文", ["料金", "手続き"], "src")
+
+    assert sorted(r["question"] for r in streamed) == sorted(r["question"] for res in results for r in res.records)
+    assert {r["temperature"] for r in streamed if r["category"] == "料金"} == {0.0, 0.1}
+
+
+def test_iter_chunks_matches_split_while_streaming():
+    engine = QAEngine(FakeGenerator(), chunk_tokens=6)
+    pages = ["一文目です。二文", "目です。三文目", "です。"]
+    assert list(engine.iter_chunks(iter(pages))) == engine.split("".join(pages))
+
+    def pages_then_fail():
+        yield "一文目です。二文目です。三文目です。四文目です。"
+        raise RuntimeError("page 2")
+
+    chunks = engine.iter_chunks(pages_then_fail())
+    assert next(chunks) == "一文目です。"  # available before the failing page is read
+    # A document that fits in one chunk is passed through unchanged, like split.
+    assert list(QAEngine(FakeGenerator()).iter_chunks([" 短い", "文書 "])) == [" 短い文書 "]
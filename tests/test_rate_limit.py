@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.rate_limit import RateLimiter, TokenBucket, backoff_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_queues_reservations():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)  # one unit per second
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    clock.now = 2.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_rate_limiter_enforces_request_budget():
+    clock = FakeClock()
+    limiter = RateLimiter({"m": (2, 1000)}, clock=clock)
+    assert limiter.reserve("m", 10) == 0.0
+    assert limiter.reserve("m", 10) == 0.0
+    assert limiter.reserve("m", 10) == pytest.approx(30.0)
+
+
+def test_rate_limiter_enforces_token_budget():
+    clock = FakeClock()
+    limiter = RateLimiter({"m": (100, 600)}, clock=clock)
+    assert limiter.reserve("m", 600) == 0.0
+    assert limiter.reserve("m", 300) == pytest.approx(30.0)
+
+
+def test_rate_limiter_uses_default_for_unknown_models():
+    clock = FakeClock()
+    limiter = RateLimiter({}, default=(1, 1000), clock=clock)
+    assert limiter.reserve("other", 1) == 0.0
+    assert limiter.reserve("other", 1) == pytest.approx(60.0)
+
+
+def test_pause_delays_next_request():
+    clock = FakeClock()
+    limiter = RateLimiter({"m": (600, 100000)}, clock=clock)
+    limiter.pause("m", 5.0)
+    assert limiter.reserve("m", 1) >= 5.0
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=1.0, cap=8.0) <= 8.0
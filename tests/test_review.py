@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.review import QAStore
+
+
+def records(count, categories=("料金", "手続き", "窓口")):
+    return [
+        {"category": categories[i % len(categories)], "question": f"質問{i}", "answer": f"回答{i}"}
+        for i in range(count)
+    ]
+
+
+def test_category_index_follows_extend_and_replace():
+    store = QAStore(records(5))
+    store.extend(records(2, categories=("新規",)))
+
+    assert store.categories() == ["料金", "手続き", "窓口", "新規"]
+    assert store.indices("料金") == [0, 3]
+    assert store.indices("新規") == [5, 6]
+    assert store.count() == 7 and store.count("手続き") == 2
+
+    version = store.version
+    store.replace(records(2))
+    assert store.categories() == ["料金", "手続き"] and store.indices("料金") == [0]
+    assert store.version > version
+    store.clear()
+    assert len(store) == 0 and store.categories() == []
+
+
+def test_page_is_clamped_and_filtered():
+    store = QAStore(records(95))
+    page = store.page("料金", number=2, size=10)
+    assert page.indices == list(range(30, 60, 3)) and page.pages == 4 and page.total == 32
+
+    assert store.page("料金", number=99, size=10).number == 4
+    assert store.page(number=0, size=10).indices == list(range(10))
+    assert store.page(query="質問9", size=50).indices == [9] + list(range(90, 95))
+    assert store.page("存在しない").pages == 1
+
+
+def test_update_many_applies_only_changes_and_moves_categories():
+    store = QAStore(records(6))
+    version = store.version
+
+    assert store.update_many({0: {"question": "質問0", "answer": "回答0"}}) == 0
+    assert store.version == version
+
+    changed = store.update_many({
+        0: {"question": "新しい質問", "answer": "回答0"},
+        1: {"category": "料金"},
+        2: {"source": "無視される"},
+    })
+    assert changed == 2 and store.version == version + 1
+    assert store[0]["question"] == "新しい質問"
+    assert store.indices("料金") == [0, 1, 3]
+    assert store.indices("手続き") == [4]
+    assert "source" not in store[2]
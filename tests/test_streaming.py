@@ -0,0 +1,103 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from fake_openai_server import FakeOpenAIServer
+from qna_generator.ai_qa_generator import AIQAGenerator
+from qna_generator.budget import OutputBudget
+from qna_generator.cache import ResponseCache
+from qna_generator.streaming import QAPairStreamParser, salvage_qa_pairs
+
+PAIRS = [
+    {"question": "料金は？", "answer": "無料です {括弧} と \"引用\"", "source": "本文"},
+    {"question": "場所は？", "answer": "市役所", "source": "本文"},
+    {"question": "時間は？", "answer": "9時から", "source": "本文"},
+]
+CONTENT = json.dumps({"qa_pairs": PAIRS}, ensure_ascii=False, indent=2)
+
+
+def test_parser_emits_pairs_as_soon_as_they_close():
+    parser = QAPairStreamParser()
+    emitted = []
+    for i in range(len(CONTENT)):
+        for pair in parser.feed(CONTENT[i]):
+            emitted.append((i, pair))
+    assert [pair for _, pair in emitted] == PAIRS
+    # The first pair is available long before the document is complete.
+    assert emitted[0][0] < len(CONTENT) // 2
+    assert parser.content == CONTENT
+
+
+def test_salvage_skips_malformed_pairs():
+    content = (
+        '{"qa_pairs": [{"question": "Q1", "answer": "A1"}, {"question": "Q2", "answer": A2}, '
+        '{"question": "Q3", "answer": "A3"}, {"question": "Q4", "ans'
+    )
+    parser = QAPairStreamParser()
+    assert parser.feed(content) == [{"question": "Q1", "answer": "A1"}, {"question": "Q3", "answer": "A3"}]
+    assert parser.malformed == 1
+    assert salvage_qa_pairs('{"qa_pa') == []
+
+
+def test_streamed_pairs_reach_callback_and_cache(tmp_path):
+    with FakeOpenAIServer(lambda body: CONTENT, stream_piece=5) as server:
+        generator = AIQAGenerator(
+            api_key="test", base_url=server.base_url, rate_limiter=None, cache=ResponseCache(str(tmp_path / "c.db"))
+        )
+        seen = []
+        result = generator.generate_qa_for_category("本文", "料金", num_questions=3, on_pair=seen.append)
+        assert result == {"qa_pairs": PAIRS}
+        assert seen == PAIRS
+        assert generator.output_budget.observed == 1
+
+        replayed = []
+        generator.generate_qa_for_category("本文", "料金", num_questions=3, on_pair=replayed.append)
+        assert replayed == PAIRS
+        assert server.stats()["chat_requests"] == 1
+
+
+def test_malformed_stream_keeps_well_formed_pairs(tmp_path):
+    broken = CONTENT.replace('"場所は？"', "場所は？")
+    with FakeOpenAIServer(lambda body: broken) as server:
+        generator = AIQAGenerator(
+            api_key="test",
+            base_url=server.base_url,
+            rate_limiter=None,
+            cache=ResponseCache(str(tmp_path / "c.db")),
+            stream=True,
+        )
+
+        async def run():
+            try:
+                return await generator.agenerate_qa_for_category("本文", "料金", num_questions=3)
+            finally:
+                await generator.aclose()
+
+        result = asyncio.run(run())
+        assert result == {"qa_pairs": [PAIRS[0], PAIRS[2]]}
+        # Salvaged output is not cached.
+        asyncio.run(run())
+        assert server.stats()["chat_requests"] == 2
+
+
+def test_truncated_stream_continues_without_repeating_pairs():
+    def responder(body):
+        count = int(body["messages"][-1]["content"].split("回答を", 1)[1].split("つ", 1)[0])
+        pairs = [{"question": f"質問{i}", "answer": "あ" * 100} for i in range(count)]
+        return json.dumps({"qa_pairs": pairs}, ensure_ascii=False)
+
+    with FakeOpenAIServer(responder) as server:
+        generator = AIQAGenerator(
+            api_key="test",
+            base_url=server.base_url,
+            rate_limiter=None,
+            output_budget=OutputBudget(tokens_per_question=60, headroom=1.0),
+        )
+        seen = []
+        result = generator.generate_qa_for_category("本文", "料金", num_questions=4, on_pair=seen.append)
+
+    assert len(result["qa_pairs"]) == 4
+    assert seen == result["qa_pairs"]
+    assert generator.output_budget.truncated >= 1
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from qna_generator.ai_qa_generator import AIQAGenerator
+from qna_generator.cache import ResponseCache
+from qna_generator.data_exporter import export_to_jsonl
+from qna_generator.tracing import NULL_SPAN, JsonlSpanSink, StageSummary, Tracer, get_tracer, set_tracer, span
+from qna_generator.utils import split_text_into_chunks
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    tracer = Tracer([JsonlSpanSink(str(tmp_path / "trace.jsonl"))])
+    previous = set_tracer(tracer)
+    yield tracer
+    set_tracer(previous)
+    tracer.close()
+
+
+def read_spans(tmp_path):
+    with open(tmp_path / "trace.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_spans_are_noops_without_a_tracer():
+    assert not get_tracer().enabled
+    with span("anything", x=1) as s:
+        s.set(y=2)
+    assert s is NULL_SPAN
+
+
+def test_nested_spans_record_parents_and_errors(tracer, tmp_path):
+    with span("outer") as outer:
+        with span("inner", n=1) as inner:
+            inner.add(n=2)
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("bad")
+
+    async def task():
+        with span("async-child"):
+            await asyncio.sleep(0)
+
+    with span("loop") as loop_span:
+        asyncio.run(task())
+    tracer.close()
+
+    spans = {s["name"]: s for s in read_spans(tmp_path)}
+    assert spans["inner"]["parent_id"] == outer.span_id
+    assert spans["inner"]["attributes"] == {"n": 3}
+    assert spans["failing"]["error"] == "ValueError: bad"
+    assert spans["async-child"]["parent_id"] == loop_span.span_id
+    assert spans["outer"]["parent_id"] is None
+
+
+def test_generator_spans_carry_usage_retries_and_cache_hits(tracer, tmp_path, monkeypatch):
+    from openai import RateLimitError
+
+    from qna_generator import ai_qa_generator
+
+    class FlakyClient:
+        def __init__(self):
+            self.calls = 0
+            self.chat = SimpleNamespace(completions=self)
+
+        def create(self, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                response = SimpleNamespace(status_code=429, headers={}, request=None)
+                raise RateLimitError("slow down", response=response, body=None)
+            message = SimpleNamespace(content='{"qa_pairs": []}')
+            usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    monkeypatch.setattr(ai_qa_generator, "backoff_delay", lambda attempt: 0)
+    generator = AIQAGenerator(api_key="test", cache=ResponseCache(str(tmp_path / "c.db")), rate_limiter=None)
+    generator.client = FlakyClient()
+    generator.generate_qa_for_category("text", "cat")
+    generator.generate_qa_for_category("text", "cat")
+
+    stages = {s.name: s for s in tracer.stages()}
+    assert stages["openai.request"].count == 1
+    assert stages["openai.request"].totals == {"prompt_tokens": 120, "completion_tokens": 30, "retries": 1}
+    assert stages["openai.complete"].count == 2
+    assert stages["openai.complete"].totals["cache_hit"] == 1
+    assert stages["openai.parse"].count == 2
+
+
+def test_chunking_and_export_are_traced(tracer, tmp_path):
+    split_text_into_chunks("一文目です。二文目です。", 8)
+    export_to_jsonl([{"question": "Q"}, {"question": "R"}], str(tmp_path / "out.jsonl"))
+
+    stages = {s.name: s for s in tracer.stages()}
+    assert stages["chunk"].count == 1
+    assert stages["export.jsonl"].totals["records"] == 2
+    table = tracer.summary_table()
+    assert table.splitlines()[0].split()[:6] == ["stage", "count", "total_s", "mean_ms", "p95_ms", "errors"]
+    assert "export.jsonl" in table
+
+
+def test_stage_summary_memory_is_bounded():
+    stage = StageSummary("openai.request", reservoir_size=100)
+    for i in range(10000):
+        stage.add(i / 1000)
+    assert stage.count == 10000 and len(stage.durations) == 100
+    assert stage.total == pytest.approx(sum(range(10000)) / 1000)
+    # A uniform sample of 0..10 s puts the 95th percentile near 9.5 s.
+    assert 8.5 < stage.percentile(95) <= 10
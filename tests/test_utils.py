@@ -6,7 +6,10 @@ import pytest
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from qna_generator.utils import (
     calculate_temperature_step,
+    count_tokens,
     increment_temperature,
+    iter_text_chunks,
+    plan_temperature_bands,
     split_text_into_chunks,
 )
 
@@ -30,3 +33,74 @@ def test_split_text_into_chunks_respects_token_limit():
     assert len(chunks) > 1
     for chunk in chunks:
         assert len(chunk.split()) <= 10
+
+
+def test_plan_temperature_bands_matches_block_schedule():
+    bands = plan_temperature_bands([5, 3, 2])
+    assert [counts for _, counts in bands] == [
+        [1, 1, 1],
+        [1, 1, 1],
+        [1, 1, 0],
+        [1, 0, 0],
+        [1, 0, 0],
+    ]
+    assert bands[0][0] == 0.0
+    assert bands[1][0] == increment_temperature(0.0)
+
+
+def test_plan_temperature_bands_covers_all_questions():
+    bands = plan_temperature_bands([30, 7])
+    assert sum(counts[0] for _, counts in bands) == 30
+    assert sum(counts[1] for _, counts in bands) == 7
+    assert all(temperature <= 0.8 for temperature, _ in bands)
+    assert plan_temperature_bands([]) == []
+
+
+def test_split_text_into_chunks_japanese_without_spaces():
+    sentence = "これは日本語の文章です。"
+    text = sentence * 100
+    chunks = split_text_into_chunks(text, max_tokens=50)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert all(chunk.endswith("。") for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+def test_split_text_into_chunks_overlap():
+    text = "".join(f"文{i:02d}です。" for i in range(40))
+    chunks = split_text_into_chunks(text, max_tokens=30, overlap=12)
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        carried = previous[-12:]  # each sentence is 6 tokens, so two are carried
+        assert current.startswith(carried)
+
+
+def test_split_text_into_chunks_long_sentence_is_split():
+    chunks = split_text_into_chunks("あ" * 120, max_tokens=50)
+    assert [len(chunk) for chunk in chunks] == [50, 50, 20]
+
+
+def test_oversized_sentence_pieces_overlap():
+    text = "".join(chr(ord("ぁ") + i) for i in range(30))  # 30 distinct characters, no punctuation
+    chunks = split_text_into_chunks(text, max_tokens=10, overlap=5)
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current[:5] == previous[-5:]
+    assert chunks[0] + "".join(chunk[5:] for chunk in chunks[1:]) == text
+
+
+def test_split_text_into_chunks_custom_counter():
+    text = "a. b. c. d."
+    chunks = split_text_into_chunks(text, max_tokens=2, token_counter=lambda s: 1)
+    assert chunks == ["a. b.", "c. d."]
+
+
+def test_split_text_into_chunks_returns_fitting_text_unchanged():
+    assert split_text_into_chunks("短い文章。", max_tokens=100) == ["短い文章。"]
+    assert split_text_into_chunks("text", max_tokens=0) == ["text"]
+
+
+def test_iter_text_chunks_joins_sentences_across_pieces():
+    pages = ["最初の文です。次の文は", "ページをまたぎます。\n", "最後の文です。"]
+    chunks = list(iter_text_chunks(pages, max_tokens=15))
+    assert chunks == ["最初の文です。", "次の文はページをまたぎます。", "最後の文です。"]